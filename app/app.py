@@ -1,27 +1,41 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'config')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
+import time
 import dash
-from dash import html, dcc, Input, Output
+from dash import html, dcc, Input, Output, State, ALL, Patch, ctx, no_update
 import dash_leaflet as dl
 import dash_bootstrap_components as dbc
-import plotly.graph_objs as go
+from plotly.io.json import to_json_plotly
 from events import EVENTS, EVENT_COLOURS
+from locations import location_centroid
+from store import ResultStore
+from cache import FigureCache
+from figures import empty_figure, car_figure, mean_car_figure, metrics_figure, cumulative_label
+
+OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'output'))
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server
 
-# Generate markers for all events
+# Precomputed AR/CAR trajectories and CV metrics, loaded once into memory
+store = ResultStore(OUTPUT_DIR)
+
+# Built figures keyed by (event_key or event_type, analysis_type, sectors, kind)
+figure_cache = FigureCache(max_entries=64)
+
+# Generate markers for all events (multi-location events sit at their footprint centroid)
 event_markers = [
     dl.CircleMarker(
-        center=(event['location']['lat'], event['location']['lon']),
+        center=location_centroid(event['location']),
         radius=5,
         color=EVENT_COLOURS.get(event['type'], 'gray'),
         fill=True,
         fillOpacity=0.7,
         children=dl.Tooltip(event['name']),
-        id=f"marker-{key}"
+        id={'type': 'event-marker', 'index': key}
     )
     for key, event in EVENTS.items()
 ]
@@ -88,6 +102,14 @@ def layout():
 
         html.Hr(),
 
+        dbc.Row([
+            dbc.Col([
+                html.Label("Sectors:"),
+                dcc.Checklist(id='sector-selector', options=[], value=[], inline=True,
+                              inputStyle={'marginRight': '4px', 'marginLeft': '12px'})
+            ])
+        ], className="my-2"),
+
         dbc.Row([
             dbc.Col([
                 dcc.Graph(id='ar-car-plot')
@@ -95,32 +117,142 @@ def layout():
             dbc.Col([
                 dcc.Graph(id='model-performance-plot')
             ], width=6),
-        ])
+        ]),
+
+        # Which selection the CAR plot currently shows, so sector changes can be sent as a Patch
+        dcc.Store(id='figure-state'),
+
+        html.Details([
+            html.Summary("Debug"),
+            html.Pre(id='debug-panel', style={'fontSize': '12px'})
+        ], className="my-2")
     ], fluid=True)
 
 app.layout = layout
 
-# Placeholder callbacks for rendering plots
+NO_RESULTS = "No precomputed results. Run run_analysis.py for this event type."
+
+
+def selection_key(event_key, analysis_type):
+    """Cross-event views are shared by every event of the same type."""
+    return EVENTS[event_key]['type'] if analysis_type == 'cross' else event_key
+
+
+def selection_data(event_key, analysis_type):
+    """Return (predictions, metrics) for the current selection from the store."""
+    if analysis_type == 'cross':
+        event_type = EVENTS[event_key]['type']
+        return store.type_predictions(event_type), store.overall_metrics(event_type)
+    return store.event_predictions(event_key), store.event_metrics(event_key)
+
+
+def build_car_figure(event_key, analysis_type, sectors):
+    preds, _ = selection_data(event_key, analysis_type)
+    label = cumulative_label(preds) if preds is not None else "CAR"
+    if analysis_type == 'cross':
+        title = f"Mean {label} across all '{EVENTS[event_key]['type']}' events"
+        fig = mean_car_figure(preds, title, store.model_names, sectors) if preds is not None else None
+    else:
+        title = f"{label} for '{EVENTS[event_key]['name']}'"
+        fig = car_figure(preds, title, store.model_names, sectors) if preds is not None else None
+    fig = fig if fig is not None else empty_figure(title, NO_RESULTS)
+    return fig, len(to_json_plotly(fig))
+
+
+def build_metrics_figure(event_key, analysis_type, sectors):
+    _, metrics = selection_data(event_key, analysis_type)
+    if analysis_type == 'cross':
+        title = "Model Performance (Cross-Event)"
+        subtitle = "overall LOEO RMSE"
+    else:
+        title = "Model Performance (Single Event)"
+        subtitle = "held-out RMSE"
+    if metrics is None:
+        fig = empty_figure(title, NO_RESULTS)
+    else:
+        fig = metrics_figure(metrics, f"{title}: {subtitle}", sectors=sectors)
+    return fig, len(to_json_plotly(fig))
+
+
+@app.callback(
+    Output('event-selector', 'value'),
+    Input({'type': 'event-marker', 'index': ALL}, 'n_clicks'),
+    prevent_initial_call=True
+)
+def select_event_from_map(n_clicks):
+    if not ctx.triggered_id or not any(n_clicks):
+        return no_update
+    return ctx.triggered_id['index']
+
+
+@app.callback(
+    Output('sector-selector', 'options'),
+    Output('sector-selector', 'value'),
+    Input('event-selector', 'value'),
+    Input('analysis-type', 'value')
+)
+def update_sector_options(event_key, analysis_type):
+    if not event_key:
+        return [], []
+    preds, _ = selection_data(event_key, analysis_type)
+    sectors = sorted(preds['sector'].unique()) if preds is not None else []
+    return [{'label': s, 'value': s} for s in sectors], sectors
+
+
 @app.callback(
     Output('ar-car-plot', 'figure'),
     Output('model-performance-plot', 'figure'),
+    Output('figure-state', 'data'),
+    Output('debug-panel', 'children'),
     Input('event-selector', 'value'),
-    Input('analysis-type', 'value')
+    Input('analysis-type', 'value'),
+    Input('sector-selector', 'value'),
+    State('figure-state', 'data')
 )
-def update_plots(event_key, analysis_type):
-    fig1 = go.Figure()
-    fig2 = go.Figure()
-    if event_key:
-        event = EVENTS.get(event_key)
-        event_name = event['name']
-        event_type = event['type']
-        if analysis_type == 'single':
-            fig1.update_layout(title=f"AR/CAR for '{event_name}'")
-            fig2.update_layout(title="Model Performance (Single Event)")
-        elif analysis_type == 'cross':
-            fig1.update_layout(title=f"AR/CAR for all '{event_type}' events")
-            fig2.update_layout(title="Model Performance (Cross-Event)")
-    return fig1, fig2
+def update_plots(event_key, analysis_type, sectors, state):
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    if store.refresh():
+        figure_cache.clear()
+
+    if not event_key:
+        return empty_figure("AR/CAR", "Select an event"), empty_figure("Model Performance", "Select an event"), None, ""
+
+    selection = [selection_key(event_key, analysis_type), analysis_type]
+    sector_set = frozenset(sectors or [])
+    cache_key = (selection[0], analysis_type, sector_set)
+
+    fig2, size2 = figure_cache.get_or_build(
+        cache_key + ('metrics',), lambda: build_metrics_figure(event_key, analysis_type, sector_set))
+
+    # Only the sector selection changed on the figure already in the browser:
+    # flip trace visibility instead of re-sending every trace.
+    sector_only = ctx.triggered_prop_ids and set(ctx.triggered_prop_ids) == {'sector-selector.value'}
+    if sector_only and state and state['selection'] == selection:
+        fig1 = Patch()
+        for i, sector in enumerate(state['trace_sectors']):
+            fig1['data'][i]['visible'] = sector in sector_set
+        size1 = len(to_json_plotly(fig1.to_plotly_json()))
+        trace_sectors = state['trace_sectors']
+        mode = "patch"
+    else:
+        fig1, size1 = figure_cache.get_or_build(
+            cache_key + ('car',), lambda: build_car_figure(event_key, analysis_type, sector_set))
+        trace_sectors = [trace.legendgroup for trace in fig1.data]
+        mode = "full"
+
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    wall_ms = (time.perf_counter() - wall_start) * 1000
+    cache_stats = figure_cache.stats()
+    debug = (
+        f"update: {mode} | payload: {(size1 + size2) / 1024:.1f} KiB "
+        f"(CAR {size1 / 1024:.1f}, metrics {size2 / 1024:.1f}) | "
+        f"server cpu: {cpu_ms:.1f} ms | wall: {wall_ms:.1f} ms | "
+        f"figure cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']} entries"
+    )
+    new_state = {'selection': selection, 'trace_sectors': trace_sectors}
+    return fig1, fig2, new_state, debug
 
 if __name__ == '__main__':
     app.run(debug=True,port=8052)
\ No newline at end of file
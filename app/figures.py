@@ -0,0 +1,117 @@
+import numpy as np
+import plotly.graph_objs as go
+from plotly.colors import qualitative
+
+MODEL_DASHES = {'xgboost': 'dash', 'random_forest': 'dot', 'ols': 'dashdot'}
+SECTOR_PALETTE = qualitative.Plotly + qualitative.D3
+
+# Traces longer than this are downsampled before being sent to the browser
+MAX_TRACE_POINTS = 500
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Keeps the first and last points and, in each bucket, the point forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+    Returns (x, y) with at most n_out points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    # Bucket edges over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[prev] - avg_x) * (by - y[prev]) - (x[prev] - bx) * (avg_y - y[prev]))
+        prev = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        keep[i + 1] = prev
+
+    return x[keep], y[keep]
+
+
+def empty_figure(title, message):
+    """Blank figure with a centred message, used when nothing is precomputed."""
+    fig = go.Figure()
+    fig.update_layout(
+        title=title,
+        xaxis={'visible': False},
+        yaxis={'visible': False},
+        annotations=[{'text': message, 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}],
+    )
+    return fig
+
+
+def cumulative_label(preds):
+    """Axis label of the car_ columns: CAR, or CSAR when the models predict standardized ARs."""
+    if 'target' not in preds or preds['target'].isna().all():
+        return "CAR"
+    return f"C{preds['target'].dropna().iloc[0].upper()}"
+
+
+def car_figure(preds, title, model_names, sectors=None, max_points=MAX_TRACE_POINTS, y_label=None):
+    """
+    Actual vs predicted CAR trajectories by relative day.
+    One colour per sector; actual is solid, each model has its own dash style.
+    `preds` must have sector, relative_day, car_true and car_pred_{model} columns;
+    y_label defaults to cumulative_label(preds).
+
+    Every sector gets traces (legendgroup = sector) so that selections can be
+    toggled later with a Patch; sectors outside `sectors` start hidden.
+    Traces longer than `max_points` are LTTB-downsampled.
+    """
+    fig = go.Figure()
+    for i, (sector, group) in enumerate(preds.groupby('sector', sort=True)):
+        colour = SECTOR_PALETTE[i % len(SECTOR_PALETTE)]
+        visible = sectors is None or sector in sectors
+        group = group.sort_values('relative_day')
+        days = group['relative_day'].values
+
+        x, y = lttb(days, group['car_true'].values, max_points)
+        fig.add_trace(go.Scatter(
+            x=x, y=y, mode='lines', name=f"{sector} actual", visible=visible,
+            legendgroup=sector, line={'color': colour, 'width': 2},
+        ))
+        for model_name in model_names:
+            x, y = lttb(days, group[f'car_pred_{model_name}'].values, max_points)
+            fig.add_trace(go.Scatter(
+                x=x, y=y, mode='lines', visible=visible,
+                name=f"{sector} {model_name}", legendgroup=sector,
+                line={'color': colour, 'width': 1, 'dash': MODEL_DASHES.get(model_name, 'longdash')},
+            ))
+
+    fig.add_vline(x=0, line_dash='dot', line_color='gray')
+    fig.update_layout(title=title, xaxis_title="Relative Day", yaxis_title=y_label or cumulative_label(preds), legend={'font': {'size': 9}})
+    return fig
+
+
+def mean_car_figure(preds, title, model_names, sectors=None, max_points=MAX_TRACE_POINTS):
+    """CAR trajectories averaged across events, per sector and relative day."""
+    value_cols = ['car_true'] + [f'car_pred_{m}' for m in model_names]
+    mean_preds = preds.groupby(['sector', 'relative_day'], as_index=False)[value_cols].mean()
+    return car_figure(mean_preds, title, model_names, sectors, max_points, cumulative_label(preds))
+
+
+def metrics_figure(metrics, title, metric='rmse', sectors=None):
+    """Grouped bar chart of a CV metric per sector, one bar per model."""
+    if sectors is not None:
+        metrics = metrics[metrics['sector'].isin(sectors)]
+    fig = go.Figure()
+    for model_name, group in metrics.groupby('model', sort=False):
+        group = group.sort_values('sector')
+        fig.add_trace(go.Bar(x=group['sector'].values, y=group[metric].values, name=model_name))
+    fig.update_layout(title=title, barmode='group', xaxis_title="Sector", yaxis_title=metric.upper())
+    return fig
@@ -0,0 +1,78 @@
+import os
+import glob
+import pandas as pd
+
+
+class ResultStore:
+    """
+    In-memory index of the precomputed pooled-analysis outputs.
+
+    Reads every output/{event_type}/predictions/{sector}_cv_predictions.csv and
+    output/{event_type}/metrics/{sector}_cv_metrics.csv once and indexes them by
+    event_key and event_type, so dashboard callbacks never touch the disk.
+    Outputs of additional CV schemes, in {scheme}/ subdirectories, are not read.
+    """
+
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+        self._stamp = None
+        self.refresh()
+
+    def _scan(self):
+        pattern_preds = os.path.join(self.output_dir, "*", "predictions", "*_cv_predictions.csv")
+        pattern_metrics = os.path.join(self.output_dir, "*", "metrics", "*_cv_metrics.csv")
+        return sorted(glob.glob(pattern_preds)), sorted(glob.glob(pattern_metrics))
+
+    def refresh(self):
+        """(Re)load the CSVs if any of them changed since the last load. Returns True on reload."""
+        pred_paths, metric_paths = self._scan()
+        stamp = tuple((p, os.path.getmtime(p)) for p in pred_paths + metric_paths)
+        if stamp == self._stamp:
+            return False
+
+        self.predictions = self._load(pred_paths, "_cv_predictions.csv")
+        self.metrics = self._load(metric_paths, "_cv_metrics.csv")
+
+        self.predictions_by_event = {k: g for k, g in self.predictions.groupby('event_key')} if len(self.predictions) else {}
+        self.predictions_by_type = {k: g for k, g in self.predictions.groupby('event_type')} if len(self.predictions) else {}
+        if len(self.metrics):
+            per_event = self.metrics[self.metrics['held_out_event'] != 'OVERALL']
+            overall = self.metrics[self.metrics['held_out_event'] == 'OVERALL']
+            self.metrics_by_event = {k: g for k, g in per_event.groupby('held_out_event')}
+            self.overall_by_type = {k: g for k, g in overall.groupby('event_type')}
+        else:
+            self.metrics_by_event = {}
+            self.overall_by_type = {}
+
+        self.model_names = [c[len('car_pred_'):] for c in self.predictions.columns if c.startswith('car_pred_')]
+        self._stamp = stamp
+        return True
+
+    @staticmethod
+    def _load(paths, suffix):
+        frames = []
+        for path in paths:
+            sector = os.path.basename(path)[:-len(suffix)]
+            if "_" in sector:
+                # Tickers never contain underscores: a {sector}_{scheme} file left by an older run
+                continue
+            df = pd.read_csv(path)
+            # Paths look like output/{event_type}/{kind}/{sector}{suffix}
+            df['event_type'] = os.path.basename(os.path.dirname(os.path.dirname(path)))
+            df['sector'] = sector
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=['event_key', 'held_out_event', 'event_type', 'sector'])
+        return pd.concat(frames, ignore_index=True)
+
+    def event_predictions(self, event_key):
+        return self.predictions_by_event.get(event_key)
+
+    def type_predictions(self, event_type):
+        return self.predictions_by_type.get(event_type)
+
+    def event_metrics(self, event_key):
+        return self.metrics_by_event.get(event_key)
+
+    def overall_metrics(self, event_type):
+        return self.overall_by_type.get(event_type)
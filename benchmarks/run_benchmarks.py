@@ -0,0 +1,214 @@
+"""
+End-to-end pipeline benchmark on synthetic event catalogs.
+
+Market data comes from an in-process yfinance stand-in and weather from a
+local Visual Crossing stand-in server, so the benchmark runs offline and is
+deterministic. Each stage is timed separately and the results are written as
+JSON under benchmarks/results/ for comparison across commits:
+
+    python benchmarks/run_benchmarks.py --events 500 --tickers 40
+    python benchmarks/run_benchmarks.py --events 500 --tickers 40 --compare benchmarks/results/<old>.json
+"""
+import sys
+import os
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+sys.path.append(ROOT_DIR)
+
+import io
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+import pandas as pd
+
+import dataset
+import market
+import models
+import weather
+from config.events import ESTIMATION_DAYS
+from returns import estimate_market_model, compute_abnormal_returns
+from http_client import HTTPClient
+from synthetic import make_catalog, FakeYFinance, FakeVisualCrossingServer
+
+
+@contextmanager
+def patched_sources(catalog, fake_yf, weather_url, weather_client=None):
+    """Swap the event catalog, yfinance and the weather API for the synthetic stand-ins."""
+    saved = (dataset.EVENTS, market.yf, weather.VISUAL_CROSSING_URL, weather._CLIENT)
+    dataset.EVENTS = catalog
+    market.yf = fake_yf
+    weather.VISUAL_CROSSING_URL = weather_url
+    weather._CLIENT = weather_client
+    try:
+        yield
+    finally:
+        dataset.EVENTS, market.yf, weather.VISUAL_CROSSING_URL, weather._CLIENT = saved
+
+
+@contextmanager
+def timed(results, name, **extra):
+    """Record wall and CPU time of a block under results[name]."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    entry = dict(extra)
+    # The pipeline prints progress per event/sector; keep it out of the timings
+    with redirect_stdout(io.StringIO()):
+        yield entry
+    entry['wall_s'] = time.perf_counter() - wall_start
+    entry['cpu_s'] = time.process_time() - cpu_start
+    results[name] = entry
+    print(f"  {name:32s} {entry['wall_s']:9.3f} s")
+
+
+def bench_dataset(results, event_type):
+    with timed(results, 'dataset_build') as entry:
+        pooled = dataset.build_pooled_dataset(event_type, "benchmark")
+        entry['rows'] = len(pooled)
+        entry['events'] = int(pooled['event_key'].nunique())
+    return pooled
+
+
+def bench_returns(results, catalog, fake_yf):
+    """Time CAPM fitting and AR computation alone, over every event in the catalog."""
+    inputs = []
+    for event in catalog.values():
+        event_dt = pd.to_datetime(event['event_date'])
+        start = (event_dt - timedelta(days=int(ESTIMATION_DAYS * 1.5))).strftime('%Y-%m-%d')
+        with redirect_stdout(io.StringIO()):
+            market_df = market.fetch_market_data([event['index']], start, event['end_date'])[event['index']]
+            sector_dict = market.fetch_market_data(event['sector_etfs'], start, event['end_date'])
+        window = market_df.index[market_df.index < event['event_date']][-ESTIMATION_DAYS:]
+        inputs.append((market_df, sector_dict, window))
+
+    params = []
+    with timed(results, 'capm', fits=sum(len(s) for _, s, _ in inputs)):
+        for market_df, sector_dict, window in inputs:
+            params.append(estimate_market_model(market_df, sector_dict, window))
+
+    with timed(results, 'abnormal_returns'):
+        for (market_df, sector_dict, _), p in zip(inputs, params):
+            compute_abnormal_returns(market_df, sector_dict, p)
+
+
+def bench_loeo(results, pooled, features, cv_sectors, model_names):
+    """Time LOEO CV per model on the `cv_sectors` largest sectors."""
+    sizes = pooled.groupby('sector')['event_key'].nunique().sort_values(ascending=False)
+    sectors = [s for s in sizes.index[:cv_sectors] if sizes[s] >= 2]
+    fold_results = []
+    for model_name in model_names:
+        # Time one model at a time
+        registry = {model_name: models.MODEL_REGISTRY[model_name]}
+        with timed(results, f'loeo_{model_name}', sectors=sectors) as entry:
+            folds = 0
+            for sector in sectors:
+                sector_df = pooled[pooled['sector'] == sector].dropna(subset=features + ['ar'])
+                fr, _, _ = models.run_leave_one_event_out(sector_df, features, 'ar', registry=registry)
+                folds += len(fr)
+                fold_results.extend(fr)
+            entry['folds'] = folds
+    return fold_results
+
+
+def bench_exports(results, pooled, fold_results):
+    with tempfile.TemporaryDirectory() as tmp, timed(results, 'exports') as entry:
+        pooled.to_csv(os.path.join(tmp, "pooled_dataset.csv"), index=False)
+        rows = []
+        for fold in fold_results:
+            pred_cols = {k[len('y_pred_'):]: v for k, v in fold.items() if k.startswith('y_pred_')}
+            frame = pd.DataFrame({'event_key': fold['event_key'], 'relative_day': fold['relative_days'],
+                                  'ar_true': fold['y_true'],
+                                  **{f'ar_pred_{m}': v for m, v in pred_cols.items()}})
+            rows.append(frame)
+        if rows:
+            pd.concat(rows, ignore_index=True).to_csv(os.path.join(tmp, "predictions.csv"), index=False)
+        entry['rows'] = len(pooled)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nComparison against {baseline_path} ({baseline.get('commit')}):")
+    for name, entry in current['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            print(f"  {name:32s} {'(new)':>9s}")
+            continue
+        ratio = entry['wall_s'] / old['wall_s'] if old['wall_s'] else float('nan')
+        print(f"  {name:32s} {old['wall_s']:9.3f} s -> {entry['wall_s']:9.3f} s  ({ratio:5.2f}x)")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic events.")
+    parser.add_argument('--events', type=int, default=200, help='Number of synthetic events')
+    parser.add_argument('--tickers', type=int, default=30, help='Size of the synthetic ticker universe')
+    parser.add_argument('--sectors_per_event', type=int, default=5)
+    parser.add_argument('--cv_sectors', type=int, default=1, help='Sectors to run LOEO CV on (largest first)')
+    parser.add_argument('--models', type=str, nargs='*', default=None,
+                        help='Models to time in LOEO CV (defaults to all of MODEL_REGISTRY)')
+    parser.add_argument('--weather_concurrency', type=int, default=weather.WEATHER_MAX_CONCURRENCY,
+                        help='Weather requests in flight')
+    parser.add_argument('--weather_fail_every', type=int, default=0,
+                        help='Have the weather stand-in answer every Nth request with 429')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output_dir', type=str, default=os.path.join(ROOT_DIR, 'benchmarks', 'results'))
+    parser.add_argument('--compare', type=str, default=None, help='Earlier results JSON to compare against')
+
+    args = parser.parse_args()
+    event_type = "Hurricane"
+    model_names = args.models or list(models.MODEL_REGISTRY)
+
+    catalog = make_catalog(args.events, args.tickers, event_type, args.sectors_per_event, args.seed)
+    fake_yf = FakeYFinance()
+    print(f"Benchmarking {args.events} events over {args.tickers} tickers")
+
+    # The local stand-in has no quota, so the client runs without rate limiting
+    weather_client = HTTPClient(max_concurrency=args.weather_concurrency, rate_per_sec=None, backoff_base=0.01)
+
+    results = {}
+    with FakeVisualCrossingServer(fail_every=args.weather_fail_every) as server, \
+            patched_sources(catalog, fake_yf, server.url, weather_client):
+        pooled = bench_dataset(results, event_type)
+        results['dataset_build']['yf_downloads'] = fake_yf.calls
+        results['dataset_build']['weather_requests'] = server.requests
+        results['dataset_build']['weather_retries'] = weather_client.stats['retries']
+        bench_returns(results, catalog, fake_yf)
+    weather_client.close()
+
+    features = ['relative_day'] + [c for c in pooled.columns if c.startswith('delta_')]
+    fold_results = bench_loeo(results, pooled, features, args.cv_sectors, model_names)
+    bench_exports(results, pooled, fold_results)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'params': vars(args),
+        'stages': results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d-%H%M%S}_{report['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=lambda v: v.item() if hasattr(v, 'item') else str(v))
+    print(f"\nSaved benchmark results to {path}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
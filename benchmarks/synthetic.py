@@ -0,0 +1,159 @@
+import json
+import zlib
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import numpy as np
+import pandas as pd
+
+WEATHER_VARS = ['temp', 'windspeed', 'pressure', 'precip', 'humidity', 'solarradiation']
+
+
+def _seed(*parts):
+    """Stable seed from arbitrary labels, so every run sees identical data."""
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+def make_catalog(n_events, n_tickers, event_type="Hurricane", sectors_per_event=5, seed=0):
+    """
+    Build an EVENTS-shaped catalog of synthetic events.
+
+    Event dates are spread over 2005-2024, locations over the US Gulf/Atlantic
+    coast and each event draws `sectors_per_event` tickers from a universe of
+    `n_tickers` symbols (SYN000, SYN001, ...).
+    """
+    rng = np.random.default_rng(seed)
+    universe = [f"SYN{i:03d}" for i in range(n_tickers)]
+    first, last = pd.Timestamp("2005-01-01"), pd.Timestamp("2024-06-30")
+    span_days = (last - first).days
+
+    catalog = {}
+    for i in range(n_events):
+        event_dt = first + timedelta(days=int(rng.integers(0, span_days)))
+        duration = int(rng.integers(4, 25))
+        tickers = rng.choice(universe, size=min(sectors_per_event, n_tickers), replace=False)
+        catalog[f"synthetic_{i:05d}"] = {
+            "name": f"Synthetic Event {i}",
+            "type": event_type,
+            "event_date": event_dt.strftime("%Y-%m-%d"),
+            "end_date": (event_dt + timedelta(days=duration)).strftime("%Y-%m-%d"),
+            "location": {"lat": float(rng.uniform(25, 41)), "lon": float(rng.uniform(-97, -70))},
+            "index": "SPY",
+            "sector_etfs": {t: f"Synthetic {t}" for t in tickers},
+            "regional_etfs": {},
+        }
+    return catalog
+
+
+class FakeYFinance:
+    """
+    Stand-in for the `yfinance` module. `download` returns a deterministic
+    geometric random walk per symbol with the Close/Volume columns that
+    fetch_market_data reads. Ticker returns load on SPY so CAPM has signal.
+    """
+
+    def __init__(self, first="2000-01-01", last="2026-01-01"):
+        self.dates = pd.bdate_range(first, last)
+        self._market = self._returns("SPY")
+        self._cache = {}
+        self.calls = 0
+
+    def _returns(self, symbol):
+        rng = np.random.default_rng(_seed("returns", symbol))
+        return rng.normal(0.0003, 0.01, len(self.dates))
+
+    def _series(self, symbol):
+        if symbol not in self._cache:
+            if symbol == "SPY":
+                returns = self._market
+            else:
+                rng = np.random.default_rng(_seed("beta", symbol))
+                beta = rng.uniform(0.5, 1.5)
+                returns = beta * self._market + self._returns(symbol)
+            close = 100 * np.exp(np.cumsum(returns))
+            volume = np.random.default_rng(_seed("volume", symbol)).integers(1e5, 1e7, len(self.dates))
+            self._cache[symbol] = pd.DataFrame({'Close': close, 'Volume': volume}, index=self.dates)
+        return self._cache[symbol]
+
+    def download(self, symbol, start=None, end=None, **kwargs):
+        self.calls += 1
+        df = self._series(symbol)
+        # yfinance treats `end` as exclusive
+        return df.loc[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))].copy()
+
+
+def synthetic_weather_days(lat, lon, start_date, end_date):
+    """Daily weather records in the Visual Crossing `days` format for one location."""
+    dates = pd.date_range(start_date, end_date)
+    rng = np.random.default_rng(_seed("weather", round(lat, 4), round(lon, 4), start_date))
+    base = {'temp': 25, 'windspeed': 15, 'pressure': 1012, 'precip': 2, 'humidity': 70, 'solarradiation': 200}
+    days = []
+    for date in dates:
+        day = {'datetime': date.strftime("%Y-%m-%d")}
+        for var in WEATHER_VARS:
+            day[var] = float(base[var] + rng.normal(0, base[var] * 0.1))
+        days.append(day)
+    return days
+
+
+class FakeVisualCrossingServer:
+    """
+    Local HTTP stand-in for the Visual Crossing timeline API.
+    Serves /timeline/{lat},{lon}/{start}/{end} with synthetic `days`.
+    Point weather.VISUAL_CROSSING_URL at `self.url`.
+
+    With fail_every=N, every Nth request is answered 429 (Retry-After: 0), to
+    exercise the client's retry path.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.received += 1
+                    throttle = server.fail_every and server.received % server.fail_every == 0
+                if throttle:
+                    server.throttled += 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                parts = urlparse(self.path).path.strip("/").split("/")
+                try:
+                    lat, lon = (float(v) for v in parts[-3].split(","))
+                    body = json.dumps({'days': synthetic_weather_days(lat, lon, parts[-2], parts[-1])}).encode()
+                except (IndexError, ValueError):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.requests = 0
+        self.received = 0
+        self.throttled = 0
+        self.fail_every = fail_every
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_address[1]}/timeline"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
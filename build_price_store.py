@@ -0,0 +1,22 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+from price_store import build_price_store, event_universe, DEFAULT_PRICE_STORE
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Download full daily price history into a memory-mapped price store.")
+    parser.add_argument('--output', type=str, default=DEFAULT_PRICE_STORE,
+                        help='Store directory')
+    parser.add_argument('--tickers', type=str, nargs='*', default=None,
+                        help='Tickers to store (defaults to every ticker in config/events.py)')
+    parser.add_argument('--start', type=str, default="2000-01-01")
+    parser.add_argument('--end', type=str, default=None, help='Exclusive end date (defaults to today)')
+
+    args = parser.parse_args()
+    build_price_store(args.output, args.tickers or event_universe(), args.start, args.end)
+
+if __name__ == "__main__":
+    main()
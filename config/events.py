@@ -29,6 +29,12 @@ EVENT_COLOURS = {
 
 # Declare dictionary of events
 # Each event is a dictionary with metadata
+#
+# "location" is a single point {"lat": .., "lon": ..} or a footprint:
+#   {"points": [{"lat": .., "lon": .., "weight": ..}, ...], "reduce": "weighted"}
+#   {"polygon": [[lat, lon], ...], "reduce": "max"}
+# Footprint weather is fetched per point and reduced ("mean" by default,
+# "max" or "weighted" by point weight) before computing deltas.
 EVENTS = {
     # Hurricanes
     "harvey_2017": {
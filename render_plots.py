@@ -0,0 +1,23 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+from viz import load_plot_jobs, render_plot_jobs
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Render plots deferred by run_analysis.py --plots deferred.")
+    parser.add_argument('--event_type', type=str, required=True,
+                        help='Event type whose deferred plots to render')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (defaults to the CPU count)')
+
+    args = parser.parse_args()
+    manifest_path = os.path.join("output", args.event_type, "plots", "plot_jobs.pkl")
+    jobs = load_plot_jobs(manifest_path)
+    rendered = render_plot_jobs(jobs, args.workers)
+    print(f"Rendered {rendered}/{len(jobs)} plots from {manifest_path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 #!/bin/bash
 
-# Run pooled analysis for each event type
+# Run pooled analysis for each event type; extra arguments (e.g. --resume)
+# are passed through to run_analysis.py
 for event_type in Hurricane Wildfire Flood WinterStorm; do
     echo "Running pooled analysis for $event_type"
-    python run_analysis.py --event_type "$event_type"
+    python run_analysis.py --event_type "$event_type" "$@"
 done
@@ -18,9 +18,64 @@ def main():
     parser = argparse.ArgumentParser(description="Run climate-financial event analysis.")
     parser.add_argument('--event_type', type=str, required=True,
                         help='Event type to analyze: Hurricane, Wildfire, Flood, WinterStorm')
+    parser.add_argument('--plots', type=str, default='parallel',
+                        choices=['parallel', 'inline', 'deferred', 'none'],
+                        help='How to render plots: in a process pool, serially, later via render_plots.py, or not at all')
+
+    parser.add_argument('--profile', action='store_true',
+                        help='Track peak memory per stage and dump cProfile stats to output/{event_type}/profile.prof')
+
+    parser.add_argument('--out_of_core', action='store_true',
+                        help='Stream LOEO training data from disk instead of holding the pooled frame in memory')
+    parser.add_argument('--memory_budget_mb', type=int, default=1024,
+                        help='Working-memory budget for out-of-core training chunks')
+
+    parser.add_argument('--baseline', type=str, default='mean',
+                        choices=['mean', 'zscore', 'rolling_median', 'climatology'],
+                        help='Weather delta baseline: pre-event mean, pre-event z-score, trailing 7-day median, or 5-year climatology')
+
+    parser.add_argument('--engineered_features', action='store_true',
+                        help='Train on stored lag/rolling/cumulative weather and volatility/volume market features as well')
+
+    parser.add_argument('--price_store', type=str, default=None,
+                        help='Read prices from a store built with build_price_store.py instead of downloading them')
+
+    parser.add_argument('--include_regional', action='store_true',
+                        help="Add each event's regional ETFs to its sector ETFs (each symbol once)")
+
+    parser.add_argument('--normal_model', type=str, default='capm',
+                        choices=['capm', 'ff3', 'ff5', 'market_industry'],
+                        help='Normal-return model for abnormal returns (factor files are cached in data/factors/)')
+
+    parser.add_argument('--volatility', type=str, default='none',
+                        choices=['none', 'garch', 'egarch'],
+                        help='Standardize ARs by GARCH(1,1)/EGARCH(1,1) conditional volatility and use them as the target')
+
+    parser.add_argument('--full_rebuild', action='store_true',
+                        help='Rebuild every event instead of only those added or changed since the last run')
+
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run, skipping folds and sectors already checkpointed')
+
+    parser.add_argument('--cv', type=str, nargs='+', default=['loeo'],
+                        choices=['loeo', 'rolling_origin', 'group_kfold', 'nested'],
+                        help='Evaluation schemes; the first drives the main outputs, models are shared between them')
+
+    parser.add_argument('--quantile_xgboost', action='store_true',
+                        help='Also train a quantile XGBoost model whose bands are conformalized into intervals')
+
+    parser.add_argument('--lstm', action='store_true',
+                        help='Also train the LSTM sequence model over relative-day trajectories (needs PyTorch)')
 
     args = parser.parse_args()
-    run_pooled_analysis(args.event_type, api_key)
+    run_pooled_analysis(args.event_type, api_key, plot_mode=args.plots, profile=args.profile,
+                        out_of_core=args.out_of_core, memory_budget_mb=args.memory_budget_mb,
+                        baseline=args.baseline, engineered_features=args.engineered_features,
+                        price_store_path=args.price_store, include_regional=args.include_regional,
+                        normal_model=args.normal_model,
+                        volatility_model=None if args.volatility == 'none' else args.volatility,
+                        full_rebuild=args.full_rebuild, resume=args.resume, cv_schemes=args.cv,
+                        quantile_xgboost=args.quantile_xgboost, lstm=args.lstm)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
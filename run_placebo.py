@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import time
+from config.events import EVENT_TYPE_DEFAULTS
+from price_store import PriceStore, DEFAULT_PRICE_STORE
+from placebo import ticker_markets, placebo_cars, placebo_quantiles
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Null AR/CAR distributions from random non-event dates.")
+    parser.add_argument('--event_type', type=str, required=True, choices=list(EVENT_TYPE_DEFAULTS),
+                        help='Event type whose ETFs and analysis window to use')
+    parser.add_argument('--price_store', type=str, default=DEFAULT_PRICE_STORE,
+                        help='Price store to sample placebo dates from (see price_store.build_price_store)')
+    parser.add_argument('--n_placebos', type=int, default=2000,
+                        help='Placebo event dates per ticker')
+    parser.add_argument('--max_horizon', type=int, default=20,
+                        help='Last trading day after the placebo date to report')
+    parser.add_argument('--include_regional', action='store_true',
+                        help="Include the events' regional ETFs as well as their sector ETFs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None,
+                        help='Where to write the quantiles CSV (default output/{event_type}/placebo_quantiles.csv)')
+
+    args = parser.parse_args()
+
+    store = PriceStore(args.price_store)
+    markets = ticker_markets(event_type=args.event_type, include_regional=args.include_regional)
+    start = time.perf_counter()
+    draws = placebo_cars(store, markets, n_placebos=args.n_placebos, max_horizon=args.max_horizon,
+                         pre_event_days=EVENT_TYPE_DEFAULTS[args.event_type]['pre_event_days'], seed=args.seed)
+    skipped = [t for t in markets if t not in draws]
+    if skipped:
+        print(f"No eligible placebo dates for {skipped}")
+    quantiles = placebo_quantiles(draws)
+    print(f"Computed {sum(len(d['car']) for d in draws.values())} placebo events for {len(draws)} tickers "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    output = args.output or os.path.join("output", args.event_type, "placebo_quantiles.csv")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    quantiles.to_csv(output, index=False)
+    print(f"Saved placebo quantiles to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import json
+import pandas as pd
+from dotenv import load_dotenv
+from config.events import EVENTS
+from scoring import score_events
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Score new disaster events with saved pooled models.")
+    parser.add_argument('--weather', type=str, required=True,
+                        help='CSV weather forecast with event_key, datetime and raw weather columns')
+    parser.add_argument('--events', type=str, default=None,
+                        help='JSON file of {event_key: event} in the config/events.py schema')
+    parser.add_argument('--event_keys', type=str, nargs='*', default=None,
+                        help='Configured event keys to score instead of (or in addition to) --events')
+    parser.add_argument('--event_type', type=str, default=None,
+                        help='Event type whose models to use (inferred from the events if omitted)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Where to write the scores CSV (printed if omitted)')
+
+    args = parser.parse_args()
+
+    events = {}
+    if args.events:
+        with open(args.events) as f:
+            events.update(json.load(f))
+    for key in args.event_keys or []:
+        events[key] = EVENTS[key]
+    if not events:
+        raise ValueError("Provide --events and/or --event_keys")
+
+    weather = pd.read_csv(args.weather)
+    # Only needed for models trained on the climatology baseline
+    load_dotenv()
+    scores = score_events(events, weather, event_type=args.event_type,
+                          api_key=os.getenv("VISUAL_CROSSING_API_KEY"))
+
+    if args.output:
+        scores.to_csv(args.output, index=False)
+        print(f"Saved {len(scores)} predictions to {args.output}")
+    else:
+        print(scores.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import time
+from dotenv import load_dotenv
+from service import PredictionService
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Serve AR/CAR predictions from the saved pooled models.")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--output_dir', type=str, default='output',
+                        help='Directory holding output/{event_type}/models')
+    parser.add_argument('--event_types', type=str, nargs='*', default=None,
+                        help='Event types to load (defaults to every type with saved models)')
+    parser.add_argument('--max_batch_rows', type=int, default=4096)
+    parser.add_argument('--max_wait_ms', type=float, default=5,
+                        help='How long a request may wait for others to join its batch')
+
+    args = parser.parse_args()
+    # Only needed for models trained on the climatology baseline
+    load_dotenv()
+    service = PredictionService(args.output_dir, args.event_types, args.max_batch_rows, args.max_wait_ms,
+                                api_key=os.getenv("VISUAL_CROSSING_API_KEY"))
+    port = service.start(args.host, args.port)
+    print(f"Serving predictions on http://{args.host}:{port} (POST /predict, GET /metrics, GET /health)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        service.stop()
+
+if __name__ == "__main__":
+    main()
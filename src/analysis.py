@@ -2,172 +2,389 @@ import os
 import sys
 import numpy as np
 import pandas as pd
-import pickle
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from config.events import EVENT_FEATURES
-from dataset import build_pooled_dataset, get_sector_groups
-from models import run_leave_one_event_out, MODEL_REGISTRY
-from viz import (
-    plot_actual_vs_predicted,
-    plot_feature_importance,
-    plot_car_by_event,
-    plot_cv_metrics_summary,
-)
+from dataset import build_pooled_dataset, get_sector_groups, BuildOptions
+from models import run_leave_one_event_out, MODEL_REGISTRY, OPTIONAL_MODELS
+from sequence import TORCH_AVAILABLE
+from evaluation import FoldEvaluator, EVALUATION_SCHEMES
+from outofcore import write_columnar_dataset, run_leave_one_event_out_ooc, OOC_MODEL_REGISTRY
+from viz import PlotRenderer
+from profiling import RunProfiler, stage
+from feature_store import FeatureStore, FEATURE_DEFINITIONS
+from price_store import PriceStore
+from partitions import EventPartitions
+from checkpoint import Checkpoints, run_fingerprint, atomic_write, atomic_pickle, atomic_to_csv
+from attribution import fold_attributions, save_attributions
+from intervals import add_conformal_intervals, save_interval_calibration
+from scoring import save_model_config
 
 
-def run_pooled_analysis(event_type, api_key):
+def run_pooled_analysis(event_type, api_key, plot_mode='parallel', profile=False,
+                        out_of_core=False, memory_budget_mb=1024, baseline='mean', engineered_features=False,
+                        price_store_path=None, include_regional=False, normal_model='capm', volatility_model=None,
+                        full_rebuild=False, resume=False, cv_schemes=None, quantile_xgboost=False,
+                        lstm=False):
     """
-    Main analysis orchestrator for pooled tabular regression.
+    Build the pooled dataset of an event type, cross-validate every model per
+    sector and save metrics, predictions, attributions, models and plots
+    under output/{event_type}/ (see the README for each option and output).
 
-    1. Builds a pooled dataset for all events of the given type
-    2. For each sector, runs leave-one-event-out CV with all models
-    3. Saves metrics, predictions, models, and plots
+    plot_mode: viz.PLOT_MODES entry; profile: also track peak memory and cProfile.
+    out_of_core, memory_budget_mb: stream LOEO training data from disk (XGBoost and OLS only).
+    baseline: baselines.BASELINE_MODES entry for the weather deltas.
+    engineered_features: join the feature store's features onto the pooled dataset.
+    price_store_path: price_store.PriceStore to read prices from instead of downloading.
+    include_regional: add each event's regional ETFs to its sector ETFs.
+    normal_model, volatility_model: AR model (returns.NORMAL_RETURN_MODELS) and
+        'garch'/'egarch' to standardize it.
+    full_rebuild, resume: discard the event partitions; reuse checkpointed folds and sectors.
+    cv_schemes: evaluation.EVALUATION_SCHEMES to run (default ['loeo']); the first drives the exports.
+    quantile_xgboost, lstm: also train these models.OPTIONAL_MODELS.
     """
-    # Build pooled dataset
-    pooled_df = build_pooled_dataset(event_type, api_key)
+    cv_schemes = list(cv_schemes or ['loeo'])
+    unknown = [s for s in cv_schemes if s not in EVALUATION_SCHEMES]
+    if unknown:
+        raise ValueError(f"Unknown evaluation schemes {unknown}, expected some of {EVALUATION_SCHEMES}")
+    if out_of_core and cv_schemes != ['loeo']:
+        raise ValueError("Out-of-core training only supports leave-one-event-out CV")
+    if out_of_core and (quantile_xgboost or lstm):
+        raise ValueError("Out-of-core training does not support the quantile XGBoost or LSTM models")
+    if lstm and not TORCH_AVAILABLE:
+        raise ImportError("The LSTM model needs PyTorch (pip install torch)")
 
-    # Output directory
     output_dir = os.path.join("output", event_type)
     os.makedirs(output_dir, exist_ok=True)
 
+    profiler = RunProfiler(track_memory=profile, cprofile=profile).start()
+    try:
+        _run_pooled_analysis(event_type, api_key, output_dir, plot_mode, out_of_core, memory_budget_mb,
+                             baseline, engineered_features, price_store_path, include_regional, normal_model,
+                             volatility_model, full_rebuild, resume, cv_schemes, quantile_xgboost, lstm)
+    finally:
+        profiler.stop()
+        profiler.write_report(os.path.join(output_dir, "run_report.json"),
+                              event_type=event_type, plot_mode=plot_mode, out_of_core=out_of_core,
+                              baseline=baseline, engineered_features=engineered_features,
+                              include_regional=include_regional, normal_model=normal_model,
+                              volatility_model=volatility_model, full_rebuild=full_rebuild,
+                              resume=resume, cv_schemes=cv_schemes, quantile_xgboost=quantile_xgboost,
+                              lstm=lstm)
+        profiler.dump_profile(os.path.join(output_dir, "profile.prof"))
+
+
+def metrics_table(fold_results, overall_metrics):
+    """Per-fold and OVERALL metrics of every model as one DataFrame."""
+    metrics_rows = []
+    for fold in fold_results:
+        for model_name in overall_metrics:
+            m = fold[f'metrics_{model_name}']
+            metrics_rows.append({
+                'held_out_event': fold['event_key'],
+                'model': model_name,
+                **m,
+            })
+    # Add overall row
+    for model_name, m in overall_metrics.items():
+        metrics_rows.append({
+            'held_out_event': 'OVERALL',
+            'model': model_name,
+            **m,
+        })
+    return pd.DataFrame(metrics_rows)
+
+
+def predictions_table(fold_results, model_names, target='ar'):
+    """
+    Out-of-fold AR predictions per (event, relative_day) with cumulative CAR
+    columns, and AR interval bounds when the folds carry them. The target
+    column names what the ar_/car_ columns hold: 'ar', or 'sar' when the
+    models were trained on volatility-standardized ARs.
+    """
+    pred_rows = []
+    for fold in fold_results:
+        for i in range(len(fold['y_true'])):
+            row = {
+                'event_key': fold['event_key'],
+                'relative_day': fold['relative_days'][i],
+                'target': target,
+                'ar_true': fold['y_true'][i],
+            }
+            for model_name in model_names:
+                row[f'ar_pred_{model_name}'] = fold[f'y_pred_{model_name}'][i]
+                if f'lo_{model_name}' in fold:
+                    row[f'ar_lo_{model_name}'] = fold[f'lo_{model_name}'][i]
+                    row[f'ar_hi_{model_name}'] = fold[f'hi_{model_name}'][i]
+            pred_rows.append(row)
+
+    preds_df = pd.DataFrame(pred_rows).sort_values(['event_key', 'relative_day'])
+
+    # Compute CAR columns
+    for model_name in model_names:
+        preds_df[f'car_pred_{model_name}'] = preds_df.groupby('event_key')[f'ar_pred_{model_name}'].cumsum()
+    preds_df['car_true'] = preds_df.groupby('event_key')['ar_true'].cumsum()
+    return preds_df
+
+
+def _run_pooled_analysis(event_type, api_key, output_dir, plot_mode, out_of_core, memory_budget_mb,
+                         baseline, engineered_features, price_store_path, include_regional, normal_model,
+                         volatility_model, full_rebuild, resume, cv_schemes, quantile_xgboost, lstm):
+    # Weather features depend on the delta baseline and market features on the
+    # ticker universe, so both are part of the store version
+    feature_store = None
+    if engineered_features:
+        feature_store = FeatureStore(os.path.join(output_dir, "feature_store"),
+                                     definitions={**FEATURE_DEFINITIONS, 'baseline': baseline,
+                                                  'include_regional': include_regional})
+
+    # Build pooled dataset
+    with stage('build_pooled_dataset'):
+        price_store = PriceStore(price_store_path) if price_store_path else None
+        partitions = EventPartitions(os.path.join(output_dir, "partitions"))
+        if full_rebuild:
+            partitions.clear()
+        build_options = BuildOptions(baseline=baseline, feature_store=feature_store,
+                                     include_regional=include_regional, normal_model=normal_model,
+                                     volatility_model=volatility_model)
+        pooled_df = build_pooled_dataset(event_type, api_key, build_options, price_store=price_store,
+                                         partitions=partitions)
+
+    engineered = []
+    if engineered_features:
+        with stage('feature_join'):
+            for table in ['weather', 'market']:
+                pooled_df = feature_store.point_in_time_join(pooled_df, table)
+                # Only columns of this run's events are features
+                engineered += feature_store.feature_columns(table, pooled_df['event_key'].unique())
+            empty = [c for c in engineered if c not in pooled_df.columns or pooled_df[c].isna().all()]
+            if empty:
+                raise ValueError(f"Engineered features {empty} are empty for every {event_type} row; "
+                                 f"rebuild the feature store with --full_rebuild")
+
     # Save full pooled dataset
     pooled_path = os.path.join(output_dir, "pooled_dataset.csv")
-    pooled_df.to_csv(pooled_path, index=False)
+    with stage('export') as counters:
+        atomic_to_csv(pooled_df, pooled_path, index=False)
+        counters['rows'] = len(pooled_df)
     print(f"\nSaved pooled dataset to {pooled_path}")
 
     # Determine feature columns (delta_* columns from EVENT_FEATURES)
     raw_features = EVENT_FEATURES.get(event_type, ['temp', 'humidity', 'precip', 'windspeed', 'pressure'])
     delta_features = [f"delta_{f}" for f in raw_features]
     features = ['relative_day'] + [f for f in delta_features if f in pooled_df.columns]
-    target = 'ar'
+    features += [f for f in engineered if f in pooled_df.columns]
+    target = 'sar' if volatility_model else 'ar'
+    optional = {'xgboost_quantile': quantile_xgboost, 'lstm': lstm}
+    registry = {**MODEL_REGISTRY, **{m: OPTIONAL_MODELS[m] for m, on in optional.items() if on}}
+    if out_of_core:
+        skipped = [m for m in registry if m not in OOC_MODEL_REGISTRY]
+        if skipped:
+            print(f"\nWarning: out-of-core training cannot stream {skipped} from disk; "
+                  f"training {list(OOC_MODEL_REGISTRY)} only")
+        registry = {m: fn for m, fn in registry.items() if m in OOC_MODEL_REGISTRY}
 
     print(f"\nFeatures: {features}")
     print(f"Target: {target}")
 
+    # Checkpoints are only valid for the same pooled data, features and models
+    fingerprint = run_fingerprint(pooled_df, features=features, target=target, out_of_core=out_of_core,
+                                  cv_schemes=cv_schemes, models=list(registry), fold_attributions=True)
+    checkpoints = Checkpoints(os.path.join(output_dir, "checkpoints"), fingerprint, resume=resume)
+
+    plots_dir = os.path.join(output_dir, "plots")
+    renderer = PlotRenderer(plot_mode, manifest_path=os.path.join(plots_dir, "plot_jobs.pkl"))
+
     # Per-sector analysis
-    sector_groups = get_sector_groups(pooled_df)
+    if out_of_core:
+        # Stream the saved CSV into per-sector files and release the in-memory frame
+        with stage('write_columnar'):
+            columnar = write_columnar_dataset(pooled_path, os.path.join(output_dir, "columnar"), features, target)
+        del pooled_df
+        sector_groups = {sector: None for sector in columnar.sectors}
+    else:
+        sector_groups = get_sector_groups(pooled_df)
+    # Scoring and the service read back what the saved models predict
+    save_model_config(os.path.join(output_dir, "models"), target=target, baseline=build_options.baseline,
+                      baseline_options=build_options.baseline_options,
+                      feature_definitions=feature_store.definitions if feature_store is not None else None)
     all_sector_metrics = []
+    # Plot jobs queued per sector; they stay checkpointed until rendered
+    queued_plots = {}
 
     for sector, sector_df in sector_groups.items():
-        n_events = sector_df['event_key'].nunique()
+        if out_of_core:
+            n_rows = columnar.sector_rows[sector]
+            n_events = len(columnar.sector_events[sector])
+        else:
+            n_rows = len(sector_df)
+            n_events = sector_df['event_key'].nunique()
         print(f"\n{'='*60}")
-        print(f"Sector: {sector} | {len(sector_df)} rows | {n_events} events")
+        print(f"Sector: {sector} | {n_rows} rows | {n_events} events")
         print(f"{'='*60}")
 
         if n_events < 2:
             print(f"  Skipping {sector}: need at least 2 events for leave-one-out CV")
             continue
 
-        # Check that all features exist
-        available_features = [f for f in features if f in sector_df.columns]
-        if len(available_features) < len(features):
-            missing = set(features) - set(available_features)
-            print(f"  Warning: missing features {missing}, using {available_features}")
-        features_to_use = available_features
+        if checkpoints.has(f"sectors/{sector}"):
+            print(f"  Skipping {sector}: already exported (resumed)")
+            all_sector_metrics.extend(checkpoints.load(f"sectors/{sector}"))
+            if checkpoints.has(f"plots/{sector}"):
+                queued_plots[sector] = [renderer.submit(name, **kwargs)
+                                        for name, kwargs in checkpoints.load(f"plots/{sector}")]
+            continue
 
-        # Drop rows with NaN in features or target
-        sector_df = sector_df.dropna(subset=features_to_use + [target])
+        if out_of_core:
+            features_to_use = columnar.features
+            with stage('sector_cv', sector=sector):
+                evaluations = {'loeo': run_leave_one_event_out_ooc(
+                    columnar, sector, memory_budget_mb, checkpoint=checkpoints.scope(f"folds/{sector}"),
+                    attributions=True
+                )}
+        else:
+            # Check that all features exist
+            available_features = [f for f in features if f in sector_df.columns]
+            if len(available_features) < len(features):
+                missing = set(features) - set(available_features)
+                print(f"  Warning: missing features {missing}, using {available_features}")
+            features_to_use = available_features
 
-        # Run leave-one-event-out CV
-        fold_results, overall_metrics, final_models = run_leave_one_event_out(
-            sector_df, features_to_use, target, event_col='event_key'
-        )
+            # Drop rows with NaN in features or target
+            sector_df = sector_df.dropna(subset=features_to_use + [target])
+
+            # Run leave-one-event-out CV (and any other evaluation schemes)
+            with stage('sector_cv', sector=sector):
+                if cv_schemes == ['loeo']:
+                    evaluations = {'loeo': run_leave_one_event_out(
+                        sector_df, features_to_use, target, event_col='event_key',
+                        checkpoint=checkpoints.scope(f"folds/{sector}"), registry=registry, attributions=True
+                    )}
+                else:
+                    # One evaluator per sector, so the schemes share trained models
+                    evaluator = FoldEvaluator(sector_df, features_to_use, target, event_col='event_key',
+                                              registry=registry)
+                    evaluations = {
+                        scheme: evaluator.evaluate(scheme, checkpoint=checkpoints.scope(f"folds/{sector}/{scheme}"),
+                                                   attributions=scheme == cv_schemes[0])
+                        for scheme in cv_schemes
+                    }
+                    print(f"  Models trained: {evaluator.stats['trained']} "
+                          f"(reused {evaluator.stats['reused']}, warm-started {evaluator.stats['warm_started']})")
+        # Conformal intervals from the CV residuals; the first scheme calibrates the final models
+        calibrations = {scheme: add_conformal_intervals(scheme_folds, scheme_metrics)
+                        for scheme, (scheme_folds, scheme_metrics, _) in evaluations.items()}
+        fold_results, overall_metrics, final_models = evaluations[cv_schemes[0]]
+        model_names = list(overall_metrics)
 
         # Print metrics summary
+        sector_metrics = []
         for model_name, metrics in overall_metrics.items():
-            print(f"  {model_name:15s} | RMSE: {metrics['rmse']:.6f} | MAE: {metrics['mae']:.6f} | R2: {metrics['r2']:.4f}")
-            all_sector_metrics.append({
+            # Too few events leave no interval to cover
+            coverage = f"{metrics['coverage']:.3f}" if np.isfinite(metrics['coverage']) else "n/a"
+            print(f"  {model_name:15s} | RMSE: {metrics['rmse']:.6f} | MAE: {metrics['mae']:.6f} | R2: {metrics['r2']:.4f} "
+                  f"| coverage: {coverage}")
+            sector_metrics.append({
                 'sector': sector,
                 'model': model_name,
                 **metrics,
             })
+        all_sector_metrics.extend(sector_metrics)
+        for scheme, (_, scheme_metrics, _) in list(evaluations.items())[1:]:
+            for model_name, metrics in scheme_metrics.items():
+                print(f"  {model_name:15s} | RMSE: {metrics['rmse']:.6f} | MAE: {metrics['mae']:.6f} | "
+                      f"R2: {metrics['r2']:.4f} ({scheme})")
 
         # --- Save outputs ---
+        with stage('export', sector=sector):
+            # Metrics
+            metrics_dir = os.path.join(output_dir, "metrics")
+            os.makedirs(metrics_dir, exist_ok=True)
+            metrics_df = metrics_table(fold_results, overall_metrics)
+            atomic_to_csv(metrics_df, os.path.join(metrics_dir, f"{sector}_cv_metrics.csv"), index=False)
 
-        # Metrics
-        metrics_dir = os.path.join(output_dir, "metrics")
-        os.makedirs(metrics_dir, exist_ok=True)
-        metrics_rows = []
-        for fold in fold_results:
-            for model_name in MODEL_REGISTRY:
-                m = fold[f'metrics_{model_name}']
-                metrics_rows.append({
-                    'held_out_event': fold['event_key'],
-                    'model': model_name,
-                    **m,
-                })
-        # Add overall row
-        for model_name, m in overall_metrics.items():
-            metrics_rows.append({
-                'held_out_event': 'OVERALL',
-                'model': model_name,
-                **m,
-            })
-        metrics_df = pd.DataFrame(metrics_rows)
-        metrics_df.to_csv(os.path.join(metrics_dir, f"{sector}_cv_metrics.csv"), index=False)
-
-        # Predictions
-        preds_dir = os.path.join(output_dir, "predictions")
-        os.makedirs(preds_dir, exist_ok=True)
-        pred_rows = []
-        for fold in fold_results:
-            for i in range(len(fold['y_true'])):
-                row = {
-                    'event_key': fold['event_key'],
-                    'relative_day': fold['relative_days'][i],
-                    'ar_true': fold['y_true'][i],
-                }
-                for model_name in MODEL_REGISTRY:
-                    row[f'ar_pred_{model_name}'] = fold[f'y_pred_{model_name}'][i]
-                pred_rows.append(row)
-
-        preds_df = pd.DataFrame(pred_rows).sort_values(['event_key', 'relative_day'])
-
-        # Compute CAR columns
-        for model_name in MODEL_REGISTRY:
-            preds_df[f'car_pred_{model_name}'] = preds_df.groupby('event_key')[f'ar_pred_{model_name}'].cumsum()
-        preds_df['car_true'] = preds_df.groupby('event_key')['ar_true'].cumsum()
-
-        preds_df.to_csv(os.path.join(preds_dir, f"{sector}_cv_predictions.csv"), index=False)
-
-        # Models
-        model_dir = os.path.join(output_dir, "models")
-        os.makedirs(model_dir, exist_ok=True)
-        for model_name, model in final_models.items():
-            model_path = os.path.join(model_dir, f"{sector}_{model_name}.pkl")
-            with open(model_path, "wb") as f:
-                pickle.dump(model, f)
-
-        # Plots
-        plots_dir = os.path.join(output_dir, "plots")
-        os.makedirs(plots_dir, exist_ok=True)
-
-        # Scatter plots (actual vs predicted) for XGBoost and RF
-        all_true = np.concatenate([f['y_true'] for f in fold_results])
-        for model_name in ['xgboost', 'random_forest']:
-            all_pred = np.concatenate([f[f'y_pred_{model_name}'] for f in fold_results])
-            plot_actual_vs_predicted(
-                all_true, all_pred, model_name, sector, event_type, plots_dir
-            )
-
-        # Feature importance (XGBoost)
-        if 'xgboost' in final_models:
-            plot_feature_importance(
-                final_models['xgboost'], features_to_use, sector, event_type, plots_dir
-            )
-
-        # CAR by event
-        plot_car_by_event(preds_df, sector, event_type, plots_dir)
+            # Predictions
+            preds_dir = os.path.join(output_dir, "predictions")
+            os.makedirs(preds_dir, exist_ok=True)
+            preds_df = predictions_table(fold_results, model_names, target)
+            atomic_to_csv(preds_df, os.path.join(preds_dir, f"{sector}_cv_predictions.csv"), index=False)
+
+            # Additional evaluation schemes get their own metrics and predictions, in
+            # subdirectories so they are never read as sectors of the first scheme
+            for scheme, (scheme_folds, scheme_metrics, _) in list(evaluations.items())[1:]:
+                os.makedirs(os.path.join(metrics_dir, scheme), exist_ok=True)
+                os.makedirs(os.path.join(preds_dir, scheme), exist_ok=True)
+                atomic_to_csv(metrics_table(scheme_folds, scheme_metrics),
+                              os.path.join(metrics_dir, scheme, f"{sector}_cv_metrics.csv"), index=False)
+                atomic_to_csv(predictions_table(scheme_folds, list(scheme_metrics), target),
+                              os.path.join(preds_dir, scheme, f"{sector}_cv_predictions.csv"), index=False)
+
+            # Models
+            model_dir = os.path.join(output_dir, "models")
+            os.makedirs(model_dir, exist_ok=True)
+            for model_name, model in final_models.items():
+                atomic_pickle(model, os.path.join(model_dir, f"{sector}_{model_name}.pkl"))
+            save_interval_calibration(os.path.join(model_dir, f"{sector}_intervals.json"),
+                                      calibrations[cv_schemes[0]])
+
+            # Per-row attributions of the CV predictions, computed with each fold's models
+            attribution_keys, attributions = fold_attributions(fold_results)
+            if attributions:
+                attribution_dir = os.path.join(output_dir, "attributions")
+                os.makedirs(attribution_dir, exist_ok=True)
+                with atomic_write(os.path.join(attribution_dir, f"{sector}.npz"), "wb") as f:
+                    save_attributions(f, attribution_keys, features_to_use, attributions)
+
+            # Plots, checkpointed with the sector so a resumed run still renders them
+            plot_jobs = []
+            # Scatter plots (actual vs predicted) for XGBoost and RF
+            all_true = np.concatenate([f['y_true'] for f in fold_results])
+            for model_name in [m for m in ['xgboost', 'random_forest'] if m in model_names]:
+                all_pred = np.concatenate([f[f'y_pred_{model_name}'] for f in fold_results])
+                plot_jobs.append(('actual_vs_predicted', dict(
+                    y_true=all_true, y_pred=all_pred, model_name=model_name, target=target,
+                    sector=sector, event_type=event_type, save_dir=plots_dir,
+                )))
+
+            # Feature importance (XGBoost)
+            if 'xgboost' in final_models:
+                plot_jobs.append(('feature_importance', dict(
+                    model=final_models['xgboost'], feature_names=features_to_use,
+                    sector=sector, event_type=event_type, save_dir=plots_dir,
+                )))
+
+            # Mean absolute attribution per feature and model
+            if attributions:
+                plot_jobs.append(('attribution_summary', dict(
+                    attributions=attributions, feature_names=features_to_use,
+                    sector=sector, event_type=event_type, save_dir=plots_dir,
+                )))
+
+            # CAR by event
+            plot_jobs.append(('car_by_event', dict(predictions_df=preds_df, sector=sector, event_type=event_type,
+                                                   save_dir=plots_dir)))
+            checkpoints.save(f"plots/{sector}", plot_jobs)
+
+            # Mark the sector done only once all of its files are in place
+            checkpoints.save(f"sectors/{sector}", sector_metrics)
+
+        # Queued on the renderer so CV for the next sector is not held up
+        queued_plots[sector] = [renderer.submit(name, **kwargs) for name, kwargs in plot_jobs]
 
     # Cross-model summary plot
     if all_sector_metrics:
         summary_df = pd.DataFrame(all_sector_metrics)
-        plots_dir = os.path.join(output_dir, "plots")
-        plot_cv_metrics_summary(summary_df, event_type, plots_dir)
+        renderer.submit('cv_metrics_summary', summary_df=summary_df, event_type=event_type, save_dir=plots_dir)
+
+    with stage('plots_wait'):
+        failed = renderer.close()
+    if plot_mode in ('inline', 'parallel'):
+        # Only plots that failed stay pending for a resumed run
+        for sector, jobs in queued_plots.items():
+            checkpoints.save(f"plots/{sector}", [job for job in jobs if any(job is f for f in failed)])
 
     print(f"\n{'='*60}")
     print(f"Analysis complete for {event_type}. Outputs in {output_dir}/")
@@ -0,0 +1,254 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from math import factorial
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# Upper bound on the (rows x leaves x path features) working arrays of one TreeSHAP chunk
+TREE_SHAP_CHUNK_ELEMENTS = 4_000_000
+
+
+def xgboost_attributions(model, X, background=None, groups=None):
+    """XGBoost's native TreeSHAP (pred_contribs): returns (values (n, F), base (n,))."""
+    contribs = model.predict(xgb.DMatrix(X), pred_contribs=True)
+    return contribs[:, :-1], contribs[:, -1]
+
+
+def quantile_xgboost_attributions(model, X, background=None, groups=None):
+    """TreeSHAP of a models.QuantileBooster's median, its point prediction."""
+    contribs = model.booster.predict(xgb.DMatrix(X), pred_contribs=True)
+    median = contribs[:, model.quantiles.index(0.5)]
+    return median[:, :-1], median[:, -1]
+
+
+def linear_attributions(model, X, background=None, groups=None):
+    """
+    Exact SHAP values of a linear model with independent features:
+    coef_j * (x_j - mean_j), with means taken over `background` rows
+    (default X).
+    """
+    background = X if background is None else background
+    if hasattr(background, 'columns'):
+        background = background[list(model.feature_names_in_)]
+    mean = np.asarray(background, dtype=float).mean(axis=0)
+    values = (np.asarray(X, dtype=float) - mean) * model.coef_
+    base = float(model.intercept_ + model.coef_ @ mean)
+    return values, np.full(len(X), base)
+
+
+def _tree_leaf_paths(tree, weight):
+    """
+    Per leaf of a fitted sklearn tree, its distinct path features with the
+    (lo, hi] interval a row must fall in to follow the path, the product of
+    cover ratios of the splits on each feature (the "zero fraction") and the
+    leaf value scaled by `weight`.
+    """
+    left, right = tree.children_left, tree.children_right
+    cover = tree.weighted_n_node_samples
+    leaves = []
+    stack = [(0, {})]
+    while stack:
+        node, path = stack.pop()
+        if left[node] == -1:
+            leaves.append((path, weight * tree.value[node, 0, 0]))
+            continue
+        f, t = tree.feature[node], tree.threshold[node]
+        for child, is_left in ((left[node], True), (right[node], False)):
+            lo, hi, z = path.get(f, (-np.inf, np.inf, 1.0))
+            lo, hi = (lo, min(hi, t)) if is_left else (max(lo, t), hi)
+            stack.append((child, {**path, f: (lo, hi, z * cover[child] / cover[node])}))
+    return leaves
+
+
+def _forest_leaves(model):
+    """Leaves of every tree stacked into padded (L, D) arrays; padding entries are null players."""
+    leaves = []
+    expected = 0.0
+    weight = 1.0 / len(model.estimators_)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaves += _tree_leaf_paths(tree, weight)
+        is_leaf = tree.children_left == -1
+        expected += weight * np.sum(tree.value[is_leaf, 0, 0] * tree.weighted_n_node_samples[is_leaf]) \
+            / tree.weighted_n_node_samples[0]
+    depth = max(1, max(len(path) for path, _ in leaves))
+    n_leaves = len(leaves)
+    features = np.zeros((n_leaves, depth), dtype=np.int64)
+    lo = np.full((n_leaves, depth), -np.inf)
+    hi = np.full((n_leaves, depth), np.inf)
+    zero = np.ones((n_leaves, depth))
+    values = np.empty(n_leaves)
+    for i, (path, value) in enumerate(leaves):
+        for j, (f, (a, b, z)) in enumerate(path.items()):
+            features[i, j], lo[i, j], hi[i, j], zero[i, j] = f, a, b, z
+        values[i] = value
+    return features, lo, hi, zero, values, expected
+
+
+def _path_shap(one, zero):
+    """
+    Path-dependent TreeSHAP weights of leaf path features, vectorized over
+    everything but the path: `one` (..., L, D) holds o_j (1 if the row
+    follows every split on path feature j), `zero` (L, D) the cover
+    fractions z_j.
+
+    For one leaf, E[f | x_S] is the leaf value times the product of o_j for
+    j in S and z_j for j not in S, so feature i's Shapley value is
+    (o_i - z_i) times a weighted sum of the coefficients of
+    prod_{j != i} (z_j + o_j t). Returns those per-slot factors (..., L, D).
+    """
+    depth = zero.shape[1]
+    # Coefficients of prod_j (z_j + o_j t), lowest degree first
+    poly = np.zeros(one.shape[:-1] + (depth + 1,))
+    poly[..., 0] = 1.0
+    for j in range(depth):
+        shifted = poly[..., :-1] * one[..., j:j + 1]
+        poly *= zero[:, j, None]
+        poly[..., 1:] += shifted
+
+    weights = np.array([factorial(k) * factorial(depth - k - 1) / factorial(depth) for k in range(depth)])
+    phi = np.empty(one.shape)
+    for i in range(depth):
+        o, z = one[..., i], zero[:, i]
+        # Divide (z_i + o_i t) back out: backwards when o_i = 1 (stable as z_i <= 1), else by z_i
+        quotient = np.empty(one.shape)
+        quotient[..., depth - 1] = poly[..., depth]
+        for k in range(depth - 1, 0, -1):
+            quotient[..., k - 1] = poly[..., k] - z * quotient[..., k]
+        quotient = np.where(o[..., None] > 0, quotient, poly[..., :depth] / z[:, None])
+        phi[..., i] = (o - z) * (quotient @ weights)
+    return phi
+
+
+class _ForestExplainer:
+    """
+    A forest's leaves as padded (L, D) path arrays (padding slots are null
+    players: o = z = 1). o is binary, so a leaf's contributions only depend
+    on which of its D path features a row satisfies; when it fits, the
+    contributions of all 2^D patterns of every leaf are tabulated once and
+    explaining a row is a lookup per leaf.
+    """
+
+    def __init__(self, model, max_table_elements=TREE_SHAP_CHUNK_ELEMENTS * 4):
+        self.features, self.lo, self.hi, self.zero, self.values, self.expected = _forest_leaves(model)
+        n_leaves, depth = self.features.shape
+        self.table = None
+        if (2 ** depth) * n_leaves * (depth + 1) <= max_table_elements:
+            patterns = (np.arange(2 ** depth)[:, None] >> np.arange(depth)) & 1
+            one = np.broadcast_to(patterns[:, None, :], (2 ** depth, n_leaves, depth)).astype(np.float64)
+            self.table = _path_shap(one, self.zero) * self.values[None, :, None]
+
+    def shap_values(self, X, n_features):
+        n_leaves, depth = self.features.shape
+        x = X[:, self.features]                                   # (n, L, D)
+        inside = (x > self.lo) & (x <= self.hi)
+        if self.table is not None:
+            codes = inside.astype(np.int64) @ (1 << np.arange(depth))
+            phi = self.table[codes, np.arange(n_leaves)]
+        else:
+            phi = _path_shap(inside.astype(np.float64), self.zero) * self.values[None, :, None]
+        # Scatter leaf/path-slot contributions onto feature columns
+        one_hot = np.zeros((n_leaves * depth, n_features))
+        one_hot[np.arange(n_leaves * depth), self.features.ravel()] = 1.0
+        return phi.reshape(len(X), -1) @ one_hot
+
+
+def forest_attributions(model, X, background=None, groups=None, n_jobs=None):
+    """
+    Exact path-dependent TreeSHAP for a sklearn RandomForestRegressor,
+    vectorized over rows and every leaf of every tree; row chunks run on
+    `n_jobs` threads. Returns (values (n, F), base (n,)).
+    """
+    explainer = _ForestExplainer(model)
+    # Trees route rows on float32 features
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    n_leaves, depth = explainer.features.shape
+    per_row = n_leaves * (depth + 1) * (1 if explainer.table is not None else depth)
+    rows_per_chunk = max(1, TREE_SHAP_CHUNK_ELEMENTS // per_row)
+    chunks = [X[i:i + rows_per_chunk] for i in range(0, len(X), rows_per_chunk)]
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        parts = list(pool.map(lambda c: explainer.shap_values(c, X.shape[1]), chunks))
+    shap_values = np.concatenate(parts) if parts else np.zeros((0, X.shape[1]))
+    return shap_values, np.full(len(X), explainer.expected)
+
+
+def sequence_attributions(model, X, background=None, groups=None):
+    """Integrated gradients of a sequence.SequenceRegressor over each row's trajectory so far."""
+    return model.attributions(X, groups, background)
+
+
+ATTRIBUTION_METHODS = {
+    'xgboost': xgboost_attributions,
+    'random_forest': forest_attributions,
+    'ols': linear_attributions,
+    'xgboost_quantile': quantile_xgboost_attributions,
+    'lstm': sequence_attributions,
+}
+
+
+def compute_attributions(models, X, background=None, groups=None):
+    """
+    Per-row attributions of every model with an ATTRIBUTION_METHODS entry,
+    against the `background` rows the models were trained on (default X).
+    groups holds each row's event key, for sequence models. Returns
+    {model_name: (values (n, F), base (n,))}; base + values.sum(1) equals
+    the model's prediction.
+    """
+    return {name: ATTRIBUTION_METHODS[name](model, X, background, groups) for name, model in models.items()
+            if name in ATTRIBUTION_METHODS}
+
+
+def fold_attributions(fold_results):
+    """
+    Attributions stored with the CV folds (fold['attributions'], from the
+    fold's own models on its held-out rows) stacked over folds. Returns the
+    row keys (event_key, relative_day) and {model_name: (values, base)} of
+    the models every fold has.
+    """
+    folds = [f for f in fold_results if 'attributions' in f]
+    if not folds:
+        return None, {}
+    keys = pd.DataFrame({
+        'event_key': np.concatenate([np.repeat(f['event_key'], len(f['y_true'])) for f in folds]),
+        'relative_day': np.concatenate([f['relative_days'] for f in folds]),
+    })
+    names = [m for m in folds[0]['attributions'] if all(m in f['attributions'] for f in folds)]
+    attributions = {
+        m: (np.concatenate([f['attributions'][m][0] for f in folds]),
+            np.concatenate([f['attributions'][m][1] for f in folds]))
+        for m in names
+    }
+    return keys, attributions
+
+
+def save_attributions(file, keys, feature_names, attributions):
+    """
+    Write attributions as one compressed .npz: the row keys (event_key,
+    relative_day), feature names, and per model float32 {model}_values
+    (n, F) and {model}_base (n,) arrays. `file` is a path or binary file.
+    """
+    arrays = {
+        'event_key': np.asarray(keys['event_key'], dtype=str),
+        'relative_day': keys['relative_day'].values,
+        'features': np.asarray(feature_names, dtype=str),
+    }
+    for name, (values, base) in attributions.items():
+        arrays[f"{name}_values"] = np.asarray(values, dtype=np.float32)
+        arrays[f"{name}_base"] = np.asarray(base, dtype=np.float32)
+    np.savez_compressed(file, **arrays)
+
+
+def load_attributions(path, model_name):
+    """
+    One model's attributions from save_attributions as a DataFrame: the row
+    keys, base and an attr_{feature} column per feature.
+    """
+    with np.load(path) as data:
+        if f"{model_name}_values" not in data:
+            raise ValueError(f"No attributions for '{model_name}' in {path}")
+        df = pd.DataFrame(data[f"{model_name}_values"], columns=[f"attr_{f}" for f in data['features']])
+        df.insert(0, 'base', data[f"{model_name}_base"])
+        df.insert(0, 'relative_day', data['relative_day'])
+        df.insert(0, 'event_key', data['event_key'])
+    return df
@@ -0,0 +1,114 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+
+def _nanmean(values, axis):
+    # All-NaN slices (e.g. an event with no pre-event days) give NaN quietly
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def _mean_baseline(stack, **options):
+    baseline = _nanmean(np.where(stack.pre_mask[:, :, None], stack.values, np.nan), axis=1)
+    return stack.values - baseline[:, None, :]
+
+
+def _zscore_baseline(stack, **options):
+    pre = np.where(stack.pre_mask[:, :, None], stack.values, np.nan)
+    mean = _nanmean(pre, axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        std = np.nanstd(pre, axis=1, ddof=1)
+    std = np.where(std > 0, std, np.nan)
+    return (stack.values - mean[:, None, :]) / std[:, None, :]
+
+
+def _rolling_median_baseline(stack, window=7, **options):
+    """Deviation from the median of the previous `window` days."""
+    n_events, _, n_vars = stack.values.shape
+    padded = np.concatenate([np.full((n_events, window, n_vars), np.nan), stack.values], axis=1)
+    # windows[:, t] covers days t-window .. t-1 of the original axis
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)[:, :-1]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median = np.nanmedian(windows, axis=-1)
+    return stack.values - median
+
+
+def _climatology_baseline(stack, **options):
+    """Deviation from the same calendar days averaged over prior years."""
+    if stack.climatology is None:
+        raise ValueError("climatology baseline needs history; call WeatherStack.add_climatology first")
+    return stack.values - _nanmean(stack.climatology, axis=1)
+
+
+# Baseline modes for weather deltas; each maps a WeatherStack to an (event, day, variable) array
+BASELINE_MODES = {
+    'mean': _mean_baseline,
+    'zscore': _zscore_baseline,
+    'rolling_median': _rolling_median_baseline,
+    'climatology': _climatology_baseline,
+}
+
+
+class WeatherStack:
+    """
+    Weather of many events stacked into one (event, day, variable) array.
+
+    Events are padded with NaN to the longest window, so every baseline mode is
+    a handful of array operations over all events at once. Stack once and call
+    deltas() per mode to sweep baseline choices.
+
+    frames: dict of {event_key: weather DataFrame indexed by date}
+    event_dates: dict of {event_key: event date}; days before it form the pre-event baseline
+    """
+
+    def __init__(self, frames, event_dates):
+        self.keys = list(frames)
+        self.columns = []
+        for df in frames.values():
+            self.columns.extend(c for c in df.columns if c not in self.columns)
+        self.event_columns = [list(frames[k].columns) for k in self.keys]
+        self.indexes = [frames[k].index for k in self.keys]
+
+        n_days = max((len(ix) for ix in self.indexes), default=0)
+        self.values = np.full((len(self.keys), n_days, len(self.columns)), np.nan)
+        self.pre_mask = np.zeros((len(self.keys), n_days), dtype=bool)
+        for i, key in enumerate(self.keys):
+            df = frames[key].reindex(columns=self.columns)
+            self.values[i, :len(df)] = df.values.astype(float)
+            self.pre_mask[i, :len(df)] = df.index < pd.Timestamp(event_dates[key])
+        self.climatology = None
+
+    def add_climatology(self, history):
+        """
+        history: dict of {event_key: [DataFrame, ...]}, one frame per prior year
+        already shifted onto the event's own dates (see weather.fetch_climatology).
+        """
+        n_years = max((len(frames) for frames in history.values()), default=0)
+        clim = np.full((len(self.keys), max(n_years, 1)) + self.values.shape[1:], np.nan)
+        for i, key in enumerate(self.keys):
+            for y, df in enumerate(history.get(key, [])):
+                aligned = df.reindex(index=self.indexes[i], columns=self.columns)
+                clim[i, y, :len(aligned)] = aligned.values.astype(float)
+        self.climatology = clim
+        return self
+
+    def deltas(self, mode='mean', **options):
+        """Delta array for every event under one baseline mode (see BASELINE_MODES)."""
+        if mode not in BASELINE_MODES:
+            raise ValueError(f"Unknown baseline mode '{mode}', expected one of {list(BASELINE_MODES)}")
+        return BASELINE_MODES[mode](self, **options)
+
+    def delta_frames(self, mode='mean', **options):
+        """deltas() unstacked to {event_key: DataFrame} with 'delta_' columns, as compute_weather_deltas returns."""
+        values = self.deltas(mode, **options)
+        frames = {}
+        for i, key in enumerate(self.keys):
+            index = self.indexes[i]
+            df = pd.DataFrame(values[i, :len(index)], index=index, columns=self.columns)[self.event_columns[i]]
+            df.columns = [f"delta_{col}" for col in df.columns]
+            frames[key] = df
+        return frames
@@ -0,0 +1,93 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+from contextlib import contextmanager
+import pandas as pd
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Open `path` for writing through a temporary file in the same directory,
+    renamed over `path` only once the block completes. A crash mid-write
+    leaves the previous file (or none), never a truncated one.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def atomic_pickle(obj, path):
+    with atomic_write(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def atomic_to_csv(df, path, **kwargs):
+    with atomic_write(path, "w") as f:
+        df.to_csv(f, **kwargs)
+
+
+def run_fingerprint(df, **settings):
+    """
+    Short hash of a dataset's contents and the settings a run was made with,
+    so checkpoints from a different dataset or configuration are never reused.
+    """
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:12]
+
+
+class Checkpoints:
+    """
+    Completed units of work (CV folds, sector exports) as pickles under
+    {root}/{fingerprint}/{unit}.pkl. Every save is atomic, so a unit that
+    has a file is complete; with resume=False, earlier checkpoints are
+    discarded up front.
+    """
+
+    def __init__(self, root, fingerprint, resume=False):
+        self.root = root
+        self.path = os.path.join(root, fingerprint)
+        if not resume and os.path.isdir(root):
+            shutil.rmtree(root)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _unit_path(self, unit):
+        return os.path.join(self.path, f"{unit}.pkl")
+
+    def has(self, unit):
+        return os.path.exists(self._unit_path(unit))
+
+    def load(self, unit):
+        with open(self._unit_path(unit), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, unit, obj):
+        os.makedirs(os.path.dirname(self._unit_path(unit)), exist_ok=True)
+        atomic_pickle(obj, self._unit_path(unit))
+
+    def scope(self, prefix):
+        """View of the checkpoints whose units live under `prefix/`."""
+        return _ScopedCheckpoints(self, prefix)
+
+
+class _ScopedCheckpoints:
+    def __init__(self, checkpoints, prefix):
+        self._checkpoints = checkpoints
+        self._prefix = prefix
+
+    def has(self, unit):
+        return self._checkpoints.has(f"{self._prefix}/{unit}")
+
+    def load(self, unit):
+        return self._checkpoints.load(f"{self._prefix}/{unit}")
+
+    def save(self, unit, obj):
+        self._checkpoints.save(f"{self._prefix}/{unit}", obj)
@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
 import traceback
 from datetime import timedelta
@@ -8,110 +9,285 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-from config.events import EVENTS, EVENT_FEATURES
+from config.events import EVENTS, EVENT_FEATURES, EVENT_TYPE_DEFAULTS, ESTIMATION_DAYS
 from market import fetch_market_data
-from returns import estimate_market_model, compute_abnormal_returns, save_market_model_params
-from weather import fetch_visualcrossing_weather, compute_weather_deltas
+from returns import (estimate_market_model, compute_abnormal_returns, save_market_model_params,
+                     estimate_factor_model, compute_factor_abnormal_returns, load_model_factors)
+from weather import fetch_event_weather, fetch_weather_batch, fetch_climatology, compute_weather_deltas
+from baselines import WeatherStack
+from feature_store import compute_weather_features, compute_market_features, TABLE_KEYS
+from planner import event_market_window, event_tickers, plan_market_fetches, MarketDataCache
+from profiling import instrument, stage
+from trading_calendar import get_calendar
+from volatility import standardize_abnormal_returns, VolatilityParamCache
+from partitions import event_config_hash
 
 
-def build_event_observation(event_key, api_key):
+def get_analysis_window(event):
     """
-    Process a single event and return a DataFrame of (sector, relative_day, delta_weather..., ar) rows.
+    Return (analysis_start, end_date) for an event as 'YYYY-MM-DD' strings.
+    The window opens `pre_event_days` calendar days before the event date.
     """
+    pre_event_days = EVENT_TYPE_DEFAULTS[event['type']]['pre_event_days']
+    event_dt = pd.to_datetime(event['event_date'])
+    analysis_start = (event_dt - timedelta(days=pre_event_days)).strftime('%Y-%m-%d')
+    return analysis_start, event['end_date']
+
+
+class BuildOptions:
+    """
+    How pooled rows are built; every option is part of each event's partition hash.
+
+    baseline, baseline_options: baselines.BASELINE_MODES entry for the weather
+        deltas and its keyword options, e.g. {'window': 7} or {'years': 5}
+    feature_store: feature_store.FeatureStore to (re)write engineered features to
+    include_regional: add each event's regional ETFs to its sector ETFs
+    normal_model: returns.NORMAL_RETURN_MODELS entry for the abnormal returns
+    volatility_model: 'garch' or 'egarch' to add ar_sigma and the standardized AR (sar)
+    """
+
+    def __init__(self, baseline='mean', baseline_options=None, feature_store=None, include_regional=False,
+                 normal_model='capm', volatility_model=None):
+        self.baseline = baseline
+        self.baseline_options = dict(baseline_options or {})
+        self.feature_store = feature_store
+        self.include_regional = include_regional
+        self.normal_model = normal_model
+        self.volatility_model = volatility_model
+
+    def hash_options(self):
+        """The options as hashed into partitions.event_config_hash."""
+        return {'baseline': self.baseline, 'baseline_options': self.baseline_options,
+                'include_regional': self.include_regional, 'normal_model': self.normal_model,
+                'volatility_model': self.volatility_model,
+                'feature_version': self.feature_store.version if self.feature_store is not None else None}
+
+
+@instrument('build_event_observation', event_arg='event_key')
+def build_event_observation(event_key, api_key, options=None, market_cache=None, delta_weather_df=None,
+                            factor_data=None, vol_cache=None):
+    """
+    Process a single event and return a DataFrame of (sector, relative_day, relative_trading_day,
+    date, ar, delta_weather...) rows, plus ar_sigma and sar with a volatility model.
+    Prices come from the planner.MarketDataCache when given; without
+    delta_weather_df, weather is fetched and taken against the pre-event mean.
+    """
+    options = options or BuildOptions()
     event = EVENTS[event_key]
     print(f"  Building observations for {event['name']}...")
 
     market = event['index']
-    tickers = event['sector_etfs']
+    tickers = event_tickers(event, options.include_regional)
     end_date = event['end_date']
     event_date = event['event_date']
-    lat = event['location']['lat']
-    lon = event['location']['lon']
     disaster_type = event['type']
 
     # Derive analysis window start from event type defaults
-    pre_event_days = EVENT_TYPE_DEFAULTS[disaster_type]['pre_event_days']
-    event_dt = pd.to_datetime(event_date)
-    analysis_start = (event_dt - timedelta(days=pre_event_days)).strftime('%Y-%m-%d')
+    analysis_start, _ = get_analysis_window(event)
 
     # Go back far enough to cover ESTIMATION_DAYS trading days (~1.5x calendar days)
-    estimation_start = (event_dt - timedelta(days=int(ESTIMATION_DAYS * 1.5))).strftime('%Y-%m-%d')
+    estimation_start, _ = event_market_window(event)
 
     # Fetch market and sector data from estimation_start (wide window for CAPM fitting)
-    market_df = fetch_market_data([market], estimation_start, end_date)[market]
-    sector_dict = fetch_market_data(tickers, estimation_start, end_date)
+    fetch = market_cache.get if market_cache is not None else fetch_market_data
+    market_df = fetch([market], estimation_start, end_date)[market]
+    sector_dict = fetch(tickers, estimation_start, end_date)
 
-    # Estimate market model on pre-event window using ESTIMATION_DAYS trading days
+    # Estimate the normal-return model on pre-event window using ESTIMATION_DAYS trading days
     estimation_window = market_df.index[market_df.index < event_date][-ESTIMATION_DAYS:]
-    model_params = estimate_market_model(market_df, sector_dict, estimation_window)
+    if options.normal_model == 'capm':
+        model_params = None
+        if market_cache is not None:
+            model_params = market_cache.market_model(market, list(sector_dict), estimation_window)
+        if model_params is None:
+            model_params = estimate_market_model(market_df, sector_dict, estimation_window)
 
-    # Compute abnormal returns over the full fetched range
-    abnormal_returns = compute_abnormal_returns(market_df, sector_dict, model_params)
+        # Compute abnormal returns over the full fetched range
+        abnormal_returns = compute_abnormal_returns(market_df, sector_dict, model_params)
+    else:
+        model_params = estimate_factor_model(options.normal_model, market_df, sector_dict, estimation_window,
+                                             factor_data)
+        abnormal_returns = compute_factor_abnormal_returns(market_df, sector_dict, model_params, factor_data)
 
-    # Fetch weather for the analysis window only (analysis_start to end_date)
-    weather_df = fetch_visualcrossing_weather(api_key, lat, lon, analysis_start, end_date, disaster_type)
-    delta_weather_df = compute_weather_deltas(weather_df, event_date)
+    standardized = None
+    if options.volatility_model is not None:
+        standardized = standardize_abnormal_returns(abnormal_returns, estimation_window, options.volatility_model,
+                                                    vol_cache, event_date)
+
+    feature_store = options.feature_store
+    if feature_store is not None:
+        feature_store.write('market', compute_market_features(event_key, event_date, sector_dict, estimation_window,
+                                                               feature_store.definitions),
+                            {event_key: event_config_hash(event)})
 
-    # Align on common trading dates within the analysis window
-    analysis_start_dt = pd.to_datetime(analysis_start)
-    analysis_end_dt = pd.to_datetime(end_date)
+    # Fetch weather for the analysis window only (analysis_start to end_date)
+    if delta_weather_df is None:
+        weather_df = fetch_event_weather(api_key, event['location'], analysis_start, end_date, disaster_type)
+        delta_weather_df = compute_weather_deltas(weather_df, event_date)
 
-    first_sector = list(abnormal_returns.keys())[0]
-    common_index = abnormal_returns[first_sector].index
-    common_index = common_index[(common_index >= analysis_start_dt) & (common_index <= analysis_end_dt)]
-    for ar_series in abnormal_returns.values():
-        common_index = common_index.intersection(ar_series.index)
-    common_index = common_index.intersection(delta_weather_df.index)
+    # Align on the NYSE sessions of the analysis window: each series is placed
+    # by session ordinal, and a session is kept when every series has it
+    calendar = get_calendar()
+    sessions = calendar.sessions_in_range(analysis_start, end_date)
+    first_ordinal = calendar.ordinals(sessions[:1])[0] if len(sessions) else 0
 
-    delta_weather_aligned = delta_weather_df.reindex(common_index).ffill().bfill()
+    def session_positions(index):
+        index = pd.DatetimeIndex(index)
+        in_window = (index >= analysis_start) & (index <= end_date)
+        in_window[in_window] = calendar.is_session(index[in_window])
+        return in_window, calendar.ordinals(index[in_window]) - first_ordinal
 
-    # Build rows for each sector
-    rows = []
-    for ticker in tickers:
+    tickers = list(tickers)
+    present = np.ones(len(sessions), dtype=bool)
+    ar_values = np.full((len(tickers), len(sessions)), np.nan)
+    sar_values = np.full((len(tickers), len(sessions)), np.nan)
+    sigma_values = np.full((len(tickers), len(sessions)), np.nan)
+    for i, ticker in enumerate(tickers):
         ar = abnormal_returns[ticker]
         if isinstance(ar, pd.DataFrame):
             ar = ar.squeeze()
-        ar = ar.reindex(common_index).dropna()
+        mask, positions = session_positions(ar.index)
+        ar_values[i, positions] = ar.values[mask]
+        if standardized is not None:
+            sar, sigma = standardized[ticker]
+            sar_values[i, positions] = sar.values[mask]
+            sigma_values[i, positions] = sigma.values[mask]
+        hit = np.zeros(len(sessions), dtype=bool)
+        hit[positions] = True
+        present &= hit
+
+    mask, positions = session_positions(delta_weather_df.index)
+    weather_values = np.full((len(sessions), delta_weather_df.shape[1]), np.nan)
+    weather_values[positions] = delta_weather_df.values[mask]
+    hit = np.zeros(len(sessions), dtype=bool)
+    hit[positions] = True
+    present &= hit
 
-        for date in ar.index:
-            relative_day = (date - pd.to_datetime(event_date)).days
-            row = {
-                'event_key': event_key,
-                'sector': ticker,
-                'relative_day': relative_day,
-                'ar': ar.loc[date],
-            }
-            # Add delta weather features
-            for col in delta_weather_aligned.columns:
-                row[col] = delta_weather_aligned.loc[date, col]
-            rows.append(row)
+    dates = sessions[present]
+    weather_aligned = pd.DataFrame(weather_values[present]).ffill().bfill().values
 
-    return pd.DataFrame(rows)
+    # One row per (sector, session) with a valid AR, sector-major as before
+    ar_common = ar_values[:, present]
+    valid = ~np.isnan(ar_common)
+    ticker_idx, day_idx = np.nonzero(valid)
+    event_dates = np.repeat(np.datetime64(event_date, 'D'), len(dates))
+    rows = pd.DataFrame({
+        'event_key': event_key,
+        'sector': np.asarray(tickers, dtype=object)[ticker_idx],
+        'relative_day': calendar.relative_calendar_days(dates, event_dates)[day_idx],
+        'relative_trading_day': calendar.relative_trading_days(dates, event_dates)[day_idx],
+        'date': dates[day_idx],
+        'ar': ar_common[valid],
+    })
+    if standardized is not None:
+        rows['sar'] = sar_values[:, present][valid]
+        rows['ar_sigma'] = sigma_values[:, present][valid]
+    # Add delta weather features
+    for j, col in enumerate(delta_weather_df.columns):
+        rows[col] = weather_aligned[day_idx, j]
 
+    return rows
 
-def build_pooled_dataset(event_type, api_key):
+
+def build_pooled_dataset(event_type, api_key, options=None, share_market_data=True, price_store=None,
+                         partitions=None):
     """
-    Build a pooled tabular dataset for all events of a given disaster type.
-    Each row is an (event, sector, relative_day) observation.
+    Build a pooled tabular dataset for all events of a given disaster type,
+    as configured by a BuildOptions. Each row is an (event, sector, relative_day) observation.
+
+    Prices are planned across events (share_market_data) or sliced from a
+    price_store.PriceStore; weather is fetched in one concurrent batch. With a
+    partitions.EventPartitions, only new or changed events are rebuilt (see
+    the README).
     """
+    options = options or BuildOptions()
     print(f"\nBuilding pooled dataset for {event_type} events...\n")
 
+    events = {k: e for k, e in EVENTS.items() if e['type'].lower() == event_type.lower()}
+    feature_store = options.feature_store
+
+    hashes = None
+    if partitions is not None:
+        hash_options = {**options.hash_options(),
+                        'price_store': price_store.version if price_store is not None else None}
+        hashes = {k: event_config_hash(e, hash_options) for k, e in events.items()}
+        stale, removed = partitions.diff(hashes)
+        if feature_store is not None:
+            # A partition is only up to date while the store still holds its event's features
+            stale += [k for k, e in events.items() if k not in stale and not all(
+                feature_store.has(table, k, event_config_hash(e)) for table in TABLE_KEYS)]
+        for event_key in removed:
+            partitions.remove(event_key)
+        print(f"  Partitions: {len(events) - len(stale)} up to date, {len(stale)} to build, {len(removed)} removed")
+        events = {k: events[k] for k in stale}
+
+    factor_data = load_model_factors(options.normal_model)
+
+    market_cache = None
+    if share_market_data or price_store is not None:
+        fetch = price_store.fetch if price_store is not None else fetch_market_data
+        with stage('prefetch_market_data'):
+            market_cache = MarketDataCache(plan_market_fetches(events, options.include_regional), fetch).prefetch()
+
+    with stage('prefetch_weather'):
+        windows = {}
+        for event_key, event in events.items():
+            analysis_start, end_date = get_analysis_window(event)
+            windows[event_key] = (event['location'], analysis_start, end_date, event['type'])
+        print(f"  Fetching weather for {len(windows)} events...")
+        weather = fetch_weather_batch(api_key, windows)
+
+    baseline, baseline_options = options.baseline, dict(options.baseline_options)
+    with stage('weather_deltas', baseline=baseline):
+        fetched = {k: df for k, df in weather.items() if not isinstance(df, Exception)}
+        stack = WeatherStack(fetched, {k: events[k]['event_date'] for k in fetched})
+        if baseline == 'climatology':
+            years = baseline_options.pop('years', 5)
+            print(f"  Fetching {years} years of climatology for {len(fetched)} events...")
+            history = fetch_climatology(api_key, {k: windows[k] for k in fetched}, years)
+            for key, frames in history.items():
+                if isinstance(frames, Exception):
+                    weather[key] = frames
+            stack.add_climatology({k: f for k, f in history.items() if not isinstance(f, Exception)})
+        deltas = stack.delta_frames(baseline, **baseline_options)
+
+    if feature_store is not None:
+        with stage('weather_features'):
+            # Events being built are rewritten so features never outlive an edit to the event
+            if deltas:
+                feature_store.write('weather', pd.concat(
+                    [compute_weather_features(k, weather[k], deltas[k], feature_store.definitions) for k in deltas],
+                    ignore_index=True), {k: event_config_hash(events[k]) for k in deltas})
+
+    order = list(events)
+    vol_cache = None
+    if options.volatility_model is not None:
+        order.sort(key=lambda k: pd.Timestamp(events[k]['event_date']))
+        vol_cache = VolatilityParamCache()
+
     frames = []
-    for event_key, event in EVENTS.items():
-        if event['type'].lower() != event_type.lower():
-            continue
+    for event_key in order:
         try:
-            df = build_event_observation(event_key, api_key)
+            if isinstance(weather[event_key], Exception):
+                raise weather[event_key]
+            df = build_event_observation(event_key, api_key, options, market_cache, deltas[event_key],
+                                         factor_data, vol_cache)
+            if partitions is not None:
+                partitions.write(event_key, df, hashes[event_key])
             frames.append(df)
         except Exception as e:
             print(f"  Failed to process {event_key}: {e}")
             traceback.print_exc()
             continue
 
-    if not frames:
-        raise ValueError(f"No events successfully processed for type '{event_type}'")
+    if partitions is not None:
+        # Rebuilt events replace their partitions; the rest are read back as stored
+        pooled = partitions.read(hashes)
+    else:
+        pooled = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
-    pooled = pd.concat(frames, ignore_index=True)
+    if pooled.empty:
+        raise ValueError(f"No events successfully processed for type '{event_type}'")
 
     n_events = pooled['event_key'].nunique()
     n_sectors = pooled['sector'].nunique()
@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from models import MODEL_REGISTRY, compute_metrics, predict_model, sequence_kwargs, early_stopping_split
+from profiling import instrument, stage
+from attribution import compute_attributions
+
+
+def plan_loeo(events):
+    """Hold out each event in turn, train on all others."""
+    return [{'name': e, 'train': [o for o in events if o != e], 'test': [e]} for e in events]
+
+
+def plan_rolling_origin(events, min_train_events=3):
+    """
+    Walk forward through the events in date order: each event is predicted
+    by a model trained only on the events before it. The first
+    min_train_events events (at least one) are only ever used for training.
+    """
+    start = max(1, min(min_train_events, len(events) - 1))
+    return [{'name': events[i], 'train': list(events[:i]), 'test': [events[i]]} for i in range(start, len(events))]
+
+
+def plan_group_kfold(events, n_splits=5):
+    """
+    Split the events into n_splits contiguous blocks in date order; each
+    block is predicted by a model trained on the other blocks.
+    """
+    blocks = np.array_split(np.arange(len(events)), min(n_splits, len(events)))
+    return [
+        {'name': f"fold{k}", 'train': [events[i] for i in range(len(events)) if i not in block],
+         'test': [events[i] for i in block]}
+        for k, block in enumerate(blocks)
+    ]
+
+
+FOLD_PLANNERS = {
+    'loeo': plan_loeo,
+    'rolling_origin': plan_rolling_origin,
+    'group_kfold': plan_group_kfold,
+}
+
+EVALUATION_SCHEMES = list(FOLD_PLANNERS) + ['nested']
+
+# Candidate parameters per model for nested CV; the first entry is the default
+TUNING_GRIDS = {
+    'xgboost': [{'max_depth': 4}, {'max_depth': 2}, {'max_depth': 6}],
+    'random_forest': [{'max_depth': 6}, {'max_depth': 3}, {'max_depth': 10}],
+    'ols': [{}],
+}
+
+# Models whose trainer can continue from a model fitted on a subset of the events
+WARM_START_MODELS = {'xgboost', 'xgboost_quantile'}
+
+
+def plan_folds(events, scheme, **options):
+    """Folds of a scheme as a list of {'name', 'train': [events], 'test': [events]}."""
+    if scheme not in FOLD_PLANNERS:
+        raise ValueError(f"Unknown fold scheme '{scheme}', expected one of {list(FOLD_PLANNERS)}")
+    return FOLD_PLANNERS[scheme](list(events), **options)
+
+
+def _params_key(params):
+    return tuple(sorted((params or {}).items()))
+
+
+class FoldEvaluator:
+    """
+    Cross-validation of one sector's rows under any of EVALUATION_SCHEMES,
+    sharing trained models between schemes.
+
+    Every model is cached under (model, parameters, set of training events),
+    so a training set that recurs across schemes, nested inner loops or the
+    final all-event fit is trained once. OLS is solved from per-event
+    sufficient statistics (X'X, X'y), so any training set costs one small
+    solve. With warm_start, XGBoost continues boosting from the cached model
+    of the largest training subset (e.g. the previous rolling origin), which
+    makes results depend on the order in which schemes are evaluated. Only
+    models trained without the events of the new fit's early-stopping
+    validation rows qualify, so early stopping never scores rows the
+    initial model was fitted on.
+
+    registry maps model names to trainers (default models.MODEL_REGISTRY).
+
+    Events are ordered by their first date, which defines "earlier" for
+    rolling-origin folds.
+    """
+
+    def __init__(self, df, features, target, event_col='event_key', models=None, warm_start=True,
+                 registry=None):
+        self.df = df
+        self.features = features
+        self.target = target
+        self.event_col = event_col
+        self.registry = MODEL_REGISTRY if registry is None else registry
+        self.models = list(models or self.registry)
+        self.warm_start = warm_start
+        event_values = df[event_col].values
+        if 'date' in df.columns:
+            first_dates = df.groupby(event_col)['date'].min()
+            self.events = sorted(first_dates.index, key=lambda e: (pd.Timestamp(first_dates[e]), e))
+        else:
+            self.events = list(pd.unique(event_values))
+        self._rows = {e: np.flatnonzero(event_values == e) for e in self.events}
+        self._cache = {}
+        self._ols_stats = None
+        self.stats = {'trained': 0, 'reused': 0, 'warm_started': 0}
+
+    def _subset(self, events):
+        # Original row order, as in models.run_leave_one_event_out
+        return self.df.iloc[np.sort(np.concatenate([self._rows[e] for e in events]))]
+
+    def _fit_ols(self, train_events):
+        if self._ols_stats is None:
+            self._ols_stats = {}
+            for event, rows in self._rows.items():
+                part = self.df.iloc[rows]
+                A = np.column_stack([np.ones(len(part)), part[self.features].values.astype(float)])
+                self._ols_stats[event] = (A.T @ A, A.T @ part[self.target].values.astype(float))
+        gram = sum(self._ols_stats[e][0] for e in train_events)
+        moment = sum(self._ols_stats[e][1] for e in train_events)
+        beta = np.linalg.lstsq(gram, moment, rcond=None)[0]
+        model = LinearRegression()
+        model.intercept_, model.coef_ = beta[0], beta[1:]
+        model.n_features_in_ = len(self.features)
+        model.feature_names_in_ = np.asarray(self.features, dtype=object)
+        return model
+
+    def _warm_start_model(self, model_name, params, allowed_events):
+        # The cached model of the same parameters with the largest training set inside allowed_events
+        best = None
+        for (name, key, events), model in self._cache.items():
+            if name == model_name and key == _params_key(params) and events <= allowed_events:
+                if best is None or len(events) > len(best[0]):
+                    best = (events, model)
+        return None if best is None else best[1]
+
+    def train(self, model_name, train_events, params=None):
+        """Model trained on `train_events`, from the cache when already trained."""
+        train_events = frozenset(train_events)
+        key = (model_name, _params_key(params), train_events)
+        if key in self._cache:
+            self.stats['reused'] += 1
+            return self._cache[key]
+
+        with stage(f"train_{model_name}", events=len(train_events)) as counters:
+            if model_name == 'ols' and not params:
+                model = self._fit_ols(train_events)
+            else:
+                train = self._subset(train_events)
+                X, y = train[self.features], train[self.target]
+                kwargs = {'params': params, **sequence_kwargs(model_name, train[self.event_col],
+                                                              train[self.event_col].iloc[:1])}
+                if self.warm_start and model_name in WARM_START_MODELS:
+                    validation_events = set(train[self.event_col].iloc[early_stopping_split(len(train)):])
+                    init_model = self._warm_start_model(model_name, params, train_events - validation_events)
+                    if init_model is not None:
+                        kwargs['init_model'] = init_model
+                        self.stats['warm_started'] += 1
+                # Registry trainers also predict a test set; one row is enough
+                _, model = self.registry[model_name](X, y, X.iloc[:1], y.iloc[:1], **kwargs)
+            counters['rows'] = sum(len(self._rows[e]) for e in train_events)
+        self.stats['trained'] += 1
+        self._cache[key] = model
+        return model
+
+    def _predict_fold(self, fold, params, attributions=False):
+        trained = {m: self.train(m, fold['train'], params.get(m)) for m in self.models}
+        background = self._subset(fold['train'])[self.features] if attributions else None
+        results = []
+        for event in fold['test']:
+            test = self._subset([event])
+            y_true = test[self.target].values
+            result = {
+                'event_key': event,
+                'fold': fold['name'],
+                'test_index': test.index,
+                'relative_days': test['relative_day'].values,
+                'y_true': y_true,
+            }
+            for model_name, model in trained.items():
+                preds = np.asarray(predict_model(model, test[self.features], test[self.event_col].values),
+                                   dtype=float)
+                result[f'y_pred_{model_name}'] = preds
+                if hasattr(model, 'predict_interval'):
+                    result[f'q_lo_{model_name}'], result[f'q_hi_{model_name}'] = \
+                        model.predict_interval(test[self.features])
+                result[f'metrics_{model_name}'] = compute_metrics(y_true, preds)
+                if params.get(model_name):
+                    result[f'params_{model_name}'] = params[model_name]
+            if attributions:
+                with stage('attribution', fold=event) as counters:
+                    result['attributions'] = compute_attributions(trained, test[self.features], background,
+                                                                  test[self.event_col].values)
+                    counters['rows'] = len(test)
+            results.append(result)
+        return results
+
+    def tune(self, train_events, inner='rolling_origin', **inner_options):
+        """
+        Parameters per model from TUNING_GRIDS with the lowest RMSE under
+        `inner` CV within train_events (the grid default when there are too
+        few events for inner folds).
+        """
+        if inner == 'rolling_origin':
+            inner_options.setdefault('min_train_events', 2)
+        ordered = [e for e in self.events if e in set(train_events)]
+        folds = plan_folds(ordered, inner, **inner_options) if len(ordered) > 2 else []
+        best = {}
+        for model_name in self.models:
+            grid = TUNING_GRIDS.get(model_name, [{}])
+            if len(grid) == 1 or not folds:
+                best[model_name] = grid[0]
+                continue
+            scores = []
+            for params in grid:
+                y_true, y_pred = [], []
+                for fold in folds:
+                    model = self.train(model_name, fold['train'], params)
+                    test = self._subset(fold['test'])
+                    y_true.append(test[self.target].values)
+                    y_pred.append(predict_model(model, test[self.features], test[self.event_col].values))
+                scores.append(compute_metrics(np.concatenate(y_true), np.concatenate(y_pred))['rmse'])
+            best[model_name] = grid[int(np.argmin(scores))]
+        return best
+
+    @instrument('evaluate')
+    def evaluate(self, scheme='loeo', checkpoint=None, attributions=False, **options):
+        """
+        Cross-validate every model under `scheme` (one of EVALUATION_SCHEMES).
+
+        'nested' takes outer='rolling_origin' and inner='rolling_origin'
+        (with inner_options): parameters are tuned by inner CV on each outer
+        training set, and the final models by inner CV over all events.
+        Other options go to the fold planner.
+
+        Returns (fold_results, overall_metrics, final_models) like
+        models.run_leave_one_event_out, with one fold result per held-out
+        event; with a checkpoint, finished folds are saved and reloaded. With
+        attributions, each result also holds the per-row attributions of
+        its fold's models on its rows (see attribution.fold_attributions).
+        """
+        nested = scheme == 'nested'
+        if nested:
+            outer = options.pop('outer', 'rolling_origin')
+            inner = options.pop('inner', 'rolling_origin')
+            inner_options = options.pop('inner_options', None) or {}
+            folds = plan_folds(self.events, outer, **options)
+        else:
+            if scheme not in FOLD_PLANNERS:
+                raise ValueError(f"Unknown evaluation scheme '{scheme}', expected one of {EVALUATION_SCHEMES}")
+            folds = plan_folds(self.events, scheme, **options)
+
+        fold_results = []
+        for fold in folds:
+            name = str(fold['name'])
+            if checkpoint is not None and checkpoint.has(name):
+                fold_results.extend(checkpoint.load(name))
+                continue
+            params = self.tune(fold['train'], inner, **inner_options) if nested else {}
+            results = self._predict_fold(fold, params, attributions)
+            if checkpoint is not None:
+                checkpoint.save(name, results)
+            fold_results.extend(results)
+
+        overall_metrics = {}
+        for model_name in self.models:
+            all_true = np.concatenate([f['y_true'] for f in fold_results])
+            all_pred = np.concatenate([f[f'y_pred_{model_name}'] for f in fold_results])
+            overall_metrics[model_name] = compute_metrics(all_true, all_pred)
+
+        final_params = self.tune(self.events, inner, **inner_options) if nested else {}
+        final_models = {m: self.train(m, self.events, final_params.get(m)) for m in self.models}
+        return fold_results, overall_metrics, final_models
@@ -0,0 +1,207 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+# Feature definitions; the store version is a hash of this dict, so changing a
+# definition starts a new version directory instead of mixing old and new values.
+FEATURE_DEFINITIONS = {
+    'weather': {
+        'lags': [1, 2],               # delta_* shifted by calendar days
+        'rolling_windows': [3],       # trailing mean of delta_* over calendar days
+        'cumulative': ['precip'],     # running total of the raw variable since analysis start
+    },
+    'market': {
+        'volume_window': 20,          # pre-event trading days for the volume baseline
+        'return_lags': [1],           # sector return of previous trading days
+    },
+}
+
+# Key columns per table; market features are per sector
+TABLE_KEYS = {
+    'weather': ['event_key'],
+    'market': ['event_key', 'sector'],
+}
+
+
+def feature_version(definitions=FEATURE_DEFINITIONS):
+    """Short hash identifying a set of feature definitions."""
+    payload = json.dumps(definitions, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:10]
+
+
+def market_feature_columns(definitions=FEATURE_DEFINITIONS):
+    """Names of the columns compute_market_features produces."""
+    return ['pre_event_vol', 'volume_ratio'] + [f"return_lag{lag}" for lag in definitions['market']['return_lags']]
+
+
+def point_in_time_join(rows, features, keys, date_col='date'):
+    """
+    Left-join `features` onto `rows` as of each row's date: the latest feature
+    row with date <= rows[date_col] for the same keys, never a later one.
+    """
+    if features.empty:
+        return rows.copy()
+    left = rows.assign(_row=np.arange(len(rows)), _date=pd.to_datetime(rows[date_col]))
+    right = features.rename(columns={'date': '_date'})
+    right['_date'] = pd.to_datetime(right['_date'])
+    joined = pd.merge_asof(left.sort_values('_date'), right.sort_values('_date'),
+                           on='_date', by=keys, direction='backward')
+    return joined.sort_values('_row').drop(columns=['_row', '_date']).reset_index(drop=True)
+
+
+def _series(df, column):
+    # yfinance may return single-column frames under a MultiIndex
+    values = df[column]
+    return values.squeeze(axis=1) if isinstance(values, pd.DataFrame) else values
+
+
+def compute_weather_features(event_key, weather_df, delta_df, definitions=FEATURE_DEFINITIONS):
+    """
+    Weather features of one event keyed by (event_key, date):
+    lag{k}_delta_*, roll{w}_delta_* and cum_{var} for the raw cumulative variables.
+    """
+    spec = definitions['weather']
+    delta_df = delta_df.sort_index()
+    features = {}
+    for col in delta_df.columns:
+        for lag in spec['lags']:
+            # Before the window starts the variable is taken to sit at its baseline
+            features[f"lag{lag}_{col}"] = delta_df[col].shift(lag, fill_value=0.0)
+        for window in spec['rolling_windows']:
+            features[f"roll{window}_{col}"] = delta_df[col].rolling(window, min_periods=1).mean()
+    for var in spec['cumulative']:
+        if var in weather_df.columns:
+            features[f"cum_{var}"] = weather_df[var].reindex(delta_df.index).fillna(0).cumsum()
+
+    out = pd.DataFrame(features, index=delta_df.index)
+    out.insert(0, 'date', delta_df.index)
+    out.insert(0, 'event_key', event_key)
+    return out.reset_index(drop=True)
+
+
+def compute_market_features(event_key, event_date, sector_dict, estimation_window, definitions=FEATURE_DEFINITIONS):
+    """
+    Market features of one event keyed by (event_key, sector, date), from the
+    Return/Volume columns kept by fetch_market_data:
+    pre_event_vol (std of returns over the estimation window), volume_ratio
+    (volume against its pre-event mean) and return_lag{k}.
+    """
+    spec = definitions['market']
+    event_date = pd.Timestamp(event_date)
+    frames = []
+    for ticker, df in sector_dict.items():
+        returns = _series(df, 'Return')
+        volume = _series(df, 'Volume').astype(float)
+        pre_volume = volume[volume.index < event_date].tail(spec['volume_window']).mean()
+
+        features = {
+            'pre_event_vol': returns.reindex(estimation_window).std(),
+            'volume_ratio': volume / pre_volume if pre_volume > 0 else np.nan,
+        }
+        for lag in spec['return_lags']:
+            features[f"return_lag{lag}"] = returns.shift(lag)
+
+        out = pd.DataFrame(features, index=df.index)
+        out.insert(0, 'date', df.index)
+        out.insert(0, 'sector', ticker)
+        out.insert(0, 'event_key', event_key)
+        frames.append(out.reset_index(drop=True))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class FeatureStore:
+    """
+    Local feature store under {root}/{version}/{table}/{event_key}.pkl.
+
+    Each table is partitioned by event, so writing an event replaces only its
+    own file. manifest.json records, per table and event, the config hash
+    (partitions.event_config_hash) the partition was computed from and its
+    feature columns, so a partition left over from an edited event does not
+    count as stored. Tables are read back once into memory and refreshed when
+    a partition changes. point_in_time_join attaches, to every row, the latest
+    feature values dated on or before the row's date.
+    """
+
+    def __init__(self, root=os.path.join("output", "feature_store"), definitions=FEATURE_DEFINITIONS):
+        self.definitions = definitions
+        self.version = feature_version(definitions)
+        self.path = os.path.join(root, self.version)
+        self._tables = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, "definitions.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as f:
+                json.dump(definitions, f, indent=2)
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _table_dir(self, table):
+        if table not in TABLE_KEYS:
+            raise ValueError(f"Unknown feature table '{table}', expected one of {list(TABLE_KEYS)}")
+        return os.path.join(self.path, table)
+
+    def has(self, table, event_key, config_hash=None):
+        """Whether an event's partition is stored, and with config_hash, built from that hash."""
+        if not os.path.exists(os.path.join(self._table_dir(table), f"{event_key}.pkl")):
+            return False
+        return config_hash is None or self.manifest.get(table, {}).get(event_key, {}).get('hash') == config_hash
+
+    def write(self, table, features, config_hashes):
+        """
+        Write (or replace) the partitions of every event in `features`,
+        recording each under its hash in {event_key: config hash}.
+        """
+        table_dir = self._table_dir(table)
+        os.makedirs(table_dir, exist_ok=True)
+        columns = [c for c in features.columns if c not in TABLE_KEYS[table] + ['date']]
+        with self._lock:
+            for event_key, group in features.groupby('event_key'):
+                path = os.path.join(table_dir, f"{event_key}.pkl")
+                tmp_path = path + ".tmp"
+                group.reset_index(drop=True).to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+                self.manifest.setdefault(table, {})[event_key] = {'hash': config_hashes[event_key],
+                                                                  'columns': columns}
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+
+    def read(self, table, event_keys=None):
+        """All stored rows of a table (optionally for some events), sorted by key and date."""
+        paths = sorted(glob.glob(os.path.join(self._table_dir(table), "*.pkl")))
+        stamp = tuple((p, os.path.getmtime(p)) for p in paths)
+        with self._lock:
+            cached = self._tables.get(table)
+            if cached is None or cached[0] != stamp:
+                frames = [pd.read_pickle(p) for p in paths]
+                df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TABLE_KEYS[table] + ['date'])
+                cached = (stamp, df.sort_values(TABLE_KEYS[table] + ['date'], ignore_index=True))
+                self._tables[table] = cached
+        df = cached[1]
+        if event_keys is not None:
+            df = df[df['event_key'].isin(list(event_keys))]
+        return df
+
+    def feature_columns(self, table, event_keys=None):
+        """Feature columns of a table, or only those the given events' partitions were written with."""
+        if event_keys is None:
+            df = self.read(table)
+            return [c for c in df.columns if c not in TABLE_KEYS[table] + ['date']]
+        stored = self.manifest.get(table, {})
+        columns = {}
+        for event_key in event_keys:
+            columns.update(dict.fromkeys(stored.get(event_key, {}).get('columns', [])))
+        return list(columns)
+
+    def point_in_time_join(self, rows, table, date_col='date'):
+        """Join a table's stored features onto `rows` as of each row's date (see point_in_time_join)."""
+        return point_in_time_join(rows, self.read(table, rows['event_key'].unique()), TABLE_KEYS[table], date_col)
@@ -0,0 +1,143 @@
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts of up to
+    `capacity`. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HTTPClient:
+    """
+    Pooled HTTP client with a concurrency cap, token-bucket rate limiting and
+    jittered exponential retry.
+
+    A single requests.Session keeps up to `max_concurrency` connections alive
+    across calls. Requests answered with a status in RETRY_STATUSES, or failing
+    with a connection error or timeout, are retried up to `max_retries` times,
+    sleeping a uniform random time in [0, min(backoff_max, backoff_base * 2**attempt)]
+    ("full jitter"), or the server's Retry-After when it sends one.
+
+    get_json() blocks; aget_json() awaits the same call from asyncio code and
+    gather() runs a batch of calls on the client's worker threads.
+    """
+
+    def __init__(self, max_concurrency=8, rate_per_sec=5.0, burst=None, max_retries=5,
+                 backoff_base=0.5, backoff_max=30.0, timeout=30):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_per_sec, burst) if rate_per_sec else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="http")
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, **kwargs):
+        """GET with rate limiting and retry. Returns the response or raises the last error."""
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            response = None
+            with self._slots:
+                self._count('requests')
+                try:
+                    response = self.session.get(url, timeout=self.timeout, **kwargs)
+                    if response.status_code not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        return response
+                    error = requests.HTTPError(f"{response.status_code} for url: {response.url}", response=response)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+            if attempt >= self.max_retries:
+                self._count('failures')
+                raise error
+            self._count('retries')
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get_json(self, url, **kwargs):
+        return self.get(url, **kwargs).json()
+
+    async def aget_json(self, url, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self.get_json(url, **kwargs))
+
+    def gather(self, calls):
+        """
+        Run zero-argument callables concurrently on the client's workers.
+        Returns their results in order; failures are returned as exceptions.
+        """
+        futures = [self._executor.submit(call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,101 @@
+import os
+import json
+import glob
+import numpy as np
+from checkpoint import atomic_write
+
+# Miscoverage of the prediction intervals: 0.1 gives 90% intervals
+INTERVAL_ALPHA = 0.1
+
+
+def conformal_quantile(scores, alpha=INTERVAL_ALPHA):
+    """
+    Finite-sample conformal quantile of calibration scores: the
+    ceil((n + 1)(1 - alpha))-th smallest, or NaN when n is too small for
+    any finite interval to reach the level.
+    """
+    scores = np.sort(np.asarray(scores, dtype=float))
+    k = int(np.ceil((len(scores) + 1) * (1 - alpha)))
+    return np.nan if k > len(scores) or k < 1 else scores[k - 1]
+
+
+def _interval_base(fold, model_name):
+    # Models with their own quantiles (q_lo/q_hi) are conformalized as in CQR
+    if f'q_lo_{model_name}' in fold:
+        return fold[f'q_lo_{model_name}'], fold[f'q_hi_{model_name}']
+    return fold[f'y_pred_{model_name}'], fold[f'y_pred_{model_name}']
+
+
+def _scores(fold, model_name):
+    lo, hi = _interval_base(fold, model_name)
+    return np.maximum(lo - fold['y_true'], fold['y_true'] - hi)
+
+
+def add_conformal_intervals(fold_results, overall_metrics, alpha=INTERVAL_ALPHA):
+    """
+    Prediction intervals from the CV residuals already computed, with no
+    extra training.
+
+    Every held-out event's interval is calibrated on the scores of all other
+    events (events, not rows, are the exchangeable units): |y - y_hat| for
+    point models, or max(lo - y, y - hi) for models that predict their own
+    quantiles. Adds lo_{model} / hi_{model} arrays to each fold result and
+    coverage / interval_width to its metrics and to overall_metrics. A fold
+    with too few calibration scores gets NaN bounds and metrics, and is left
+    out of the overall ones (NaN if no fold has an interval).
+
+    Returns {model_name: calibration quantile over all events, or None when
+    there are too few}, which widens the final model's predictions into
+    intervals of the same level.
+    """
+    calibration = {}
+    for model_name in overall_metrics:
+        scores = [_scores(fold, model_name) for fold in fold_results]
+        covered, widths = [], []
+        for i, fold in enumerate(fold_results):
+            others = [s for j, s in enumerate(scores) if j != i]
+            q = conformal_quantile(np.concatenate(others), alpha) if others else np.nan
+            lo, hi = _interval_base(fold, model_name)
+            fold[f'lo_{model_name}'], fold[f'hi_{model_name}'] = lo - q, hi + q
+            if np.isnan(q):
+                fold[f'metrics_{model_name}'].update(coverage=np.nan, interval_width=np.nan)
+                continue
+            covered.append((fold['y_true'] >= lo - q) & (fold['y_true'] <= hi + q))
+            widths.append((hi + q) - (lo - q))
+            fold[f'metrics_{model_name}'].update(coverage=float(np.mean(covered[-1])),
+                                                 interval_width=float(np.mean(widths[-1])))
+        overall_metrics[model_name]['coverage'] = float(np.mean(np.concatenate(covered))) if covered else np.nan
+        overall_metrics[model_name]['interval_width'] = float(np.mean(np.concatenate(widths))) if widths else np.nan
+        q = conformal_quantile(np.concatenate(scores), alpha)
+        calibration[model_name] = None if np.isnan(q) else float(q)
+    return calibration
+
+
+def save_interval_calibration(path, calibration, alpha=INTERVAL_ALPHA):
+    """Write {model_name: quantile} next to a sector's saved models (null for no interval)."""
+    with atomic_write(path, "w") as f:
+        json.dump({'alpha': alpha, 'quantiles': calibration}, f, indent=2)
+
+
+def load_interval_calibration(model_dir):
+    """
+    Every {sector}_intervals.json in a models directory as {(sector, model_name): quantile},
+    leaving out models calibrated on too few scores to have an interval.
+    """
+    calibration = {}
+    for path in glob.glob(os.path.join(model_dir, "*_intervals.json")):
+        sector = os.path.basename(path)[:-len("_intervals.json")]
+        with open(path) as f:
+            for model_name, q in json.load(f)['quantiles'].items():
+                if q is not None:
+                    calibration[(sector, model_name)] = q
+    return calibration
+
+
+def predict_interval(model, X, preds, q):
+    """Interval (lo, hi) of a saved model's predictions widened by its calibration quantile."""
+    if hasattr(model, 'predict_interval'):
+        lo, hi = model.predict_interval(X)
+    else:
+        lo, hi = preds, preds
+    return lo - q, hi + q
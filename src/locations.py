@@ -0,0 +1,69 @@
+import numpy as np
+
+# Grid points per side used to sample a polygon footprint
+POLYGON_GRID_SIZE = 5
+
+
+def _point_in_polygon(lat, lon, polygon):
+    """Ray casting test; polygon is a list of (lat, lon) vertices."""
+    inside = False
+    n = len(polygon)
+    for i in range(n):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[i - 1]
+        if (lon_i > lon) != (lon_j > lon):
+            crossing = lat_i + (lon - lon_i) * (lat_j - lat_i) / (lon_j - lon_i)
+            if lat < crossing:
+                inside = not inside
+    return inside
+
+
+def location_points(location, grid_size=POLYGON_GRID_SIZE):
+    """
+    Expand an event location into weighted sample points [(lat, lon, weight), ...].
+
+    Accepted forms:
+      {"lat": .., "lon": ..}                                   single point
+      {"points": [{"lat": .., "lon": .., "weight": ..}, ...]}  weight defaults to 1
+      {"polygon": [[lat, lon], ...]}                           sampled on a grid_size x grid_size grid
+    """
+    if 'lat' in location and 'lon' in location:
+        return [(float(location['lat']), float(location['lon']), 1.0)]
+
+    if 'points' in location:
+        points = [(float(p['lat']), float(p['lon']), float(p.get('weight', 1.0))) for p in location['points']]
+        if not points:
+            raise ValueError("location 'points' is empty")
+        if any(w < 0 for _, _, w in points) or sum(w for _, _, w in points) <= 0:
+            raise ValueError("location point weights must be non-negative and not all zero")
+        return points
+
+    if 'polygon' in location:
+        polygon = [(float(lat), float(lon)) for lat, lon in location['polygon']]
+        if len(polygon) < 3:
+            raise ValueError("location 'polygon' needs at least 3 vertices")
+        lats, lons = zip(*polygon)
+        points = [
+            (round(lat, 4), round(lon, 4), 1.0)
+            for lat in np.linspace(min(lats), max(lats), grid_size)
+            for lon in np.linspace(min(lons), max(lons), grid_size)
+            if _point_in_polygon(lat, lon, polygon)
+        ]
+        # Footprints thinner than the grid spacing fall back to the vertex centroid
+        return points or [(round(float(np.mean(lats)), 4), round(float(np.mean(lons)), 4), 1.0)]
+
+    raise ValueError("location must have 'lat'/'lon', 'points' or 'polygon'")
+
+
+def location_reduction(location):
+    """How the points' weather is combined: 'mean' (default), 'max' or 'weighted'."""
+    return location.get('reduce', 'mean')
+
+
+def location_centroid(location):
+    """Weighted centre of an event footprint as (lat, lon), e.g. for map markers."""
+    points = location_points(location)
+    weights = np.array([w for _, _, w in points])
+    lat = np.average([p[0] for p in points], weights=weights)
+    lon = np.average([p[1] for p in points], weights=weights)
+    return float(lat), float(lon)
@@ -1,6 +1,8 @@
 import yfinance as yf
 import pandas as pd
+from profiling import instrument, record
 
+@instrument('fetch_market_data')
 def fetch_market_data(tickers, start_date, end_date):
     data = {}
 
@@ -30,5 +32,7 @@ def fetch_market_data(tickers, start_date, end_date):
             df = df[[price_col, 'Return', 'Volume']].rename(columns={price_col: label})
             # store processed df in the dictionary, with 'symbol' as the key
             data[symbol] = df
+            # yfinance does not expose the response size; count the parsed frame instead
+            record(frame_bytes=int(df.memory_usage(deep=True).sum()))
 
     return data
@@ -10,6 +10,9 @@ from sklearn.metrics import (
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 import xgboost as xgb
+from profiling import instrument, stage
+from sequence import train_lstm, SequenceRegressor
+from attribution import compute_attributions
 
 
 def compute_metrics(y_true, y_pred):
@@ -25,25 +28,42 @@ def compute_metrics(y_true, y_pred):
     }
 
 
-def train_xgboost(X_train, y_train, X_test, y_test):
-    """Train XGBoost regressor. Returns (predictions, model)."""
+# Default booster parameters, shared with the out-of-core trainer (outofcore.py)
+XGB_PARAMS = {
+    "objective": "reg:squarederror",
+    "eval_metric": "rmse",
+    "max_depth": 4,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}
+
+# Share of the training rows XGBoost boosts on; the trailing rows are its early-stopping validation set
+EARLY_STOPPING_SPLIT = 0.85
+
+
+def early_stopping_split(n):
+    """Number of leading training rows boosted on before early stopping on the rest."""
+    return int(n * EARLY_STOPPING_SPLIT)
+
+
+def train_xgboost(X_train, y_train, X_test, y_test, params=None, init_model=None):
+    """
+    Train XGBoost regressor. Returns (predictions, model).
+    params override the default booster parameters. With init_model (a
+    booster trained on part of this training set), boosting continues from
+    it and early stopping only decides how many rounds to add; init_model
+    must not have seen the validation rows (see early_stopping_split).
+    """
     dtrain = xgb.DMatrix(X_train, label=y_train)
     dtest = xgb.DMatrix(X_test)
 
     # Use a small validation split from training data for early stopping
-    n = len(X_train)
-    val_split = int(n * 0.85)
+    val_split = early_stopping_split(len(X_train))
     dtrain_inner = xgb.DMatrix(X_train.iloc[:val_split], label=y_train.iloc[:val_split])
     dval_inner = xgb.DMatrix(X_train.iloc[val_split:], label=y_train.iloc[val_split:])
 
-    params = {
-        "objective": "reg:squarederror",
-        "eval_metric": "rmse",
-        "max_depth": 4,
-        "learning_rate": 0.05,
-        "subsample": 0.8,
-        "colsample_bytree": 0.8,
-    }
+    params = {**XGB_PARAMS, **(params or {})}
 
     model = xgb.train(
         params,
@@ -52,56 +72,158 @@ def train_xgboost(X_train, y_train, X_test, y_test):
         evals=[(dtrain_inner, "train"), (dval_inner, "val")],
         early_stopping_rounds=20,
         verbose_eval=False,
+        xgb_model=init_model,
     )
 
     # Retrain on full training set with the best number of rounds
+    # (best_iteration counts the rounds of init_model as well)
     best_rounds = model.best_iteration + 1
-    model = xgb.train(params, dtrain, num_boost_round=best_rounds, verbose_eval=False)
+    if init_model is not None:
+        added_rounds = best_rounds - init_model.num_boosted_rounds()
+        model = xgb.train(params, dtrain, num_boost_round=max(added_rounds, 0), verbose_eval=False,
+                          xgb_model=init_model)
+    else:
+        model = xgb.train(params, dtrain, num_boost_round=best_rounds, verbose_eval=False)
 
     preds = model.predict(dtest)
     return preds, model
 
 
-def train_random_forest(X_train, y_train, X_test, y_test):
+def train_random_forest(X_train, y_train, X_test, y_test, params=None):
     """Train Random Forest regressor. Returns (predictions, model)."""
-    model = RandomForestRegressor(
-        n_estimators=200,
-        max_depth=6,
-        min_samples_leaf=5,
-        random_state=42,
-    )
+    model = RandomForestRegressor(**{
+        'n_estimators': 200,
+        'max_depth': 6,
+        'min_samples_leaf': 5,
+        'random_state': 42,
+        **(params or {}),
+    })
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
     return preds, model
 
 
-def train_linear_baseline(X_train, y_train, X_test, y_test):
+def train_linear_baseline(X_train, y_train, X_test, y_test, params=None):
     """Train OLS linear regression baseline. Returns (predictions, model)."""
-    model = LinearRegression()
+    model = LinearRegression(**(params or {}))
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
     return preds, model
 
 
+# Quantiles of the quantile XGBoost model: the median is its point
+# prediction, the outer pair a 90% band (intervals.INTERVAL_ALPHA)
+QUANTILE_LEVELS = [0.05, 0.5, 0.95]
+
+
+class QuantileBooster:
+    """
+    XGBoost booster fitted on several quantiles at once. predict() returns
+    the median like any MODEL_REGISTRY model; predict_interval() the outer
+    quantiles.
+    """
+
+    def __init__(self, booster, quantiles):
+        self.booster = booster
+        self.quantiles = list(quantiles)
+        self.feature_names_in_ = np.asarray(booster.feature_names, dtype=object)
+
+    def predict_quantiles(self, X):
+        return self.booster.predict(xgb.DMatrix(X)).reshape(len(X), -1)
+
+    def predict(self, X):
+        return self.predict_quantiles(X)[:, self.quantiles.index(0.5)]
+
+    def predict_interval(self, X):
+        q = self.predict_quantiles(X)
+        return q[:, 0], q[:, -1]
+
+
+def train_xgboost_quantile(X_train, y_train, X_test, y_test, params=None, init_model=None):
+    """
+    Train one XGBoost booster on the QUANTILE_LEVELS pinball losses.
+    Returns (median predictions, QuantileBooster).
+    """
+    if init_model is not None:
+        init_model = init_model.booster
+    _, booster = train_xgboost(X_train, y_train, X_test, y_test, params={
+        'objective': 'reg:quantileerror',
+        'quantile_alpha': np.array(QUANTILE_LEVELS),
+        'eval_metric': 'quantile',
+        **(params or {}),
+    }, init_model=init_model)
+    model = QuantileBooster(booster, QUANTILE_LEVELS)
+    return model.predict(X_test), model
+
+
 MODEL_REGISTRY = {
     'xgboost': train_xgboost,
     'random_forest': train_random_forest,
     'ols': train_linear_baseline,
 }
 
+# Opt-in models, added to a run's registry on request (run_analysis.py
+# --quantile_xgboost, --lstm; the LSTM needs PyTorch)
+OPTIONAL_MODELS = {
+    'xgboost_quantile': train_xgboost_quantile,
+    'lstm': train_lstm,
+}
+
+# Models trained on whole trajectories: their trainers take each row's event
+# key as groups_train / groups_test, and predict_model passes it as groups
+SEQUENCE_MODELS = {'lstm'}
+
+
+def sequence_kwargs(model_name, groups_train, groups_test):
+    """Trajectory keys for the trainer of a SEQUENCE_MODELS entry, nothing for the others."""
+    if model_name not in SEQUENCE_MODELS:
+        return {}
+    return {'groups_train': np.asarray(groups_train), 'groups_test': np.asarray(groups_test)}
+
+
+def model_feature_names(model):
+    """Return the ordered feature names a trained model was fitted on."""
+    if isinstance(model, xgb.Booster):
+        return list(model.feature_names)
+    return list(model.feature_names_in_)
 
-def run_leave_one_event_out(df, features, target, event_col='event_key'):
+
+def predict_model(model, X, groups=None):
+    """
+    Predict with any trained registry model on a feature DataFrame.
+    groups (each row's event key) is required by sequence models only.
+    """
+    if isinstance(model, xgb.Booster):
+        return model.predict(xgb.DMatrix(X))
+    if isinstance(model, SequenceRegressor):
+        return model.predict(X, groups)
+    return model.predict(X)
+
+
+@instrument('run_leave_one_event_out')
+def run_leave_one_event_out(df, features, target, event_col='event_key', checkpoint=None, registry=None,
+                            attributions=False):
     """
     Leave-one-event-out cross-validation.
 
     For each unique event: train on all OTHER events, predict the held-out event.
-    Runs all three models (XGBoost, Random Forest, OLS).
+    Runs every model in `registry` (default MODEL_REGISTRY: XGBoost, Random
+    Forest and OLS; see OPTIONAL_MODELS for the others). Models with a
+    predict_interval method also store their own bands as q_lo_{model} and
+    q_hi_{model} (see intervals.add_conformal_intervals). With attributions,
+    each fold also stores the per-row attributions of its own models on its
+    held-out rows as fold['attributions'] (see attribution.fold_attributions).
+
+    With a checkpoint (checkpoint.Checkpoints scope), each finished fold is
+    saved under its held-out event and folds already saved are loaded
+    instead of retrained.
 
     Returns:
         fold_results: list of dicts, one per fold, with metrics and predictions
         overall_metrics: dict of {model_name: aggregated metrics across all folds}
         final_models: dict of {model_name: model trained on ALL data}
     """
+    registry = MODEL_REGISTRY if registry is None else registry
     events = df[event_col].unique()
     fold_results = []
 
@@ -117,6 +239,10 @@ def run_leave_one_event_out(df, features, target, event_col='event_key'):
         if len(X_test) == 0 or len(X_train) == 0:
             continue
 
+        if checkpoint is not None and checkpoint.has(held_out_event):
+            fold_results.append(checkpoint.load(held_out_event))
+            continue
+
         fold = {
             'event_key': held_out_event,
             'test_index': df.loc[test_mask].index,
@@ -124,16 +250,32 @@ def run_leave_one_event_out(df, features, target, event_col='event_key'):
             'y_true': y_test.values,
         }
 
-        for model_name, train_fn in MODEL_REGISTRY.items():
-            preds, _ = train_fn(X_train, y_train, X_test, y_test)
+        fold_models = {}
+        for model_name, train_fn in registry.items():
+            with stage(f"train_{model_name}", fold=held_out_event) as counters:
+                preds, model = train_fn(X_train, y_train, X_test, y_test,
+                                        **sequence_kwargs(model_name, df.loc[train_mask, event_col],
+                                                          df.loc[test_mask, event_col]))
+                counters['rows'] = len(X_train)
             fold[f'y_pred_{model_name}'] = preds
+            if hasattr(model, 'predict_interval'):
+                fold[f'q_lo_{model_name}'], fold[f'q_hi_{model_name}'] = model.predict_interval(X_test)
             fold[f'metrics_{model_name}'] = compute_metrics(y_test.values, preds)
+            fold_models[model_name] = model
+
+        if attributions:
+            with stage('attribution', fold=held_out_event) as counters:
+                fold['attributions'] = compute_attributions(fold_models, X_test, X_train,
+                                                            df.loc[test_mask, event_col].values)
+                counters['rows'] = len(X_test)
 
+        if checkpoint is not None:
+            checkpoint.save(held_out_event, fold)
         fold_results.append(fold)
 
     # Aggregate metrics across folds
     overall_metrics = {}
-    for model_name in MODEL_REGISTRY:
+    for model_name in registry:
         all_true = np.concatenate([f['y_true'] for f in fold_results])
         all_pred = np.concatenate([f[f'y_pred_{model_name}'] for f in fold_results])
         overall_metrics[model_name] = compute_metrics(all_true, all_pred)
@@ -142,8 +284,11 @@ def run_leave_one_event_out(df, features, target, event_col='event_key'):
     X_all = df[features]
     y_all = df[target]
     final_models = {}
-    for model_name, train_fn in MODEL_REGISTRY.items():
-        _, model = train_fn(X_all, y_all, X_all, y_all)
+    for model_name, train_fn in registry.items():
+        with stage(f"train_{model_name}", fold='final') as counters:
+            _, model = train_fn(X_all, y_all, X_all, y_all,
+                                **sequence_kwargs(model_name, df[event_col], df[event_col]))
+            counters['rows'] = len(X_all)
         final_models[model_name] = model
 
     return fold_results, overall_metrics, final_models
@@ -0,0 +1,319 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import LinearRegression
+
+from models import compute_metrics, XGB_PARAMS
+from attribution import compute_attributions
+from profiling import instrument, stage
+
+# Bytes of working memory assumed per stored byte of a chunk: the memmap
+# pages, the filtered copy handed to XGBoost and XGBoost's own page.
+CHUNK_OVERHEAD = 4
+
+# External-memory DMatrix needs the hist tree method
+OOC_XGB_PARAMS = {**XGB_PARAMS, "tree_method": "hist"}
+
+
+class ColumnarDataset:
+    """
+    On-disk pooled dataset, one float64 row-major file per sector.
+
+    Layout of {path}/{sector}.f64: columns [event_code, relative_day, *features, target].
+    {path}/meta.json holds the column names, the event code table and the row
+    count per sector. Files are opened as read-only memmaps, so only the chunk
+    being processed is paged into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.features = meta['features']
+        self.target = meta['target']
+        self.events = meta['events']
+        self.sector_rows = meta['sector_rows']
+        self.sector_events = meta['sector_events']
+        self.n_cols = 3 + len(self.features)
+
+    @property
+    def sectors(self):
+        return sorted(self.sector_rows)
+
+    def _memmap(self, sector):
+        n_rows = self.sector_rows[sector]
+        return np.memmap(os.path.join(self.path, f"{sector}.f64"), dtype=np.float64, mode='r',
+                         shape=(n_rows, self.n_cols))
+
+    def rows_per_chunk(self, memory_budget_mb):
+        row_bytes = self.n_cols * 8 * CHUNK_OVERHEAD
+        return max(1000, int(memory_budget_mb * 1024 * 1024 // row_bytes))
+
+    def iter_chunks(self, sector, rows_per_chunk, events=None, exclude=None):
+        """
+        Yield (relative_day, X, y, event_codes) array chunks for a sector,
+        keeping rows whose event code is in `events` and not in `exclude`.
+        """
+        data = self._memmap(sector)
+        for start in range(0, len(data), rows_per_chunk):
+            block = data[start:start + rows_per_chunk]
+            codes = block[:, 0].astype(np.int64)
+            mask = np.ones(len(block), dtype=bool)
+            if events is not None:
+                mask &= np.isin(codes, list(events))
+            if exclude is not None:
+                mask &= ~np.isin(codes, list(exclude))
+            if not mask.any():
+                continue
+            block = np.asarray(block[mask])
+            yield block[:, 1], block[:, 2:-1], block[:, -1], codes[mask]
+
+
+def write_columnar_dataset(csv_path, out_path, features, target, chunksize=100000):
+    """
+    Convert the pooled CSV into a ColumnarDataset, reading `chunksize` rows at a time.
+    Rows with NaN in features or target are dropped, as in the in-memory path.
+    """
+    if os.path.isdir(out_path):
+        shutil.rmtree(out_path)
+    os.makedirs(out_path)
+
+    event_codes = {}
+    sector_rows = {}
+    sector_events = {}
+    handles = {}
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = chunk.dropna(subset=features + [target])
+            for event_key in chunk['event_key'].unique():
+                event_codes.setdefault(event_key, len(event_codes))
+            codes = chunk['event_key'].map(event_codes).values.astype(np.float64)
+            values = np.column_stack([
+                codes,
+                chunk['relative_day'].values.astype(np.float64),
+                chunk[features].values.astype(np.float64),
+                chunk[target].values.astype(np.float64),
+            ])
+            sectors = chunk['sector'].values
+            for sector in np.unique(sectors):
+                mask = sectors == sector
+                if sector not in handles:
+                    handles[sector] = open(os.path.join(out_path, f"{sector}.f64"), "wb")
+                handles[sector].write(np.ascontiguousarray(values[mask]).tobytes())
+                sector_rows[sector] = sector_rows.get(sector, 0) + int(mask.sum())
+                sector_events.setdefault(sector, set()).update(codes[mask].astype(int).tolist())
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    events = [None] * len(event_codes)
+    for event_key, code in event_codes.items():
+        events[code] = event_key
+    meta = {
+        'features': features,
+        'target': target,
+        'events': events,
+        'sector_rows': sector_rows,
+        'sector_events': {s: sorted(e) for s, e in sector_events.items()},
+    }
+    with open(os.path.join(out_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return ColumnarDataset(out_path)
+
+
+class _ChunkIter(xgb.DataIter):
+    """Feeds ColumnarDataset chunks to XGBoost's external-memory DMatrix."""
+
+    def __init__(self, dataset, sector, rows_per_chunk, cache_dir, events=None, exclude=None):
+        self._args = (dataset, sector, rows_per_chunk, events, exclude)
+        self._chunks = None
+        os.makedirs(cache_dir, exist_ok=True)
+        super().__init__(cache_prefix=os.path.join(cache_dir, "cache"))
+
+    def next(self, input_data):
+        if self._chunks is None:
+            dataset, sector, rows_per_chunk, events, exclude = self._args
+            self._chunks = dataset.iter_chunks(sector, rows_per_chunk, events, exclude)
+        try:
+            _, X, y, _ = next(self._chunks)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def _external_dmatrix(it, ref=None):
+    # ExtMemQuantileDMatrix is the external-memory entry point from XGBoost 3.0;
+    # older releases build an external-memory DMatrix straight from the iterator.
+    if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+        return xgb.ExtMemQuantileDMatrix(it, ref=ref)
+    return xgb.DMatrix(it)
+
+
+def train_xgboost_ooc(dataset, sector, train_events, rows_per_chunk):
+    """
+    Train XGBoost from disk chunks with external memory.
+    As in train_xgboost, the number of rounds is chosen by early stopping on a
+    validation split and the model is refit on all training data. The split
+    holds out the last ~15% of training events, since rows are stored by event.
+    """
+    train_events = list(train_events)
+    n_val = max(1, int(round(len(train_events) * 0.15))) if len(train_events) > 1 else 0
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if n_val:
+            inner = _external_dmatrix(_ChunkIter(dataset, sector, rows_per_chunk, os.path.join(cache_dir, "inner"),
+                                                 events=train_events[:-n_val]))
+            val = _external_dmatrix(_ChunkIter(dataset, sector, rows_per_chunk, os.path.join(cache_dir, "val"),
+                                               events=train_events[-n_val:]), ref=inner)
+            model = xgb.train(
+                OOC_XGB_PARAMS, inner, num_boost_round=500,
+                evals=[(inner, "train"), (val, "val")],
+                early_stopping_rounds=20, verbose_eval=False,
+            )
+            best_rounds = model.best_iteration + 1
+            # Each DMatrix removes its cache files in cache_dir when freed, so free it before the directory goes
+            del inner, val
+        else:
+            best_rounds = 100
+
+        full = _external_dmatrix(_ChunkIter(dataset, sector, rows_per_chunk, os.path.join(cache_dir, "full"),
+                                            events=train_events))
+        model = xgb.train(OOC_XGB_PARAMS, full, num_boost_round=best_rounds, verbose_eval=False)
+        del full
+
+    model.feature_names = list(dataset.features)
+    return model
+
+
+def train_ols_ooc(dataset, sector, train_events, rows_per_chunk):
+    """
+    Exact OLS from accumulated normal equations X'X and X'y over disk chunks.
+    Returns a fitted sklearn LinearRegression so it predicts and pickles like
+    the in-memory baseline.
+    """
+    k = len(dataset.features) + 1
+    xtx = np.zeros((k, k))
+    xty = np.zeros(k)
+    for _, X, y, _ in dataset.iter_chunks(sector, rows_per_chunk, events=train_events):
+        Xc = np.column_stack([np.ones(len(X)), X])
+        xtx += Xc.T @ Xc
+        xty += Xc.T @ y
+
+    coef = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    model = LinearRegression()
+    model.intercept_ = coef[0]
+    model.coef_ = coef[1:]
+    model.n_features_in_ = len(dataset.features)
+    model.feature_names_in_ = np.array(dataset.features, dtype=object)
+    return model
+
+
+OOC_MODEL_REGISTRY = {
+    'xgboost': train_xgboost_ooc,
+    'ols': train_ols_ooc,
+}
+
+
+def _predict_chunks(model, dataset, sector, event_code, rows_per_chunk):
+    """Predict one event's rows chunk by chunk. Returns (relative_days, y_true, y_pred)."""
+    days, truth, preds = [], [], []
+    for relative_day, X, y, _ in dataset.iter_chunks(sector, rows_per_chunk, events=[event_code]):
+        if isinstance(model, xgb.Booster):
+            p = model.predict(xgb.DMatrix(X, feature_names=dataset.features))
+        else:
+            p = model.predict(pd.DataFrame(X, columns=dataset.features))
+        days.append(relative_day)
+        truth.append(y)
+        preds.append(p)
+    return np.concatenate(days), np.concatenate(truth), np.concatenate(preds)
+
+
+def _event_feature_sums(dataset, sector, rows_per_chunk):
+    """Row count and feature sums of every event of a sector, from one pass over its file."""
+    sums = {}
+    for _, X, _, codes in dataset.iter_chunks(sector, rows_per_chunk):
+        for code in np.unique(codes):
+            n, total = sums.get(code, (0, 0.0))
+            sums[code] = (n + int(np.sum(codes == code)), total + X[codes == code].sum(axis=0))
+    return sums
+
+
+def _attribute_chunks(models, dataset, sector, event_code, rows_per_chunk, background):
+    """Attributions of one event's rows chunk by chunk, in _predict_chunks row order."""
+    parts = []
+    for _, X, _, _ in dataset.iter_chunks(sector, rows_per_chunk, events=[event_code]):
+        parts.append(compute_attributions(models, pd.DataFrame(X, columns=dataset.features), background))
+    return {m: (np.concatenate([p[m][0] for p in parts]), np.concatenate([p[m][1] for p in parts]))
+            for m in parts[0]}
+
+
+@instrument('run_leave_one_event_out_ooc')
+def run_leave_one_event_out_ooc(dataset, sector, memory_budget_mb=1024, checkpoint=None, attributions=False):
+    """
+    Leave-one-event-out CV for one sector of a ColumnarDataset without loading it.
+
+    Training data is streamed from disk in chunks sized to `memory_budget_mb`.
+    Runs the models in OOC_MODEL_REGISTRY (XGBoost external memory and
+    incremental OLS) and returns the same (fold_results, overall_metrics,
+    final_models) triple as models.run_leave_one_event_out; folds are
+    checkpointed and (with attributions) attributed the same way, the
+    attribution background being the training events' feature means.
+    """
+    rows_per_chunk = dataset.rows_per_chunk(memory_budget_mb)
+    event_codes = dataset.sector_events[sector]
+    feature_sums = _event_feature_sums(dataset, sector, rows_per_chunk) if attributions else None
+    fold_results = []
+
+    for held_out in event_codes:
+        train_events = [e for e in event_codes if e != held_out]
+        if not train_events:
+            continue
+        event_key = dataset.events[held_out]
+        if checkpoint is not None and checkpoint.has(event_key):
+            fold_results.append(checkpoint.load(event_key))
+            continue
+
+        fold = {'event_key': event_key}
+        fold_models = {}
+        for model_name, train_fn in OOC_MODEL_REGISTRY.items():
+            with stage(f"train_{model_name}", fold=event_key):
+                model = train_fn(dataset, sector, train_events, rows_per_chunk)
+            fold_models[model_name] = model
+            relative_days, y_true, preds = _predict_chunks(model, dataset, sector, held_out, rows_per_chunk)
+            fold['relative_days'] = relative_days
+            fold['y_true'] = y_true
+            fold[f'y_pred_{model_name}'] = preds
+            fold[f'metrics_{model_name}'] = compute_metrics(y_true, preds)
+
+        if attributions:
+            n = sum(feature_sums[e][0] for e in train_events)
+            background = (sum(feature_sums[e][1] for e in train_events) / n)[None, :]
+            with stage('attribution', fold=event_key) as counters:
+                fold['attributions'] = _attribute_chunks(fold_models, dataset, sector, held_out, rows_per_chunk,
+                                                         background)
+                counters['rows'] = len(fold['y_true'])
+
+        if checkpoint is not None:
+            checkpoint.save(event_key, fold)
+        fold_results.append(fold)
+
+    overall_metrics = {}
+    for model_name in OOC_MODEL_REGISTRY:
+        all_true = np.concatenate([f['y_true'] for f in fold_results])
+        all_pred = np.concatenate([f[f'y_pred_{model_name}'] for f in fold_results])
+        overall_metrics[model_name] = compute_metrics(all_true, all_pred)
+
+    final_models = {}
+    for model_name, train_fn in OOC_MODEL_REGISTRY.items():
+        with stage(f"train_{model_name}", fold='final'):
+            final_models[model_name] = train_fn(dataset, sector, event_codes, rows_per_chunk)
+
+    return fold_results, overall_metrics, final_models
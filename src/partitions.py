@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import hashlib
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import EVENT_FEATURES, EVENT_TYPE_DEFAULTS, ESTIMATION_DAYS
+
+
+def event_config_hash(event, options=None):
+    """
+    Short hash of everything an event's pooled rows depend on: its catalog
+    entry, the type-level window and weather settings, and the build options
+    (baseline, normal model, ...). Editing any of them changes the hash.
+    """
+    payload = {
+        'event': event,
+        'pre_event_days': EVENT_TYPE_DEFAULTS[event['type']]['pre_event_days'],
+        'weather_features': EVENT_FEATURES.get(event['type']),
+        'estimation_days': ESTIMATION_DAYS,
+        'options': options or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+class EventPartitions:
+    """
+    The pooled dataset stored as one pickle per event under {root}/, with
+    manifest.json mapping each built event to the config hash it was built
+    from. diff() compares the manifest against the current catalog, so only
+    new or edited events are rebuilt and removed ones dropped.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(root, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _path(self, event_key):
+        return os.path.join(self.root, f"{event_key}.pkl")
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def diff(self, hashes):
+        """
+        Compare {event_key: config hash} of the current catalog with the manifest.
+        Returns (stale, removed): events to (re)build and stored events no longer
+        in the catalog.
+        """
+        stale = [k for k, h in hashes.items()
+                 if self.manifest.get(k) != h or not os.path.exists(self._path(k))]
+        removed = [k for k in self.manifest if k not in hashes]
+        return stale, removed
+
+    def write(self, event_key, rows, config_hash):
+        """Store (or replace) an event's rows, then record it in the manifest."""
+        tmp_path = self._path(event_key) + ".tmp"
+        rows.to_pickle(tmp_path)
+        os.replace(tmp_path, self._path(event_key))
+        self.manifest[event_key] = config_hash
+        self._save_manifest()
+
+    def remove(self, event_key):
+        self.manifest.pop(event_key, None)
+        self._save_manifest()
+        if os.path.exists(self._path(event_key)):
+            os.remove(self._path(event_key))
+
+    def clear(self):
+        """Drop every partition, forcing a full rebuild."""
+        for event_key in list(self.manifest):
+            self.remove(event_key)
+
+    def read(self, hashes):
+        """
+        Stored rows of the events in {event_key: config hash}, in that order.
+        Events without a partition built from that exact hash are skipped.
+        """
+        frames = [pd.read_pickle(self._path(k)) for k, h in hashes.items() if self.manifest.get(k) == h]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
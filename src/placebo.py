@@ -0,0 +1,170 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import EVENTS, ESTIMATION_DAYS
+from returns import capm_sufficient_stats, market_model_from_stats
+from profiling import instrument
+
+# Quantiles of the placebo AR/CAR distributions reported per ticker and horizon
+PLACEBO_QUANTILES = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.975, 0.99]
+
+# Fewest valid returns a placebo's estimation window may hold (of ESTIMATION_DAYS)
+MIN_ESTIMATION_DAYS = 60
+
+
+def _event_etfs(event, include_regional):
+    tickers = list(event.get('sector_etfs', {}))
+    if include_regional:
+        tickers += [t for t in event.get('regional_etfs', {}) if t not in tickers]
+    return tickers
+
+
+def ticker_markets(events=EVENTS, event_type=None, include_regional=False):
+    """
+    {ticker: market index} of every sector ETF (and with include_regional,
+    regional ETF) of the catalog's events, optionally of one event type.
+    A ticker is regressed on the index of the first event that lists it.
+    """
+    markets = {}
+    for event in events.values():
+        if event_type is not None and event['type'] != event_type:
+            continue
+        for ticker in _event_etfs(event, include_regional):
+            markets.setdefault(ticker, event['index'])
+    return markets
+
+
+def _window_starts(dates, pre_event_days):
+    # Position of each date's analysis window start, pre_event_days calendar days earlier
+    return np.searchsorted(dates, dates - np.timedelta64(pre_event_days, 'D'), side='left')
+
+
+def _blocked_positions(dates, firsts, lasts, ticker, events, pre_event_days):
+    """Placebo windows [firsts, lasts] (date positions) that overlap the window of a catalog event listing the ticker."""
+    blocked = np.zeros(len(firsts), dtype=bool)
+    for event in events.values():
+        if ticker not in event.get('sector_etfs', {}) and ticker not in event.get('regional_etfs', {}):
+            continue
+        event_date = np.datetime64(pd.Timestamp(event['event_date']), 'D')
+        first = np.searchsorted(dates, event_date - np.timedelta64(pre_event_days, 'D'), side='left')
+        last = np.searchsorted(dates, np.datetime64(pd.Timestamp(event['end_date']), 'D'), side='right') - 1
+        blocked |= (firsts <= last) & (lasts >= first)
+    return blocked
+
+
+@instrument('placebo_cars')
+def placebo_cars(store, markets, n_placebos=1000, max_horizon=20, pre_event_days=14,
+                 estimation_days=ESTIMATION_DAYS, events=EVENTS, seed=0):
+    """
+    AR/CAR of random pseudo-events for every ticker of `markets`
+    ({ticker: market index}) from a price_store.PriceStore.
+
+    Placebo event dates are drawn without replacement from the trading days
+    with a full event window and at least MIN_ESTIMATION_DAYS valid returns
+    in the estimation_days before them, excluding dates whose window
+    overlaps a catalog event that lists the ticker. As in
+    build_event_observation, CAPM is fitted on the estimation_days trading
+    days before the placebo date and CAR accumulates from the window start,
+    pre_event_days calendar days earlier.
+
+    Everything comes from one pass of prefix sums per ticker
+    (returns.capm_sufficient_stats): the fit of any window and the sum of
+    its ARs are differences of two rows, so all placebos and horizons are
+    computed at once without refitting or slicing windows.
+
+    Trading days are the market index's sessions: the estimation window and
+    the horizons count sessions, not days of the store's union date index.
+
+    Returns {ticker: {'market', 'dates' (K,), 'ar', 'car'}} where ar[:, h]
+    and car[:, h] (K, max_horizon + 1) are the AR on and the CAR through
+    trading day h after the placebo date. Tickers without an eligible
+    placebo date are left out.
+    """
+    dates = np.asarray(store.dates)
+    symbols = sorted(set(markets) | set(markets.values()))
+    missing = [s for s in symbols if s not in store]
+    if missing:
+        raise ValueError(f"Tickers {missing} are not in the price store at {store.path}")
+    _, returns = store.view('return', symbols, dates[0], dates[-1] + np.timedelta64(1, 'D'))
+
+    rng = np.random.default_rng(seed)
+    starts = _window_starts(dates, pre_event_days)
+    draws = {}
+    for ticker, market in markets.items():
+        x, y = np.asarray(returns[market]), np.asarray(returns[ticker])
+        stats = capm_sufficient_stats(x, y)
+        valid = stats[:, 0]
+        # Store dates are the union of every ticker's days; windows count the market's sessions,
+        # found by their ordinal in session_positions
+        session_positions = np.flatnonzero(np.isfinite(x))
+        sessions = np.concatenate([[0], np.cumsum(np.isfinite(x))])
+
+        # Candidates: market sessions with an estimation window behind and a complete event window ahead
+        ordinals = np.arange(estimation_days, len(session_positions) - max_horizon)
+        candidates = session_positions[ordinals]
+        estimation_starts = session_positions[ordinals - estimation_days]
+        lasts = session_positions[ordinals + max_horizon]
+        complete = valid[lasts + 1] - valid[starts[candidates]] == sessions[lasts + 1] - sessions[starts[candidates]]
+        estimated = valid[candidates] - valid[estimation_starts] >= MIN_ESTIMATION_DAYS
+        blocked = _blocked_positions(dates, starts[candidates], lasts, ticker, events, pre_event_days)
+        eligible = np.flatnonzero(complete & estimated & ~blocked)
+        if len(eligible) == 0:
+            continue
+
+        picked = np.sort(rng.choice(eligible, size=min(n_placebos, len(eligible)), replace=False))
+        chosen = candidates[picked]
+        params = market_model_from_stats(stats, estimation_starts[picked], chosen)
+        alpha, beta = params['alpha'][:, None], params['beta'][:, None]
+
+        # Prefix rows through the day before the placebo date, then through each session h after it
+        ends = np.column_stack([chosen, session_positions[ordinals[picked][:, None] + np.arange(max_horizon + 1)] + 1])
+        # Sum of AR from the window start through day h: y - alpha - beta * x summed via prefix rows
+        window = stats[ends] - stats[starts[chosen]][:, None, :]
+        car = window[..., 2] - alpha * window[..., 0] - beta * window[..., 1]
+        draws[ticker] = {'market': market, 'dates': dates[chosen], 'ar': np.diff(car, axis=1), 'car': car[:, 1:]}
+    return draws
+
+
+def placebo_quantiles(draws, quantiles=PLACEBO_QUANTILES):
+    """
+    Empirical null distribution per ticker, horizon and measure ('ar': the
+    day-h abnormal return, 'car': CAR through day h) as one DataFrame with
+    n_placebos, mean, std and a q{level} column per quantile.
+    """
+    rows = []
+    for ticker, draw in draws.items():
+        for measure in ('ar', 'car'):
+            values = draw[measure]
+            levels = np.quantile(values, quantiles, axis=0)
+            for h in range(values.shape[1]):
+                rows.append({
+                    'ticker': ticker,
+                    'market': draw['market'],
+                    'measure': measure,
+                    'horizon': h,
+                    'n_placebos': len(values),
+                    'mean': values[:, h].mean(),
+                    'std': values[:, h].std(ddof=1) if len(values) > 1 else np.nan,
+                    **{f"q{q:g}": levels[i, h] for i, q in enumerate(quantiles)},
+                })
+    return pd.DataFrame(rows)
+
+
+def placebo_pvalue(draws, ticker, horizon, car):
+    """
+    Two-sided empirical p-value of an observed CAR at `horizon` against the
+    ticker's placebo CARs, with the +1 correction so it is never zero.
+    """
+    if ticker not in draws:
+        raise ValueError(f"No placebo draws for {ticker}")
+    null = draws[ticker]['car'][:, horizon]
+    lower = (np.sum(null <= car) + 1) / (len(null) + 1)
+    upper = (np.sum(null >= car) + 1) / (len(null) + 1)
+    return min(1.0, 2 * min(lower, upper))
+
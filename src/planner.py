@@ -0,0 +1,151 @@
+import os
+import sys
+from collections import defaultdict
+from datetime import timedelta
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import ESTIMATION_DAYS
+from market import fetch_market_data
+from returns import capm_sufficient_stats, market_model_from_stats
+
+
+def event_market_window(event):
+    """
+    Return (start, end) of the price history an event needs: far enough back to
+    cover ESTIMATION_DAYS trading days (~1.5x calendar days) up to its end date.
+    """
+    event_dt = pd.to_datetime(event['event_date'])
+    start = (event_dt - timedelta(days=int(ESTIMATION_DAYS * 1.5))).strftime('%Y-%m-%d')
+    return start, event['end_date']
+
+
+def event_tickers(event, include_regional=False):
+    """
+    The event's ETFs as {symbol: label}: sector ETFs, then (with include_regional)
+    regional ETFs not already among them. The market index is never included,
+    so each symbol is fetched, fitted and trained once per event.
+    """
+    tickers = dict(event['sector_etfs'])
+    if include_regional:
+        for symbol, label in event.get('regional_etfs', {}).items():
+            tickers.setdefault(symbol, label)
+    tickers.pop(event['index'], None)
+    return tickers
+
+
+def event_market_tickers(event, include_regional=False):
+    """Market index followed by the event's ETFs."""
+    return [event['index']] + list(event_tickers(event, include_regional))
+
+
+def plan_market_fetches(events, include_regional=False):
+    """
+    Merge the price windows of all events per ticker.
+
+    events: dict of {event_key: event}
+    Returns {ticker: [(start, end), ...]} with overlapping windows merged, so
+    every ticker-day is downloaded once however many events need it.
+    """
+    spans = defaultdict(list)
+    for event in events.values():
+        window = event_market_window(event)
+        for ticker in event_market_tickers(event, include_regional):
+            spans[ticker].append(window)
+
+    plan = {}
+    for ticker, windows in spans.items():
+        merged = []
+        # ISO date strings sort chronologically
+        for start, end in sorted(windows):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        plan[ticker] = merged
+    return plan
+
+
+class MarketDataCache:
+    """
+    Price series fetched once per (ticker, merged window) and shared across events,
+    together with CAPM prefix statistics so each event's market model is an
+    O(1) difference instead of a new regression.
+    `fetch` has the fetch_market_data contract (e.g. price_store.PriceStore.fetch).
+    """
+
+    def __init__(self, plan, fetch=fetch_market_data):
+        self.plan = plan
+        self.fetch = fetch
+        self._frames = {}
+        self._stats = {}
+
+    def prefetch(self):
+        n_requests = sum(len(windows) for windows in self.plan.values())
+        print(f"  Prefetching {n_requests} price windows for {len(self.plan)} tickers...")
+        for ticker, windows in self.plan.items():
+            for window in windows:
+                data = self.fetch([ticker], *window)
+                if ticker in data:
+                    self._frames[(ticker, window)] = data[ticker]
+        return self
+
+    def _window_for(self, ticker, start, end):
+        for window in self.plan.get(ticker, []):
+            if window[0] <= start and end <= window[1]:
+                return window
+        return None
+
+    def get(self, tickers, start_date, end_date):
+        """
+        Same contract as market.fetch_market_data, served from the prefetched frames.
+        Tickers outside the plan are fetched directly.
+        """
+        if isinstance(tickers, list):
+            tickers = {symbol: symbol for symbol in tickers}
+        elif not isinstance(tickers, dict):
+            raise ValueError("tickers must be a list or dict")
+
+        data = {}
+        for symbol, label in tickers.items():
+            window = self._window_for(symbol, start_date, end_date)
+            frame = self._frames.get((symbol, window)) if window else None
+            if frame is None:
+                data.update(self.fetch({symbol: label}, start_date, end_date))
+                continue
+            # yfinance treats end as exclusive; mirror that on the cached frame
+            df = frame.loc[(frame.index >= start_date) & (frame.index < end_date)]
+            data[symbol] = df.rename(columns={df.columns[0]: label})
+        return data
+
+    def market_model(self, market, tickers, estimation_window):
+        """
+        Market model alpha/beta per ticker over `estimation_window`, from cached
+        prefix statistics of the shared (market, ticker, window) span.
+        Falls back to None for tickers not in the cache.
+        """
+        start, end = estimation_window[0].strftime('%Y-%m-%d'), estimation_window[-1].strftime('%Y-%m-%d')
+        market_window = self._window_for(market, start, end)
+        market_frame = self._frames.get((market, market_window)) if market_window else None
+        if market_frame is None:
+            return None
+
+        positions = market_frame.index.get_indexer([estimation_window[0], estimation_window[-1]])
+        if (positions < 0).any():
+            return None
+        lo, hi = positions[0], positions[1] + 1
+
+        model_params = {}
+        for ticker in tickers:
+            ticker_window = self._window_for(ticker, start, end)
+            if ticker_window is None or (ticker, ticker_window) not in self._frames:
+                return None
+            key = (market, market_window, ticker, ticker_window)
+            if key not in self._stats:
+                ticker_returns = self._frames[(ticker, ticker_window)]['Return'].reindex(market_frame.index)
+                self._stats[key] = capm_sufficient_stats(market_frame['Return'].values, ticker_returns.values)
+            model_params[ticker] = market_model_from_stats(self._stats[key], lo, hi)
+        return model_params
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import EVENTS
+from market import fetch_market_data
+
+# Fields stored per ticker, in the units fetch_market_data returns
+PRICE_FIELDS = ['close', 'return', 'volume']
+
+DEFAULT_PRICE_STORE = os.path.join(ROOT_DIR, "data", "price_store")
+
+
+def event_universe(events=EVENTS):
+    """Every ticker referenced by the events: market indices, sector and regional ETFs."""
+    tickers = set()
+    for event in events.values():
+        tickers.add(event['index'])
+        tickers.update(event.get('sector_etfs', {}))
+        tickers.update(event.get('regional_etfs', {}))
+    return sorted(tickers)
+
+
+class PriceStore:
+    """
+    Daily price history of a ticker universe as read-only memory maps.
+
+    Layout of {path}/: dates.npy (the shared trading-day index, datetime64[D]),
+    {field}.f64 per PRICE_FIELDS as float64 (n_tickers, n_dates) arrays and
+    meta.json (tickers, fields). A ticker's row is contiguous, so any
+    (ticker, date range) slice is a view into the mapped file: nothing is
+    copied or deserialized, and processes mapping the same store share the
+    OS page cache. Days on which a ticker did not trade hold NaN. version
+    hashes meta.json, so it changes whenever the store is rebuilt with other
+    tickers or dates.
+    """
+
+    def __init__(self, path=DEFAULT_PRICE_STORE):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.version = hashlib.sha1(json.dumps(meta, sort_keys=True).encode()).hexdigest()[:10]
+        self.tickers = meta['tickers']
+        self.fields = meta['fields']
+        self._rows = {t: i for i, t in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode='r')
+        self._arrays = {
+            field: np.memmap(os.path.join(path, f"{field}.f64"), dtype=np.float64, mode='r',
+                             shape=(len(self.tickers), len(self.dates)))
+            for field in self.fields
+        }
+
+    def __contains__(self, ticker):
+        return ticker in self._rows
+
+    def _date_range(self, start_date, end_date):
+        # end is exclusive, as in yfinance and fetch_market_data
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date), 'D'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date), 'D'), side='left')
+        return lo, hi
+
+    def view(self, field, tickers, start_date, end_date):
+        """
+        Zero-copy slices of one field: returns (dates, {ticker: values}) where
+        every array is a view of the mapped files.
+        """
+        if field not in self._arrays:
+            raise ValueError(f"Unknown field '{field}', expected one of {self.fields}")
+        lo, hi = self._date_range(start_date, end_date)
+        data = self._arrays[field]
+        return self.dates[lo:hi], {t: data[self._rows[t], lo:hi] for t in tickers if t in self._rows}
+
+    def fetch(self, tickers, start_date, end_date):
+        """
+        Same contract as market.fetch_market_data, served from the store.
+        Tickers missing from the store are downloaded directly.
+        """
+        if isinstance(tickers, list):
+            tickers = {symbol: symbol for symbol in tickers}
+        elif not isinstance(tickers, dict):
+            raise ValueError("tickers must be a list or dict")
+
+        lo, hi = self._date_range(start_date, end_date)
+        index = pd.DatetimeIndex(self.dates[lo:hi])
+        data = {}
+        for symbol, label in tickers.items():
+            if symbol not in self._rows:
+                data.update(fetch_market_data({symbol: label}, start_date, end_date))
+                continue
+            row = self._rows[symbol]
+            df = pd.DataFrame({
+                label: self._arrays['close'][row, lo:hi],
+                'Return': self._arrays['return'][row, lo:hi],
+                'Volume': self._arrays['volume'][row, lo:hi],
+            }, index=index)
+            df = df[df[label].notna()]
+            if df.empty:
+                print(f"No data for {symbol}")
+                continue
+            data[symbol] = df
+        return data
+
+
+def build_price_store(path=DEFAULT_PRICE_STORE, tickers=None, start_date="2000-01-01", end_date=None):
+    """
+    Download the full daily history of `tickers` (default: event_universe())
+    once and write it as a PriceStore. The shared date index is the union of
+    every ticker's trading days.
+    """
+    tickers = tickers or event_universe()
+    end_date = end_date or pd.Timestamp.today().strftime('%Y-%m-%d')
+
+    print(f"Building price store for {len(tickers)} tickers, {start_date} to {end_date}...")
+    history = fetch_market_data(list(tickers), start_date, end_date)
+    tickers = [t for t in tickers if t in history]
+    if not tickers:
+        raise ValueError("No price history could be downloaded")
+
+    dates = history[tickers[0]].index
+    for ticker in tickers[1:]:
+        dates = dates.union(history[ticker].index)
+    dates = dates.values.astype('datetime64[D]')
+
+    tmp_path = path + ".tmp"
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "dates.npy"), dates)
+    for field in PRICE_FIELDS:
+        array = np.memmap(os.path.join(tmp_path, f"{field}.f64"), dtype=np.float64, mode='w+',
+                          shape=(len(tickers), len(dates)))
+        for i, ticker in enumerate(tickers):
+            df = history[ticker]
+            column = {'close': df.columns[0], 'return': 'Return', 'volume': 'Volume'}[field]
+            values = df[column]
+            if isinstance(values, pd.DataFrame):
+                values = values.squeeze(axis=1)
+            array[i] = values.reindex(pd.DatetimeIndex(dates)).values.astype(np.float64)
+        array.flush()
+        del array
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({'tickers': tickers, 'fields': PRICE_FIELDS,
+                   'start_date': start_date, 'end_date': end_date}, f, indent=2)
+
+    # Swap the finished store in, so readers never see a half-written one
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    print(f"Saved price store to {path} ({len(tickers)} tickers x {len(dates)} days)")
+    return PriceStore(path)
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import cProfile
+import resource
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+
+# The profiler of the current run, or None. When None, every instrumented
+# function runs untouched, so scoring and notebooks pay nothing for it.
+_ACTIVE = None
+
+
+class RunProfiler:
+    """
+    Collects per-stage records (wall/CPU time, rows, bytes fetched or parsed
+    into frames, peak memory) for one pipeline run.
+
+    Stages nest: a record inherits the labels (event, sector, fold, ...) of the
+    stages around it. Peak memory comes from tracemalloc and is only tracked
+    when `track_memory` is set, since tracing slows allocation-heavy code.
+    """
+
+    def __init__(self, track_memory=False, cprofile=False):
+        self.track_memory = track_memory
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profile = cProfile.Profile() if cprofile else None
+        self._start_wall = None
+        self._start_cpu = None
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def start(self):
+        global _ACTIVE
+        _ACTIVE = self
+        if self.track_memory:
+            tracemalloc.start()
+        if self._profile is not None:
+            self._profile.enable()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        return self
+
+    def stop(self):
+        global _ACTIVE
+        if self._profile is not None:
+            self._profile.disable()
+        if self.track_memory:
+            tracemalloc.stop()
+        self.total_wall = time.perf_counter() - self._start_wall
+        self.total_cpu = time.process_time() - self._start_cpu
+        _ACTIVE = None
+
+    def summary(self):
+        """Aggregate the records by stage and by event."""
+        if not self.records:
+            return {'by_stage': [], 'by_event': []}
+        df = pd.DataFrame(self.records)
+        for col in ['rows', 'bytes_fetched', 'frame_bytes', 'peak_mem_bytes']:
+            if col not in df.columns:
+                df[col] = None
+        agg = {
+            'calls': ('wall_s', 'size'),
+            'wall_s': ('wall_s', 'sum'),
+            'cpu_s': ('cpu_s', 'sum'),
+            'rows': ('rows', 'sum'),
+            'bytes_fetched': ('bytes_fetched', 'sum'),
+            'frame_bytes': ('frame_bytes', 'sum'),
+            'peak_mem_bytes': ('peak_mem_bytes', 'max'),
+        }
+        by_stage = df.groupby('stage').agg(**agg).reset_index().sort_values('wall_s', ascending=False)
+        by_event = []
+        if 'event_key' in df.columns and df['event_key'].notna().any():
+            by_event = df.dropna(subset=['event_key']).groupby(['event_key', 'stage']).agg(**agg).reset_index()
+            by_event = by_event.to_dict(orient='records')
+        return {'by_stage': by_stage.to_dict(orient='records'), 'by_event': by_event}
+
+    def write_report(self, path, **run_info):
+        """Write the machine-readable run report as JSON."""
+        report = {
+            **run_info,
+            'total_wall_s': self.total_wall,
+            'total_cpu_s': self.total_cpu,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'memory_tracked': self.track_memory,
+            **self.summary(),
+            'stages': self.records,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=_json_default)
+        print(f"Saved run report to {path}")
+
+    def dump_profile(self, path):
+        """Write cProfile stats (pstats format, readable by snakeviz, gprof2dot, ...)."""
+        if self._profile is None:
+            return
+        self._profile.dump_stats(path)
+        print(f"Saved cProfile stats to {path}")
+
+
+def _json_default(value):
+    # numpy scalars and NaN-bearing pandas values
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def get_profiler():
+    return _ACTIVE
+
+
+@contextmanager
+def stage(name, **labels):
+    """
+    Time a block as a named stage. Extra keyword labels (event_key, sector,
+    fold, ...) are attached to the record and inherited by nested stages.
+    Yields the record dict, which `record()` adds counters to.
+    """
+    profiler = _ACTIVE
+    if profiler is None:
+        yield {}
+        return
+
+    stack = profiler._stack()
+    inherited = {}
+    for parent in stack:
+        inherited.update(parent['labels'])
+    inherited.update({k: v for k, v in labels.items() if v is not None})
+
+    entry = {'labels': inherited, 'counters': {}, 'child_peak': 0}
+    if profiler.track_memory:
+        # Fold the parent's peak so far into it before resetting for this stage
+        if stack:
+            stack[-1]['child_peak'] = max(stack[-1]['child_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    stack.append(entry)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield entry['counters']
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        stack.pop()
+
+        rec = {'stage': name, **inherited, 'wall_s': wall, 'cpu_s': cpu, **entry['counters']}
+        if profiler.track_memory:
+            peak = max(entry['child_peak'], tracemalloc.get_traced_memory()[1])
+            rec['peak_mem_bytes'] = peak
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+            tracemalloc.reset_peak()
+
+        with profiler._lock:
+            profiler.records.append(rec)
+
+
+def record(**counters):
+    """Add counters (e.g. bytes_fetched=..., rows=...) to the innermost running stage."""
+    profiler = _ACTIVE
+    if profiler is None:
+        return
+    stack = profiler._stack()
+    if not stack:
+        return
+    target = stack[-1]['counters']
+    for key, value in counters.items():
+        target[key] = target.get(key, 0) + value
+
+
+def add_record(name, wall_s, cpu_s, **labels):
+    """
+    Record a stage timed elsewhere, e.g. in a worker process whose own
+    records are lost, under the labels of the running stages.
+    """
+    profiler = _ACTIVE
+    if profiler is None:
+        return
+    inherited = {}
+    for parent in profiler._stack():
+        inherited.update(parent['labels'])
+    inherited.update({k: v for k, v in labels.items() if v is not None})
+    with profiler._lock:
+        profiler.records.append({'stage': name, **inherited, 'wall_s': wall_s, 'cpu_s': cpu_s})
+
+
+def _count_rows(result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, dict) and result and all(isinstance(v, (pd.DataFrame, pd.Series)) for v in result.values()):
+        return sum(len(v) for v in result.values())
+    return None
+
+
+def instrument(stage_name, event_arg=None):
+    """
+    Decorator that runs the function as a profiling stage.
+    `event_arg` names the argument holding the event key (it may also be passed
+    positionally as the first argument). Rows are counted from DataFrame results.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE is None:
+                return func(*args, **kwargs)
+
+            event_key = None
+            if event_arg is not None:
+                event_key = kwargs.get(event_arg, args[0] if args else None)
+
+            with stage(stage_name, event_key=event_key) as counters:
+                result = func(*args, **kwargs)
+                rows = _count_rows(result)
+                if rows is not None and 'rows' not in counters:
+                    counters['rows'] = rows
+                return result
+        return wrapper
+    return decorator
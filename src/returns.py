@@ -1,8 +1,47 @@
 from sklearn.linear_model import LinearRegression
 import os
+import io
 import json
+import zipfile
+import requests
 import numpy as np
 import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Local cache of Kenneth French data library files (daily, in percent in the source)
+FACTOR_DIR = os.path.join(ROOT_DIR, "data", "factors")
+FRENCH_LIBRARY_URL = "https://mba.tuck.dartmouth.edu/pages/faculty/ken.french/ftp"
+FACTOR_FILES = {
+    'ff3': "F-F_Research_Data_Factors_daily_CSV.zip",
+    'ff5': "F-F_Research_Data_5_Factors_2x3_daily_CSV.zip",
+    'industry12': "12_Industry_Portfolios_daily_CSV.zip",
+}
+
+# Normal-return models: regressors of each ETF's return, and whether returns
+# are taken in excess of the risk-free rate. 'market' is the event's index
+# return, 'industry' the ETF's Fama-French 12-industry portfolio (ETF_INDUSTRIES),
+# other names are columns of the model's factor file.
+NORMAL_RETURN_MODELS = {
+    'capm': {'factors': ['market'], 'excess': False, 'source': None},
+    'ff3': {'factors': ['Mkt-RF', 'SMB', 'HML'], 'excess': True, 'source': 'ff3'},
+    'ff5': {'factors': ['Mkt-RF', 'SMB', 'HML', 'RMW', 'CMA'], 'excess': True, 'source': 'ff5'},
+    'market_industry': {'factors': ['market', 'industry'], 'excess': False, 'source': 'industry12'},
+}
+
+# Fama-French 12-industry portfolio of each ETF in config/events.py.
+# ETFs without one (broad state equity, municipal bonds) fall back to the market factor alone.
+ETF_INDUSTRIES = {
+    'XLE': 'Enrgy', 'SMEZ': 'Enrgy',
+    'XLF': 'Money', 'IYF': 'Money', 'KIE': 'Money', 'IAK': 'Money', 'KRE': 'Money', 'IAT': 'Money', 'XLRE': 'Money',
+    'XLB': 'Chems', 'XLI': 'Manuf', 'WOOD': 'Manuf',
+    'XLP': 'NoDur', 'XLY': 'Shops', 'XLV': 'Hlth', 'IYW': 'BusEq',
+    'XLU': 'Utils', 'ICLN': 'Utils', 'QCN': 'Utils',
+    'JETS': 'Other', 'IYT': 'Other', 'XTN': 'Other', 'ITB': 'Other',
+}
+
+_FACTOR_CACHE = {}
 
 # Market model regression to compute normal returns 
 def estimate_market_model(market_df, sector_dict, estimation_window):
@@ -40,6 +79,199 @@ def estimate_market_model(market_df, sector_dict, estimation_window):
     return model_params
 
 
+def capm_sufficient_stats(market_returns, sector_returns):
+    """
+    Prefix sums of the CAPM regression statistics over a shared date index.
+
+    Rows where either return is NaN contribute nothing, matching the NaN
+    dropping in estimate_market_model. Returns an (n + 1, 5) array whose row i
+    holds the sums of [1, x, y, x*x, x*y] over the first i dates, so the
+    statistics of any contiguous window are a difference of two rows.
+    """
+    x = np.asarray(market_returns, dtype=float)
+    y = np.asarray(sector_returns, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    terms = np.column_stack([valid.astype(float), x, y, x * x, x * y])
+    return np.vstack([np.zeros((1, 5)), np.cumsum(terms, axis=0)])
+
+
+def market_model_from_stats(prefix_stats, start, end):
+    """
+    OLS alpha/beta for rows [start, end) from capm_sufficient_stats output.
+    Same result as fitting LinearRegression on that window. start and end
+    may also be arrays of windows, giving arrays of alphas and betas.
+    """
+    n, sx, sy, sxx, sxy = (prefix_stats[end] - prefix_stats[start]).T
+    beta = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    alpha = (sy - beta * sx) / n
+    return {'alpha': alpha, 'beta': beta}
+
+
+def _parse_french_csv(text):
+    """
+    First table of a French data library CSV: the header row starts with ','
+    and data rows with a YYYYMMDD date. Values are converted from percent.
+    """
+    lines = text.splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith(","))
+    columns = [c.strip() for c in lines[start].split(",")[1:]]
+    dates, rows = [], []
+    for line in lines[start + 1:]:
+        fields = [f.strip() for f in line.split(",")]
+        if len(fields[0]) != 8 or not fields[0].isdigit():
+            break
+        dates.append(fields[0])
+        rows.append([float(v) for v in fields[1:]])
+    df = pd.DataFrame(rows, index=pd.to_datetime(dates, format="%Y%m%d"), columns=columns)
+    return df.where(df > -99.99) / 100.0
+
+
+def load_factor_file(name, factor_dir=FACTOR_DIR):
+    """
+    Daily factor or industry returns (decimal) from the local cache in
+    data/factors/{name}.csv, downloading the French library file once if missing.
+    """
+    if name not in FACTOR_FILES:
+        raise ValueError(f"Unknown factor file '{name}', expected one of {list(FACTOR_FILES)}")
+    path = os.path.join(factor_dir, f"{name}.csv")
+    if not os.path.exists(path):
+        print(f"Downloading {FACTOR_FILES[name]} from the French data library...")
+        r = requests.get(f"{FRENCH_LIBRARY_URL}/{FACTOR_FILES[name]}", timeout=60)
+        r.raise_for_status()
+        with zipfile.ZipFile(io.BytesIO(r.content)) as archive:
+            text = archive.read(archive.namelist()[0]).decode("latin-1")
+        os.makedirs(factor_dir, exist_ok=True)
+        _parse_french_csv(text).to_csv(path, index_label='date')
+
+    stamp = os.path.getmtime(path)
+    cached = _FACTOR_CACHE.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, pd.read_csv(path, index_col='date', parse_dates=True))
+        _FACTOR_CACHE[path] = cached
+    return cached[1]
+
+
+def load_model_factors(model, factor_dir=FACTOR_DIR):
+    """Factor data a normal-return model needs (None for CAPM)."""
+    if model not in NORMAL_RETURN_MODELS:
+        raise ValueError(f"Unknown normal-return model '{model}', expected one of {list(NORMAL_RETURN_MODELS)}")
+    source = NORMAL_RETURN_MODELS[model]['source']
+    return load_factor_file(source, factor_dir) if source else None
+
+
+def _model_factors(model, ticker):
+    factors = list(NORMAL_RETURN_MODELS[model]['factors'])
+    if 'industry' in factors and ticker not in ETF_INDUSTRIES:
+        factors.remove('industry')
+    return factors
+
+
+def _factor_series(name, ticker, market_df, factor_data, index):
+    if name == 'market':
+        values = market_df['Return']
+    elif name == 'industry':
+        values = factor_data[ETF_INDUSTRIES[ticker]]
+    else:
+        values = factor_data[name]
+    return values.reindex(index).values.astype(float)
+
+
+def _target_returns(model, ticker, sector_dict, factor_data, index):
+    y = sector_dict[ticker]['Return'].reindex(index).values.astype(float)
+    if NORMAL_RETURN_MODELS[model]['excess']:
+        y = y - factor_data['RF'].reindex(index).values
+    return y
+
+
+def batched_least_squares(X, Y):
+    """
+    OLS coefficients for every column of Y at once.
+
+    X: (n, K) design shared by all series, or (S, n, K) one design per series.
+    Y: (n, S). Rows with NaN are dropped per series. Series with complete rows
+    on a shared design are solved with a single Cholesky factorization of X'X;
+    the rest with one batched solve of their masked normal equations.
+    Returns (S, K).
+    """
+    Y = np.asarray(Y, dtype=float)
+    valid = ~np.isnan(Y)
+    if X.ndim == 2:
+        valid &= ~np.isnan(X).any(axis=1)[:, None]
+    else:
+        valid &= ~np.isnan(X).any(axis=2).T
+    Xz = np.nan_to_num(X)
+    Yz = np.where(valid, Y, 0.0)
+
+    coef = np.empty((Y.shape[1], X.shape[-1]))
+    complete = valid.all(axis=0) if X.ndim == 2 else np.zeros(Y.shape[1], dtype=bool)
+    if complete.any():
+        factor = cho_factor(Xz.T @ Xz)
+        coef[complete] = cho_solve(factor, Xz.T @ Yz[:, complete]).T
+    rest = ~complete
+    if rest.any():
+        W = valid[:, rest].astype(float)
+        if X.ndim == 2:
+            XtX = np.einsum('ns,nk,nl->skl', W, Xz, Xz)
+            XtY = np.einsum('ns,nk,ns->sk', W, Xz, Yz[:, rest])
+        else:
+            Xr = Xz[rest]
+            XtX = np.einsum('ns,snk,snl->skl', W, Xr, Xr)
+            XtY = np.einsum('ns,snk,ns->sk', W, Xr, Yz[:, rest])
+        coef[rest] = np.linalg.solve(XtX, XtY[..., None])[..., 0]
+    return coef
+
+
+def estimate_factor_model(model, market_df, sector_dict, estimation_window, factor_data=None):
+    """
+    Fit a multi-factor normal-return model (see NORMAL_RETURN_MODELS) on the
+    estimation window for every sector at once. Sectors sharing a factor set
+    are solved together with batched_least_squares.
+    Returns {sector: {'model', 'alpha', 'betas': {factor: beta}}}.
+    """
+    if model not in NORMAL_RETURN_MODELS:
+        raise ValueError(f"Unknown normal-return model '{model}', expected one of {list(NORMAL_RETURN_MODELS)}")
+
+    groups = {}
+    for ticker in sector_dict:
+        groups.setdefault(tuple(_model_factors(model, ticker)), []).append(ticker)
+
+    model_params = {}
+    for factors, tickers in groups.items():
+        Y = np.column_stack([_target_returns(model, t, sector_dict, factor_data, estimation_window) for t in tickers])
+        ones = np.ones(len(estimation_window))
+        if 'industry' in factors:
+            X = np.stack([
+                np.column_stack([ones] + [_factor_series(f, t, market_df, factor_data, estimation_window) for f in factors])
+                for t in tickers
+            ])
+        else:
+            X = np.column_stack([ones] + [_factor_series(f, None, market_df, factor_data, estimation_window) for f in factors])
+        coef = batched_least_squares(X, Y)
+        for ticker, c in zip(tickers, coef):
+            model_params[ticker] = {'model': model, 'alpha': c[0], 'betas': dict(zip(factors, c[1:]))}
+    return model_params
+
+
+def compute_factor_abnormal_returns(market_df, sector_dict, model_params, factor_data=None):
+    """
+    Abnormal returns under estimate_factor_model parameters: the sector return
+    (in excess of the risk-free rate for excess-return models) minus
+    alpha + sum(beta * factor), over each sector's full index.
+    """
+    abnormal_returns = {}
+    for sector, df in sector_dict.items():
+        params = model_params[sector]
+        index = df.index
+        expected = np.full(len(index), params['alpha'])
+        for factor, beta in params['betas'].items():
+            expected = expected + beta * _factor_series(factor, sector, market_df, factor_data, index)
+        actual = _target_returns(params['model'], sector, sector_dict, factor_data, index)
+        abnormal_returns[sector] = pd.Series(actual - expected, index=index)
+    return abnormal_returns
+
+
 def save_market_model_params(params, event_key, save_dir="models"):
 
     os.makedirs(save_dir, exist_ok=True)
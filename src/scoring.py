@@ -0,0 +1,390 @@
+import os
+import sys
+import glob
+import json
+import pickle
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import ESTIMATION_DAYS
+from dataset import get_analysis_window
+from models import model_feature_names, predict_model
+from weather import fetch_climatology
+from baselines import WeatherStack
+from market import fetch_market_data
+from planner import event_market_window
+from partitions import event_config_hash
+from feature_store import (
+    FeatureStore,
+    FEATURE_DEFINITIONS,
+    compute_weather_features,
+    compute_market_features,
+    market_feature_columns,
+    point_in_time_join,
+    feature_version,
+)
+from trading_calendar import get_calendar
+from intervals import load_interval_calibration, predict_interval
+from checkpoint import atomic_write
+
+# Training settings scoring must reproduce, saved by analysis.py next to the models;
+# models saved before the file existed predict raw ARs from pre-event mean deltas
+# without engineered features. feature_definitions are the feature store's, set
+# when trained with engineered features.
+MODEL_CONFIG_FILE = "model_config.json"
+DEFAULT_MODEL_CONFIG = {'target': 'ar', 'baseline': 'mean', 'baseline_options': {}, 'feature_definitions': None}
+
+# Market features are per sector; the feature matrix carries one column per (feature, sector)
+MARKET_COLUMN = "{feature}|{sector}"
+
+# Warm model pool: {model_dir: {'stamp': latest mtime, 'models': {(sector, model_name): model}}}
+# Kept at module level so repeated scoring calls in one process never re-read the pickles.
+_MODEL_POOL = {}
+
+
+def load_model_pool(event_type, output_dir="output", reload=False):
+    """
+    Load every saved `{sector}_{model}.pkl` for an event type and keep it in memory.
+    The pool is only re-read when a pickle on disk changes or `reload` is set.
+
+    Returns dict of {(sector, model_name): model}.
+    """
+    model_dir = os.path.abspath(os.path.join(output_dir, event_type, "models"))
+    paths = sorted(glob.glob(os.path.join(model_dir, "*.pkl")))
+    if not paths:
+        raise FileNotFoundError(f"No saved models found in {model_dir}. Run run_analysis.py first.")
+
+    stamp = max(os.path.getmtime(p) for p in paths)
+    cached = _MODEL_POOL.get(model_dir)
+    if cached is not None and not reload and cached['stamp'] == stamp:
+        return cached['models']
+
+    models = {}
+    for path in paths:
+        # Tickers never contain underscores, model names may (e.g. random_forest)
+        sector, model_name = os.path.basename(path)[:-len(".pkl")].split("_", 1)
+        with open(path, "rb") as f:
+            models[(sector, model_name)] = pickle.load(f)
+
+    _MODEL_POOL[model_dir] = {'stamp': stamp, 'models': models}
+    print(f"Loaded {len(models)} models from {model_dir}")
+    return models
+
+
+def save_model_config(model_dir, **config):
+    """Write the settings the models in model_dir were trained with (target, ...)."""
+    os.makedirs(model_dir, exist_ok=True)
+    with atomic_write(os.path.join(model_dir, MODEL_CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_model_config(model_dir):
+    """Settings of the models in model_dir, on top of DEFAULT_MODEL_CONFIG."""
+    path = os.path.join(model_dir, MODEL_CONFIG_FILE)
+    if not os.path.exists(path):
+        return dict(DEFAULT_MODEL_CONFIG)
+    with open(path) as f:
+        return {**DEFAULT_MODEL_CONFIG, **json.load(f)}
+
+
+def _analysis_weather(event_key, event, weather_df):
+    """The weather rows of an event's analysis window, sorted by date."""
+    analysis_start, end_date = get_analysis_window(event)
+    weather_df = weather_df.sort_index()
+    weather_df = weather_df.loc[(weather_df.index >= analysis_start) & (weather_df.index <= end_date)]
+    if weather_df.empty:
+        raise ValueError(f"No weather rows for {event_key} between {analysis_start} and {end_date}")
+    return weather_df
+
+
+def compute_scoring_deltas(events, weather_frames, baseline='mean', baseline_options=None, api_key=None):
+    """
+    delta_* frames of every event under the models' baseline, stacked as in
+    build_pooled_dataset. The climatology baseline fetches the prior years'
+    weather of each analysis window and needs the Visual Crossing api_key.
+    Returns {event_key: DataFrame}.
+    """
+    options = dict(baseline_options or {})
+    stack = WeatherStack(weather_frames, {k: events[k]['event_date'] for k in weather_frames})
+    if baseline == 'climatology':
+        if not api_key:
+            raise ValueError("The models use the climatology baseline; scoring needs an API key to fetch it")
+        windows = {k: (events[k]['location'], *get_analysis_window(events[k]), events[k]['type'])
+                   for k in weather_frames}
+        history = fetch_climatology(api_key, windows, options.pop('years', 5))
+        failed = sorted(k for k, frames in history.items() if isinstance(frames, Exception))
+        if failed:
+            raise ValueError(f"No climatology could be fetched for {failed}")
+        stack.add_climatology(history)
+    return stack.delta_frames(baseline, **options)
+
+
+def build_scoring_features(event_key, event, weather_df, delta_df=None, definitions=FEATURE_DEFINITIONS):
+    """
+    Build the feature rows for one event from a (forecast) weather frame.
+
+    Mirrors build_event_observation: the weather is cut to the event's analysis
+    window, converted to delta_* features (delta_df, by default against the
+    pre-event mean; see compute_scoring_deltas) and restricted to NYSE
+    sessions. Returns a DataFrame with event_key, date, relative_day,
+    relative_trading_day, delta_* and the engineered weather feature columns.
+    """
+    weather_df = _analysis_weather(event_key, event, weather_df)
+    if delta_df is None:
+        delta_df = compute_scoring_deltas({event_key: event}, {event_key: weather_df})[event_key]
+    # Same definitions as the feature store, computed on calendar days before the trading-day cut
+    weather_features = compute_weather_features(event_key, weather_df, delta_df, definitions).set_index('date')
+    calendar = get_calendar()
+    delta_df = delta_df[calendar.is_session(delta_df.index)].ffill().bfill()
+
+    features = delta_df.join(weather_features.drop(columns='event_key'))
+    event_dates = np.repeat(np.datetime64(event['event_date'], 'D'), len(delta_df))
+    features.insert(0, 'relative_trading_day', calendar.relative_trading_days(delta_df.index, event_dates))
+    features.insert(0, 'relative_day', calendar.relative_calendar_days(delta_df.index, event_dates))
+    features.insert(0, 'date', delta_df.index)
+    features.insert(0, 'event_key', event_key)
+    return features.reset_index(drop=True)
+
+
+def _date_indexed(event_key, df):
+    # Weather frames come indexed by date or, as fetched, with a 'datetime' column
+    if 'datetime' in df.columns:
+        return df.set_index(pd.to_datetime(df['datetime'])).drop(columns='datetime')
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError(f"Weather for {event_key} needs a DatetimeIndex or a 'datetime' column")
+    return df
+
+
+def _split_weather(events, weather):
+    """Normalise the weather argument into {event_key: DataFrame indexed by date}."""
+    if isinstance(weather, dict):
+        return {k: _date_indexed(k, df) for k, df in weather.items()}
+    if not isinstance(weather, pd.DataFrame):
+        raise ValueError("weather must be a DataFrame or a dict of DataFrames keyed by event_key")
+
+    if 'event_key' not in weather.columns:
+        if len(events) != 1:
+            raise ValueError("weather frame needs an 'event_key' column when scoring several events")
+        event_key = next(iter(events))
+        return {event_key: _date_indexed(event_key, weather)}
+
+    return {event_key: _date_indexed(event_key, group.drop(columns='event_key'))
+            for event_key, group in weather.groupby('event_key')}
+
+
+def build_market_features(events, sectors, definitions=FEATURE_DEFINITIONS, feature_store=None):
+    """
+    Market features of every event for `sectors`, keyed by (event_key, sector, date)
+    as in feature_store.compute_market_features. Sectors stored in feature_store
+    under the event's current config hash are read from it; the others are
+    computed from prices fetched over the event's market window.
+    """
+    frames = []
+    for event_key, event in events.items():
+        todo = list(sectors)
+        if feature_store is not None and feature_store.has('market', event_key, event_config_hash(event)):
+            stored = feature_store.read('market', [event_key])
+            stored = stored[stored['sector'].isin(todo)]
+            frames.append(stored)
+            todo = [s for s in todo if s not in set(stored['sector'])]
+        if not todo:
+            continue
+
+        estimation_start, end_date = event_market_window(event)
+        market_dict = fetch_market_data([event['index']], estimation_start, end_date)
+        sector_dict = fetch_market_data(todo, estimation_start, end_date)
+        missing = [t for t in [event['index']] if t not in market_dict] + [t for t in todo if t not in sector_dict]
+        if missing:
+            raise ValueError(f"No prices for {missing} to compute the market features of {event_key}")
+        market_df = market_dict[event['index']]
+        estimation_window = market_df.index[market_df.index < event['event_date']][-ESTIMATION_DAYS:]
+        frames.append(compute_market_features(event_key, event['event_date'], sector_dict, estimation_window,
+                                              definitions))
+    return pd.concat(frames, ignore_index=True)
+
+
+def add_market_features(feature_df, market_features, sectors):
+    """
+    Point-in-time join each sector's market features onto the feature rows,
+    as MARKET_COLUMN columns (e.g. 'pre_event_vol|XLE').
+    """
+    rows = feature_df[['event_key', 'date']]
+    columns = {}
+    for sector in sectors:
+        sector_features = market_features[market_features['sector'] == sector].drop(columns='sector')
+        joined = point_in_time_join(rows, sector_features, ['event_key'])
+        for col in sector_features.columns.drop(['event_key', 'date']):
+            columns[MARKET_COLUMN.format(feature=col, sector=sector)] = joined[col].values
+    return feature_df.assign(**columns)
+
+
+def market_feature_sectors(models, definitions, sectors=None):
+    """Sectors with a model that takes market features."""
+    market_columns = set(market_feature_columns(definitions))
+    return sorted({sector for (sector, _), model in models.items()
+                   if (sectors is None or sector in sectors) and market_columns & set(model_feature_names(model))})
+
+
+def open_feature_store(output_dir, event_type, definitions):
+    """The run's feature store for these definitions, or None when it was never written."""
+    root = os.path.join(output_dir, event_type, "feature_store")
+    if not os.path.isdir(os.path.join(root, feature_version(definitions))):
+        return None
+    return FeatureStore(root, definitions)
+
+
+def build_feature_matrix(events, weather, config=None, market_sectors=(), feature_store=None, api_key=None):
+    """
+    Stack the feature rows of every event into a single DataFrame.
+    See score_events for the accepted `events` and `weather` formats.
+    config is the models' load_model_config: weather deltas use its baseline
+    (see compute_scoring_deltas) and, for models trained with engineered
+    features, market features of `market_sectors` are added (see
+    build_market_features).
+    """
+    config = config or DEFAULT_MODEL_CONFIG
+    definitions = config['feature_definitions'] or FEATURE_DEFINITIONS
+    weather_frames = _split_weather(events, weather)
+    for event_key, event in events.items():
+        if event_key not in weather_frames:
+            raise ValueError(f"No weather frame supplied for {event_key}")
+    weather_frames = {k: _analysis_weather(k, event, weather_frames[k]) for k, event in events.items()}
+    deltas = compute_scoring_deltas(events, weather_frames, config['baseline'], config['baseline_options'], api_key)
+    frames = [build_scoring_features(k, event, weather_frames[k], deltas[k], definitions)
+              for k, event in events.items()]
+    feature_df = pd.concat(frames, ignore_index=True)
+
+    if market_sectors:
+        market_features = build_market_features(events, market_sectors, definitions, feature_store)
+        feature_df = add_market_features(feature_df, market_features, market_sectors)
+    return feature_df
+
+
+def model_inputs(feature_df, feature_names, sector):
+    """A model's input columns, with the sector's MARKET_COLUMN columns under their feature names."""
+    columns = {}
+    for name in feature_names:
+        market_col = MARKET_COLUMN.format(feature=name, sector=sector)
+        columns[name] = market_col if market_col in feature_df.columns else name
+    missing = sorted(name for name, col in columns.items() if col not in feature_df.columns)
+    if missing:
+        return None, missing
+    return feature_df[list(columns.values())].set_axis(list(columns), axis=1), []
+
+
+def predict_batch(models, feature_df, sectors=None, groups=None):
+    """
+    Run one predict call per (sector, model) over the full feature matrix.
+    groups keys each row's trajectory for sequence models (default: its
+    event_key). Returns dict of {(sector, model_name): array of AR predictions}.
+    """
+    groups = feature_df['event_key'].values if groups is None else groups
+    predictions = {}
+    for (sector, model_name), model in models.items():
+        if sectors is not None and sector not in sectors:
+            continue
+        X, missing = model_inputs(feature_df, model_feature_names(model), sector)
+        if missing:
+            raise ValueError(f"Weather forecast is missing features {missing} for {sector}_{model_name}")
+        predictions[(sector, model_name)] = np.asarray(predict_model(model, X, groups), dtype=float)
+
+    if not predictions:
+        raise ValueError("No models matched the requested sectors")
+    return predictions
+
+
+def predict_intervals(models, feature_df, predictions, calibration):
+    """
+    AR prediction intervals of every predicted (sector, model) with a
+    conformal calibration (see intervals.load_interval_calibration).
+    Returns dict of {(sector, model_name): (lo, hi)}.
+    """
+    bounds = {}
+    for key, preds in predictions.items():
+        if key in calibration:
+            X, _ = model_inputs(feature_df, model_feature_names(models[key]), key[0])
+            bounds[key] = predict_interval(models[key], X, preds, calibration[key])
+    return bounds
+
+
+def predictions_to_frame(feature_df, predictions, bounds=None, target='ar'):
+    """
+    Turn predict_batch output into a long frame with per-(event, sector, model) CAR.
+    Columns: event_key, date, relative_day, sector, model, target, ar_pred,
+    car_pred, plus ar_lo and ar_hi when interval `bounds` are given (NaN for
+    models without a calibration). target says what the models predict: 'ar',
+    or 'sar' for volatility-standardized ARs.
+    """
+    blocks = []
+    for (sector, model_name), preds in predictions.items():
+        block = pd.DataFrame({
+            'event_key': feature_df['event_key'].values,
+            'date': feature_df['date'].values,
+            'relative_day': feature_df['relative_day'].values,
+            'sector': sector,
+            'model': model_name,
+            'target': target,
+            'ar_pred': preds,
+        })
+        if bounds is not None:
+            block['ar_lo'], block['ar_hi'] = bounds.get((sector, model_name), (np.nan, np.nan))
+        blocks.append(block)
+
+    scores = pd.concat(blocks, ignore_index=True)
+    scores = scores.sort_values(['event_key', 'sector', 'model', 'relative_day'], kind='stable')
+    scores['car_pred'] = scores.groupby(['event_key', 'sector', 'model'])['ar_pred'].cumsum()
+    return scores.reset_index(drop=True)
+
+
+def score_events(events, weather, event_type=None, output_dir="output", sectors=None, models=None, api_key=None):
+    """
+    Predict AR and CAR for one or many new events with the saved final models.
+
+    events:  dict of {event_key: event} in the config/events.py schema
+    weather: weather forecast per event, either a dict of {event_key: DataFrame}
+             or one DataFrame with an 'event_key' column (a single-event frame
+             may omit it). Frames are indexed by date with raw weather columns.
+
+    All events are stacked into one feature matrix, so each (sector, model)
+    pair is evaluated with a single predict call. Weather deltas are taken
+    against the baseline the models were trained with; api_key is only needed
+    for the climatology baseline.
+
+    Returns a long DataFrame with columns
+    event_key, date, relative_day, sector, model, target, ar_pred, car_pred,
+    and conformal AR interval bounds ar_lo, ar_hi when the models were loaded
+    from disk with their {sector}_intervals.json calibrations. target is the
+    one the saved models were trained on (see load_model_config).
+    """
+    if event_type is None:
+        event_type = infer_event_type(events)
+
+    calibration = None
+    config = dict(DEFAULT_MODEL_CONFIG)
+    if models is None:
+        model_dir = os.path.join(output_dir, event_type, "models")
+        models = load_model_pool(event_type, output_dir)
+        calibration = load_interval_calibration(model_dir)
+        config = load_model_config(model_dir)
+
+    feature_store = None
+    definitions = config['feature_definitions'] or FEATURE_DEFINITIONS
+    market_sectors = market_feature_sectors(models, definitions, sectors)
+    if market_sectors:
+        feature_store = open_feature_store(output_dir, event_type, definitions)
+    feature_df = build_feature_matrix(events, weather, config, market_sectors, feature_store, api_key)
+    predictions = predict_batch(models, feature_df, sectors)
+    bounds = predict_intervals(models, feature_df, predictions, calibration) if calibration else None
+    return predictions_to_frame(feature_df, predictions, bounds, config['target'])
+
+
+def infer_event_type(events):
+    """Return the single disaster type shared by all events."""
+    types = {event['type'] for event in events.values()}
+    if len(types) != 1:
+        raise ValueError(f"Events span several types {sorted(types)}; score each type separately")
+    return types.pop()
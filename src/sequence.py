@@ -0,0 +1,214 @@
+import os
+import copy
+import numpy as np
+import pandas as pd
+
+# PyTorch is optional: without it the LSTM cannot be added to a run (run_analysis.py --lstm)
+try:
+    import torch
+    from torch import nn
+    from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
+except ImportError:
+    torch = None
+
+TORCH_AVAILABLE = torch is not None
+
+LSTM_PARAMS = {
+    'hidden_size': 32,
+    'num_layers': 1,
+    'max_epochs': 200,
+    'batch_size': 64,          # trajectories per minibatch
+    'learning_rate': 0.01,
+    'patience': 10,            # epochs without validation improvement before stopping
+    'val_fraction': 0.15,      # last trajectories held out for early stopping, as for XGBoost
+}
+
+# Intra-op threads for CPU training; small recurrent nets stop scaling beyond a few cores
+LSTM_THREADS = min(4, os.cpu_count() or 1)
+
+# Points on the integrated-gradients path of SequenceRegressor.attributions
+ATTRIBUTION_STEPS = 32
+
+
+def split_trajectories(groups, relative_days):
+    """
+    Row positions of each trajectory: the rows sharing a group key (the
+    event_key within one sector's rows), ordered by relative_day. Rows may
+    come in any order and relative days may have gaps; trajectories keep
+    the order in which their groups first appear.
+    """
+    groups = np.asarray(groups)
+    if len(groups) != len(relative_days):
+        raise ValueError("Trajectory groups must give one key per row")
+    codes = pd.factorize(groups)[0]
+    order = np.lexsort((np.asarray(relative_days), codes))
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes[order])) + 1, [len(order)]])
+    return [order[lo:hi] for lo, hi in zip(starts[:-1], starts[1:])]
+
+
+def _pad(values, trajectories):
+    """(n_rows, ...) rows -> (n_trajectories, max_length, ...) zero-padded array."""
+    max_length = max(len(t) for t in trajectories)
+    padded = np.zeros((len(trajectories), max_length) + values.shape[1:], dtype=np.float32)
+    for i, rows in enumerate(trajectories):
+        padded[i, :len(rows)] = values[rows]
+    return padded
+
+
+if TORCH_AVAILABLE:
+    class _LSTMNet(nn.Module):
+        def __init__(self, n_features, hidden_size, num_layers):
+            super().__init__()
+            self.lstm = nn.LSTM(n_features, hidden_size, num_layers=num_layers, batch_first=True)
+            self.head = nn.Linear(hidden_size, 1)
+
+        def forward(self, x, lengths):
+            # Packing skips the padded steps, so short trajectories cost only their own length
+            packed = pack_padded_sequence(x, lengths, batch_first=True, enforce_sorted=False)
+            out, _ = self.lstm(packed)
+            out, _ = pad_packed_sequence(out, batch_first=True, total_length=x.shape[1])
+            return self.head(out).squeeze(-1)
+
+
+def _configure_threads():
+    if torch.get_num_threads() != LSTM_THREADS:
+        torch.set_num_threads(LSTM_THREADS)
+
+
+class SequenceRegressor:
+    """
+    LSTM over per-(event, sector) relative-day trajectories, predicting the
+    AR of every day from the features of that day and the days before it.
+    Takes and returns flat rows like the other registry models, plus the
+    trajectory key (event_key) of every row as `groups`.
+    """
+
+    def __init__(self, feature_names, params=None):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.params = {**LSTM_PARAMS, **(params or {})}
+        self.best_epoch = None
+
+    def _trajectories(self, X, groups):
+        if groups is None:
+            raise ValueError("The LSTM needs the trajectory key (event_key) of every row as groups")
+        if 'relative_day' not in X.columns:
+            raise ValueError("The LSTM needs relative_day among its features to order trajectories")
+        return split_trajectories(groups, X['relative_day'].values)
+
+    def _tensors(self, X, trajectories):
+        values = (X[list(self.feature_names_in_)].values.astype(np.float64) - self._x_mean) / self._x_std
+        lengths = torch.tensor([len(t) for t in trajectories])
+        return torch.from_numpy(_pad(values, trajectories)), lengths
+
+    def _loss(self, x, y, lengths):
+        pred = self.net(x, lengths)
+        mask = torch.arange(x.shape[1])[None, :] < lengths[:, None]
+        return ((pred - y) ** 2)[mask].mean()
+
+    def fit(self, X, y, groups=None):
+        _configure_threads()
+        torch.manual_seed(42)
+        p = self.params
+        self._x_mean = X.values.mean(axis=0)
+        self._x_std = np.where(X.values.std(axis=0) > 0, X.values.std(axis=0), 1.0)
+        y = np.asarray(y, dtype=np.float64)
+        self._y_mean, self._y_std = y.mean(), (y.std() if y.std() > 0 else 1.0)
+
+        trajectories = self._trajectories(X, groups)
+        x_all, lengths_all = self._tensors(X, trajectories)
+        y_all = torch.from_numpy(_pad((y - self._y_mean) / self._y_std, trajectories))
+
+        n_val = int(len(trajectories) * p['val_fraction']) if len(trajectories) > 1 else 0
+        n_train = len(trajectories) - n_val
+
+        self.net = _LSTMNet(X.shape[1], p['hidden_size'], p['num_layers'])
+        optimizer = torch.optim.Adam(self.net.parameters(), lr=p['learning_rate'])
+        best_loss, best_state, stale = np.inf, None, 0
+        for epoch in range(p['max_epochs']):
+            self.net.train()
+            order = torch.randperm(n_train)
+            for start in range(0, n_train, p['batch_size']):
+                batch = order[start:start + p['batch_size']]
+                optimizer.zero_grad()
+                loss = self._loss(x_all[batch], y_all[batch], lengths_all[batch])
+                loss.backward()
+                optimizer.step()
+
+            if not n_val:
+                continue
+            self.net.eval()
+            with torch.no_grad():
+                val_loss = self._loss(x_all[n_train:], y_all[n_train:], lengths_all[n_train:]).item()
+            if val_loss < best_loss:
+                best_loss, best_state, stale = val_loss, copy.deepcopy(self.net.state_dict()), 0
+                self.best_epoch = epoch
+            else:
+                stale += 1
+                if stale >= p['patience']:
+                    break
+        if best_state is not None:
+            self.net.load_state_dict(best_state)
+        self.net.eval()
+        return self
+
+    def predict(self, X, groups=None):
+        _configure_threads()
+        trajectories = self._trajectories(X, groups)
+        x, lengths = self._tensors(X, trajectories)
+        with torch.no_grad():
+            padded = self.net(x, lengths).numpy()
+        preds = np.empty(len(X))
+        for i, rows in enumerate(trajectories):
+            preds[rows] = padded[i, :len(rows)]
+        return preds * self._y_std + self._y_mean
+
+    def attributions(self, X, groups, background=None, steps=ATTRIBUTION_STEPS):
+        """
+        Integrated gradients of every row's prediction from a baseline
+        trajectory holding the background feature means (default: the
+        training means) on every day. A row's attribution to a feature sums
+        the feature's contributions on that day and the days before it, so
+        base + values.sum(1) matches the prediction up to the midpoint-rule
+        error of the path integral. Returns (values (n, F), base (n,)).
+        """
+        _configure_threads()
+        trajectories = self._trajectories(X, groups)
+        x, lengths = self._tensors(X, trajectories)
+        n_traj, max_length, n_features = x.shape
+        ref = np.zeros(n_features)
+        if background is not None:
+            background = background[list(self.feature_names_in_)] if hasattr(background, 'columns') else background
+            ref = (np.asarray(background, dtype=np.float64).mean(axis=0) - self._x_mean) / self._x_std
+        ref = torch.tensor(ref, dtype=torch.float32).expand_as(x).contiguous()
+        delta = x - ref
+
+        # All path points of all trajectories in one batch; outputs only depend on their own trajectory
+        alphas = (torch.arange(steps, dtype=torch.float32) + 0.5) / steps
+        path = (ref[None] + alphas[:, None, None, None] * delta[None]).reshape(-1, max_length, n_features)
+        path.requires_grad_(True)
+        out = self.net(path, lengths.repeat(steps))
+        attr = torch.zeros(n_traj, max_length, n_features)
+        for t in range(max_length):
+            grad, = torch.autograd.grad(out[:, t].sum(), path, retain_graph=t < max_length - 1)
+            attr[:, t] = (grad.reshape(steps, n_traj, max_length, n_features).mean(dim=0) * delta).sum(dim=1)
+        with torch.no_grad():
+            base_out = self.net(ref, lengths).numpy()
+
+        values = np.empty((len(X), n_features))
+        base = np.empty(len(X))
+        attr = attr.numpy()
+        for i, rows in enumerate(trajectories):
+            values[rows] = attr[i, :len(rows)]
+            base[rows] = base_out[i, :len(rows)]
+        return values * self._y_std, base * self._y_std + self._y_mean
+
+
+def train_lstm(X_train, y_train, X_test, y_test, params=None, groups_train=None, groups_test=None):
+    """
+    Train the LSTM sequence model. Returns (predictions, model).
+    groups_train / groups_test hold each row's trajectory key (event_key).
+    """
+    if not TORCH_AVAILABLE:
+        raise ImportError("The LSTM model needs PyTorch (pip install torch)")
+    model = SequenceRegressor(list(X_train.columns), params).fit(X_train, y_train, groups_train)
+    return model.predict(X_test, groups_test), model
@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import queue
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from config.events import EVENTS, EVENT_TYPE_DEFAULTS
+from scoring import (
+    load_model_pool,
+    load_model_config,
+    open_feature_store,
+    market_feature_sectors,
+    build_feature_matrix,
+    infer_event_type,
+    predict_batch,
+    predict_intervals,
+    predictions_to_frame,
+)
+from intervals import load_interval_calibration
+from feature_store import FEATURE_DEFINITIONS
+
+
+class LatencyTracker:
+    """Rolling windows of request latencies with p50/p99 summaries, kept apart for successes and errors."""
+
+    def __init__(self, window=10000):
+        self._samples = deque(maxlen=window)
+        self._error_samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            if error:
+                self._error_samples.append(seconds)
+                self.errors += 1
+            else:
+                self._samples.append(seconds)
+                self.count += 1
+
+    @staticmethod
+    def _percentiles(samples, prefix=''):
+        if len(samples) == 0:
+            return {f'{prefix}p50_ms': None, f'{prefix}p99_ms': None}
+        return {
+            f'{prefix}p50_ms': float(np.percentile(samples, 50) * 1000),
+            f'{prefix}p99_ms': float(np.percentile(samples, 99) * 1000),
+        }
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples)
+            error_samples = np.array(self._error_samples)
+        return {
+            'count': self.count,
+            **self._percentiles(samples),
+            'errors': self.errors,
+            **self._percentiles(error_samples, 'error_'),
+        }
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of prediction frames keyed by feature-matrix hash."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(event_type, feature_df):
+        row_hashes = pd.util.hash_pandas_object(feature_df, index=False).values
+        digest = hashlib.sha1(row_hashes.tobytes())
+        digest.update(event_type.encode())
+        digest.update(",".join(feature_df.columns).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent feature matrices and runs them through one predict call
+    per (sector, model). A batch is flushed when it reaches `max_batch_rows` or
+    when the oldest request has waited `max_wait_ms`.
+    """
+
+    def __init__(self, models, max_batch_rows=4096, max_wait_ms=5):
+        self.models = models
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.batched_requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, feature_df):
+        """Queue a feature matrix. Returns a Future resolving to predict_batch output."""
+        future = Future()
+        self._queue.put((feature_df, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while rows < self.max_batch_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+                rows += len(nxt[0])
+
+            self._predict(batch)
+            if stop:
+                return
+
+    def _predict(self, batch):
+        try:
+            stacked = pd.concat([feature_df for feature_df, _ in batch], ignore_index=True)
+            # Requests may repeat an event; key trajectories by request as well
+            groups = np.concatenate([[f"{i}:{key}" for key in feature_df['event_key']]
+                                     for i, (feature_df, _) in enumerate(batch)])
+            predictions = predict_batch(self.models, stacked, groups=groups)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.batched_requests += len(batch)
+
+        # Split the stacked predictions back into each request's rows
+        offset = 0
+        for feature_df, future in batch:
+            n = len(feature_df)
+            future.set_result({key: preds[offset:offset + n] for key, preds in predictions.items()})
+            offset += n
+
+
+class PredictionService:
+    """
+    Local AR/CAR prediction service over the saved pooled models.
+
+    All models under `output_dir` are loaded once at start-up. Requests are
+    featurised with the same code and weather baseline as training
+    (src/scoring.py -> src/dataset.py and src/baselines.py), micro-batched per
+    event type and cached by the hash of their feature matrix.
+    """
+
+    def __init__(self, output_dir="output", event_types=None, max_batch_rows=4096,
+                 max_wait_ms=5, cache_size=1024, api_key=None):
+        if event_types is None:
+            event_types = [t for t in EVENT_TYPE_DEFAULTS if os.path.isdir(os.path.join(output_dir, t, "models"))]
+        if not event_types:
+            raise FileNotFoundError(f"No trained models found under {output_dir}/")
+
+        self.batchers = {
+            event_type: MicroBatcher(load_model_pool(event_type, output_dir), max_batch_rows, max_wait_ms)
+            for event_type in event_types
+        }
+        self.calibrations = {
+            event_type: load_interval_calibration(os.path.join(output_dir, event_type, "models"))
+            for event_type in event_types
+        }
+        self.model_configs = {
+            event_type: load_model_config(os.path.join(output_dir, event_type, "models"))
+            for event_type in event_types
+        }
+        # Models trained with engineered features also take per-sector market features
+        self.market_sectors = {}
+        self.feature_stores = {}
+        for event_type, config in self.model_configs.items():
+            definitions = config['feature_definitions'] or FEATURE_DEFINITIONS
+            self.market_sectors[event_type] = market_feature_sectors(self.batchers[event_type].models, definitions)
+            self.feature_stores[event_type] = None
+            if self.market_sectors[event_type]:
+                self.feature_stores[event_type] = open_feature_store(output_dir, event_type, definitions)
+        # Only models trained on the climatology baseline need it, to fetch prior years
+        self.api_key = api_key
+        self.cache = ResponseCache(cache_size)
+        self.latency = LatencyTracker()
+        self._server = None
+        self._thread = None
+
+    def predict(self, payload):
+        """
+        Score a request payload:
+            {"events": {event_key: event}, "event_keys": [...],
+             "weather": {event_key: [{"datetime": ..., "temp": ..., ...}, ...]}}
+        Returns a list of prediction records.
+        """
+        events = dict(payload.get('events') or {})
+        for key in payload.get('event_keys') or []:
+            events[key] = EVENTS[key]
+        if not events:
+            raise ValueError("Request must contain 'events' and/or 'event_keys'")
+
+        weather = {key: pd.DataFrame(records) for key, records in (payload.get('weather') or {}).items()}
+
+        event_type = payload.get('event_type') or infer_event_type(events)
+        if event_type not in self.batchers:
+            raise ValueError(f"No models loaded for event type '{event_type}'")
+
+        feature_df = build_feature_matrix(events, weather, self.model_configs[event_type],
+                                          self.market_sectors[event_type], self.feature_stores[event_type],
+                                          self.api_key)
+        cache_key = ResponseCache.key(event_type, feature_df)
+        records = self.cache.get(cache_key)
+        if records is None:
+            predictions = self.batchers[event_type].submit(feature_df).result()
+            calibration = self.calibrations[event_type]
+            bounds = None
+            if calibration:
+                bounds = predict_intervals(self.batchers[event_type].models, feature_df, predictions, calibration)
+            scores = predictions_to_frame(feature_df, predictions, bounds, self.model_configs[event_type]['target'])
+            scores['date'] = scores['date'].dt.strftime('%Y-%m-%d')
+            records = scores.to_dict(orient='records')
+            self.cache.put(cache_key, records)
+        return records
+
+    def stats(self):
+        return {
+            'latency': self.latency.summary(),
+            'cache': {'hits': self.cache.hits, 'misses': self.cache.misses},
+            'batches': {
+                t: {'batches': b.batches, 'requests': b.batched_requests}
+                for t, b in self.batchers.items()
+            },
+        }
+
+    def start(self, host="127.0.0.1", port=8060):
+        """Serve on host:port from a background thread. Returns the bound port."""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+def _make_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {'status': 'ok', 'event_types': sorted(service.batchers)})
+            elif self.path == "/metrics":
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {'error': f"Unknown path {self.path}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length))
+                records = service.predict(payload)
+            except (ValueError, KeyError) as e:
+                service.latency.record(time.perf_counter() - start, error=True)
+                self._send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                service.latency.record(time.perf_counter() - start, error=True)
+                self._send_json(500, {'error': str(e)})
+                return
+            service.latency.record(time.perf_counter() - start)
+            self._send_json(200, {'predictions': records})
+
+        def log_message(self, format, *args):
+            # Keep per-request access logs out of stdout
+            pass
+
+    return Handler
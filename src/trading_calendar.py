@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# NYSE closures outside the regular holiday rules
+SPECIAL_CLOSURES = [
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",  # September 11
+    "2004-06-11",                                            # President Reagan funeral
+    "2007-01-02",                                            # President Ford funeral
+    "2012-10-29", "2012-10-30",                              # Hurricane Sandy
+    "2018-12-05",                                            # President G.H.W. Bush funeral
+    "2025-01-09",                                            # President Carter funeral
+]
+
+CALENDAR_START = "1990-01-01"
+CALENDAR_END = "2035-12-31"
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return pd.Timestamp(year, month, day)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based) weekday of a month; n=-1 for the last one."""
+    if n > 0:
+        first = pd.Timestamp(year, month, 1)
+        return first + pd.Timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = pd.Timestamp(year, month, 1) + pd.offsets.MonthEnd(0)
+    return last - pd.Timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(date):
+    # Saturday holidays are observed on Friday, Sunday holidays on Monday
+    if date.weekday() == 5:
+        return date - pd.Timedelta(days=1)
+    if date.weekday() == 6:
+        return date + pd.Timedelta(days=1)
+    return date
+
+
+def nyse_holidays(year):
+    """Regular NYSE full-day holidays of a year."""
+    holidays = []
+    new_year = pd.Timestamp(year, 1, 1)
+    # NYSE does not close on Dec 31 when New Year's Day falls on a Saturday
+    if new_year.weekday() != 5:
+        holidays.append(_observed(new_year))
+    if year >= 1998:
+        holidays.append(_nth_weekday(year, 1, 0, 3))          # Martin Luther King Jr. Day
+    holidays.append(_nth_weekday(year, 2, 0, 3))              # Washington's Birthday
+    holidays.append(_easter(year) - pd.Timedelta(days=2))     # Good Friday
+    holidays.append(_nth_weekday(year, 5, 0, -1))             # Memorial Day
+    if year >= 2022:
+        holidays.append(_observed(pd.Timestamp(year, 6, 19)))  # Juneteenth
+    holidays.append(_observed(pd.Timestamp(year, 7, 4)))      # Independence Day
+    holidays.append(_nth_weekday(year, 9, 0, 1))              # Labor Day
+    holidays.append(_nth_weekday(year, 11, 3, 4))             # Thanksgiving
+    holidays.append(_observed(pd.Timestamp(year, 12, 25)))    # Christmas
+    return holidays
+
+
+def _day_numbers(dates):
+    return np.asarray(pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64))
+
+
+class TradingCalendar:
+    """
+    Precomputed NYSE session calendar with integer day ordinals.
+
+    Every calendar day between `start` and `end` gets the number of sessions
+    before it, so session ordinals, trading-day offsets and session tests
+    are single array lookups over any number of dates.
+    """
+
+    def __init__(self, start=CALENDAR_START, end=CALENDAR_END):
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        days = pd.date_range(self.start, self.end)
+
+        closed = set()
+        for year in range(self.start.year, self.end.year + 1):
+            closed.update(nyse_holidays(year))
+        closed.update(pd.Timestamp(d) for d in SPECIAL_CLOSURES)
+
+        self._first_day = _day_numbers([self.start])[0]
+        self._is_session = (days.dayofweek < 5) & ~days.isin(list(closed))
+        # _sessions_before[i]: sessions strictly before day i (one extra entry past the end)
+        self._sessions_before = np.concatenate([[0], np.cumsum(self._is_session)])
+        self.sessions = days[self._is_session]
+
+    def _positions(self, dates):
+        positions = _day_numbers(dates) - self._first_day
+        if len(positions) and (positions.min() < 0 or positions.max() >= len(self._is_session)):
+            raise ValueError(f"Dates outside the trading calendar ({self.start.date()} to {self.end.date()})")
+        return positions
+
+    def is_session(self, dates):
+        """Boolean array: which dates are NYSE trading sessions."""
+        return self._is_session[self._positions(dates)]
+
+    def ordinals(self, dates):
+        """
+        Session ordinal of each date (0 = first session of the calendar).
+        Non-session dates map to the next session.
+        """
+        return self._sessions_before[self._positions(dates)]
+
+    def sessions_in_range(self, start_date, end_date):
+        """Sessions between start_date and end_date, both inclusive."""
+        lo, hi = self.ordinals([start_date, pd.Timestamp(end_date) + pd.Timedelta(days=1)])
+        return self.sessions[lo:hi]
+
+    def relative_trading_days(self, dates, event_dates):
+        """
+        Trading-day offset of each date from its event date: 0 is the first
+        session on or after the event date, 1 the next session, -1 the last
+        session before it.
+        """
+        return self.ordinals(dates) - self.ordinals(event_dates)
+
+    @staticmethod
+    def relative_calendar_days(dates, event_dates):
+        """Calendar-day offset of each date from its event date."""
+        return _day_numbers(dates) - _day_numbers(event_dates)
+
+
+_CALENDAR = None
+
+
+def get_calendar():
+    """Shared TradingCalendar, built on first use."""
+    global _CALENDAR
+    if _CALENDAR is None:
+        _CALENDAR = TradingCalendar()
+    return _CALENDAR
@@ -1,14 +1,41 @@
 import os
+import time
+import pickle
 import numpy as np
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from sklearn.metrics import r2_score
+from profiling import instrument, add_record
 
+# Figures are built with the object-oriented API on an Agg canvas, so no
+# pyplot global state is involved and rendering is safe in worker processes.
 
-def plot_actual_vs_predicted(y_true, y_pred, model_name, sector, event_type, save_dir):
-    """Scatter plot of actual vs predicted AR with 45-degree reference line."""
+MODEL_STYLES = {
+    'xgboost': ('b--', 'XGBoost'),
+    'random_forest': ('g--', 'RF'),
+    'ols': ('r:', 'OLS'),
+}
+
+
+def _new_figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _save_figure(fig, path):
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+
+
+@instrument('plot_actual_vs_predicted')
+def plot_actual_vs_predicted(y_true, y_pred, model_name, sector, event_type, save_dir, target='ar'):
+    """Scatter plot of actual vs predicted AR (or SAR, by `target`) with 45-degree reference line."""
     os.makedirs(save_dir, exist_ok=True)
 
-    fig, ax = plt.subplots(figsize=(7, 7))
+    fig = _new_figure((7, 7))
+    ax = fig.add_subplot()
     ax.scatter(y_true, y_pred, alpha=0.5, s=20)
 
     # 45-degree reference line
@@ -20,15 +47,14 @@ def plot_actual_vs_predicted(y_true, y_pred, model_name, sector, event_type, sav
 
     r2 = r2_score(y_true, y_pred)
     ax.set_title(f"{model_name} | {sector} ({event_type})\nR² = {r2:.4f}")
-    ax.set_xlabel("Actual AR")
-    ax.set_ylabel("Predicted AR")
+    ax.set_xlabel(f"Actual {target.upper()}")
+    ax.set_ylabel(f"Predicted {target.upper()}")
     ax.grid(True, alpha=0.3)
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_dir, f"{sector}_scatter_{model_name}.png"), dpi=150)
-    plt.close()
+    _save_figure(fig, os.path.join(save_dir, f"{sector}_scatter_{model_name}.png"))
 
 
+@instrument('plot_feature_importance')
 def plot_feature_importance(model, feature_names, sector, event_type, save_dir):
     """Bar chart of XGBoost feature importances."""
     os.makedirs(save_dir, exist_ok=True)
@@ -49,16 +75,36 @@ def plot_feature_importance(model, feature_names, sector, event_type, save_dir):
     names = list(mapped.keys())
     values = list(mapped.values())
 
-    fig, ax = plt.subplots(figsize=(8, 5))
+    fig = _new_figure((8, 5))
+    ax = fig.add_subplot()
     ax.barh(names, values)
     ax.set_title(f"Feature Importance (Gain) | {sector} ({event_type})")
     ax.set_xlabel("Gain")
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_dir, f"{sector}_importance_xgb.png"), dpi=150)
-    plt.close()
+    _save_figure(fig, os.path.join(save_dir, f"{sector}_importance_xgb.png"))
+
+
+@instrument('plot_attribution_summary')
+def plot_attribution_summary(attributions, feature_names, sector, event_type, save_dir):
+    """Mean |attribution| per feature, one panel per model ({model: (values, base)})."""
+    if not attributions:
+        return
+    os.makedirs(save_dir, exist_ok=True)
+
+    fig = _new_figure((5 * len(attributions), 5))
+    axes = fig.subplots(1, len(attributions), squeeze=False)[0]
+    for ax, (model_name, (values, _)) in zip(axes, attributions.items()):
+        mean_abs = np.abs(values).mean(axis=0)
+        order = np.argsort(mean_abs)
+        ax.barh(np.asarray(feature_names)[order], mean_abs[order])
+        ax.set_title(MODEL_STYLES.get(model_name, (None, model_name))[1])
+        ax.set_xlabel("Mean |SHAP| (AR)")
+    fig.suptitle(f"Feature Attributions | {sector} ({event_type})", fontsize=13)
+
+    _save_figure(fig, os.path.join(save_dir, f"{sector}_attributions.png"))
 
 
+@instrument('plot_car_by_event')
 def plot_car_by_event(predictions_df, sector, event_type, save_dir):
     """
     Plot predicted vs actual CAR trajectories for each held-out event.
@@ -71,7 +117,12 @@ def plot_car_by_event(predictions_df, sector, event_type, save_dir):
     cols = min(3, n_events)
     rows = (n_events + cols - 1) // cols
 
-    fig, axes = plt.subplots(rows, cols, figsize=(6 * cols, 4 * rows), squeeze=False)
+    model_names = [c[len('car_pred_'):] for c in predictions_df.columns if c.startswith('car_pred_')]
+    # Cumulative target: CAR, or CSAR for volatility-standardized ARs
+    label = f"C{predictions_df['target'].iloc[0].upper()}" if 'target' in predictions_df else "CAR"
+
+    fig = _new_figure((6 * cols, 4 * rows))
+    axes = fig.subplots(rows, cols, squeeze=False)
 
     for idx, event_key in enumerate(events):
         ax = axes[idx // cols][idx % cols]
@@ -79,14 +130,14 @@ def plot_car_by_event(predictions_df, sector, event_type, save_dir):
 
         days = event_data['relative_day'].values
         ax.plot(days, event_data['car_true'].values, 'k-', linewidth=2, label='Actual')
-        ax.plot(days, event_data['car_pred_xgboost'].values, 'b--', linewidth=1, label='XGBoost')
-        ax.plot(days, event_data['car_pred_random_forest'].values, 'g--', linewidth=1, label='RF')
-        ax.plot(days, event_data['car_pred_ols'].values, 'r:', linewidth=1, label='OLS')
+        for model_name in model_names:
+            style, label = MODEL_STYLES.get(model_name, ('-.', model_name))
+            ax.plot(days, event_data[f'car_pred_{model_name}'].values, style, linewidth=1, label=label)
 
         ax.axvline(x=0, color='gray', linestyle=':', alpha=0.5)
         ax.set_title(event_key, fontsize=10)
         ax.set_xlabel("Relative Day")
-        ax.set_ylabel("CAR")
+        ax.set_ylabel(label)
         ax.legend(fontsize=7)
         ax.grid(True, alpha=0.3)
 
@@ -94,12 +145,11 @@ def plot_car_by_event(predictions_df, sector, event_type, save_dir):
     for idx in range(n_events, rows * cols):
         axes[idx // cols][idx % cols].set_visible(False)
 
-    fig.suptitle(f"CAR Trajectories | {sector} ({event_type})", fontsize=13)
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_dir, f"{sector}_car_by_event.png"), dpi=150)
-    plt.close()
+    fig.suptitle(f"{label} Trajectories | {sector} ({event_type})", fontsize=13)
+    _save_figure(fig, os.path.join(save_dir, f"{sector}_car_by_event.png"))
 
 
+@instrument('plot_cv_metrics_summary')
 def plot_cv_metrics_summary(summary_df, event_type, save_dir):
     """
     Bar chart comparing models across sectors for key metrics.
@@ -108,12 +158,21 @@ def plot_cv_metrics_summary(summary_df, event_type, save_dir):
     os.makedirs(save_dir, exist_ok=True)
 
     metrics_to_plot = ['rmse', 'mae', 'r2']
-    fig, axes = plt.subplots(1, len(metrics_to_plot), figsize=(6 * len(metrics_to_plot), 5))
+    fig = _new_figure((6 * len(metrics_to_plot), 5))
+    axes = fig.subplots(1, len(metrics_to_plot))
 
     for i, metric in enumerate(metrics_to_plot):
         ax = axes[i]
         pivot = summary_df.pivot(index='sector', columns='model', values=metric)
-        pivot.plot(kind='bar', ax=ax)
+
+        # Grouped bars, one group per sector and one bar per model
+        x = np.arange(len(pivot.index))
+        width = 0.8 / max(len(pivot.columns), 1)
+        for j, model_name in enumerate(pivot.columns):
+            ax.bar(x + (j - (len(pivot.columns) - 1) / 2) * width, pivot[model_name].values, width, label=model_name)
+        ax.set_xticks(x)
+        ax.set_xticklabels(pivot.index, rotation=90)
+
         ax.set_title(f"{metric.upper()}")
         ax.set_xlabel("Sector")
         ax.set_ylabel(metric.upper())
@@ -121,6 +180,105 @@ def plot_cv_metrics_summary(summary_df, event_type, save_dir):
         ax.grid(True, alpha=0.3, axis='y')
 
     fig.suptitle(f"Model Comparison | {event_type}", fontsize=13)
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_dir, f"cv_metrics_summary.png"), dpi=150)
-    plt.close()
\ No newline at end of file
+    _save_figure(fig, os.path.join(save_dir, "cv_metrics_summary.png"))
+
+
+PLOT_FUNCTIONS = {
+    'actual_vs_predicted': plot_actual_vs_predicted,
+    'feature_importance': plot_feature_importance,
+    'attribution_summary': plot_attribution_summary,
+    'car_by_event': plot_car_by_event,
+    'cv_metrics_summary': plot_cv_metrics_summary,
+}
+
+PLOT_MODES = ('inline', 'parallel', 'deferred', 'none')
+
+
+def render_plot_job(job):
+    """
+    Render a single (plot_name, kwargs) job. Top-level so worker processes can unpickle it.
+    Returns (plot_name, wall seconds, CPU seconds) for the parent to record.
+    """
+    plot_name, kwargs = job
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    PLOT_FUNCTIONS[plot_name](**kwargs)
+    return plot_name, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def _record_worker_job(job, future):
+    # Stages recorded inside a worker process never reach this process's profiler
+    plot_name, wall, cpu = future.result()
+    add_record(f"plot_{plot_name}", wall, cpu, sector=job[1].get('sector'), worker=True)
+
+
+def render_plot_jobs(jobs, max_workers=None):
+    """Render a list of (plot_name, kwargs) jobs in a process pool. Returns the number rendered."""
+    if not jobs:
+        return 0
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for job, future in [(job, pool.submit(render_plot_job, job)) for job in jobs]:
+            try:
+                _record_worker_job(job, future)
+                rendered += 1
+            except Exception as e:
+                print(f"  Failed to render {job[0]}: {e}")
+    return rendered
+
+
+def load_plot_jobs(manifest_path):
+    with open(manifest_path, "rb") as f:
+        return pickle.load(f)
+
+
+class PlotRenderer:
+    """
+    Dispatches plot jobs so the numeric pipeline does not wait on image I/O.
+
+    Modes:
+        'inline'   - render immediately in this process (the old behaviour)
+        'parallel' - render in a background process pool while the pipeline continues
+        'deferred' - only record the jobs in `manifest_path`; render later with render_plots.py
+        'none'     - skip plotting entirely
+    """
+
+    def __init__(self, mode='parallel', manifest_path=None, max_workers=None):
+        if mode not in PLOT_MODES:
+            raise ValueError(f"Unknown plot mode '{mode}'. Choose from {PLOT_MODES}")
+        if mode == 'deferred' and manifest_path is None:
+            raise ValueError("Deferred plotting needs a manifest_path")
+        self.mode = mode
+        self.manifest_path = manifest_path
+        self._jobs = []
+        self._futures = []
+        self._pool = ProcessPoolExecutor(max_workers=max_workers) if mode == 'parallel' else None
+
+    def submit(self, plot_name, **kwargs):
+        """Queue (or render) a plot; returns its (plot_name, kwargs) job."""
+        job = (plot_name, kwargs)
+        if self.mode == 'inline':
+            render_plot_job(job)
+        elif self.mode == 'parallel':
+            self._futures.append((job, self._pool.submit(render_plot_job, job)))
+        elif self.mode == 'deferred':
+            self._jobs.append(job)
+        return job
+
+    def close(self):
+        """Wait for outstanding renders (or write the deferred manifest). Returns the jobs that failed."""
+        failed = []
+        if self.mode == 'parallel':
+            for job, future in self._futures:
+                try:
+                    _record_worker_job(job, future)
+                except Exception as e:
+                    print(f"  Failed to render {job[0]}: {e}")
+                    failed.append(job)
+            self._pool.shutdown()
+            self._futures = []
+        elif self.mode == 'deferred':
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            with open(self.manifest_path, "wb") as f:
+                pickle.dump(self._jobs, f)
+            print(f"Deferred {len(self._jobs)} plots to {self.manifest_path}")
+        return failed
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+SQRT_2_OVER_PI = np.sqrt(2.0 / np.pi)
+
+# Upper bound on alpha + beta (GARCH) and |beta| (EGARCH), keeping fits stationary
+MAX_PERSISTENCE = 0.999
+
+# Bounds on the EGARCH intercept and |beta|: the stationary log-variance
+# omega / (1 - beta) of the unit-scaled residuals stays within +/-4
+EGARCH_MAX_OMEGA = 0.2
+EGARCH_MAX_BETA = 0.95
+
+# A sigma path further than this factor from the estimation-window residual
+# std on any day is degenerate and the fit behind it is rejected
+MAX_SIGMA_RATIO = 20.0
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _logit(p):
+    return np.log(p / (1.0 - p))
+
+
+def _garch_params(raw):
+    """Unconstrained (S, 3) -> omega > 0, alpha, beta >= 0 with alpha + beta < MAX_PERSISTENCE."""
+    omega = np.exp(raw[:, 0])
+    persistence = MAX_PERSISTENCE * _sigmoid(raw[:, 1])
+    alpha = persistence * _sigmoid(raw[:, 2])
+    return omega, alpha, persistence - alpha
+
+
+def _garch_log_variance(raw, E):
+    omega, alpha, beta = _garch_params(raw)
+    var = np.empty_like(E)
+    var[0] = 1.0  # residuals are scaled to unit variance before fitting
+    for t in range(1, len(E)):
+        var[t] = omega + alpha * E[t - 1] ** 2 + beta * var[t - 1]
+    return np.log(var)
+
+
+def _egarch_log_variance(raw, E):
+    omega, alpha, gamma = raw[:, 0], raw[:, 1], raw[:, 2]
+    beta = MAX_PERSISTENCE * np.tanh(raw[:, 3])
+    log_var = np.empty_like(E)
+    log_var[0] = 0.0
+    for t in range(1, len(E)):
+        z = E[t - 1] * np.exp(-0.5 * log_var[t - 1])
+        # The clip only keeps exp() finite; degenerate paths are rejected by _degenerate_sigma
+        log_var[t] = np.clip(omega + alpha * (np.abs(z) - SQRT_2_OVER_PI) + gamma * z + beta * log_var[t - 1], -30, 30)
+    return log_var
+
+
+# Conditional-variance models: each has its log-variance recursion over time
+# (vectorized over series), the unconstrained starting point used without a
+# warm start, and box bounds on the unconstrained parameters, since short
+# estimation windows often put the optimum on a boundary that would otherwise
+# run off to infinity.
+VOLATILITY_MODELS = {
+    'garch': {'log_variance': _garch_log_variance,
+              'x0': [np.log(0.05), _logit(0.95 / MAX_PERSISTENCE), _logit(0.05 / 0.95)],
+              'bounds': [(-10, 2), (-8, 8), (-8, 8)]},
+    'egarch': {'log_variance': _egarch_log_variance,
+               'x0': [0.0, 0.1, 0.0, np.arctanh(0.9 / MAX_PERSISTENCE)],
+               'bounds': [(-EGARCH_MAX_OMEGA, EGARCH_MAX_OMEGA), (-1, 1), (-1, 1),
+                          (-np.arctanh(EGARCH_MAX_BETA / MAX_PERSISTENCE), np.arctanh(EGARCH_MAX_BETA / MAX_PERSISTENCE))]},
+}
+
+
+def _neg_log_likelihood(model, raw, E, valid):
+    """Gaussian negative log-likelihood per series, shape (S,). Missing days add nothing."""
+    log_var = VOLATILITY_MODELS[model]['log_variance'](raw, E)
+    return 0.5 * np.sum(valid * (log_var + E ** 2 * np.exp(-log_var)), axis=0)
+
+
+def fit_volatility(model, residuals, x0=None, maxiter=200, step=1e-5):
+    """
+    Fit one conditional-variance model per column of `residuals` (n, S), all at once.
+
+    The series' likelihoods are independent, so the gradient of their sum is
+    separable: perturbing parameter k of every series together gives every
+    series' partial derivative at once. All 2 * n_params + 1 evaluations are
+    stacked into a single vectorized recursion per objective call, however
+    many series are fitted. Residuals are scaled
+    to unit variance; returns (raw parameters (S, n_params), scales (S,)).
+    x0 (S, n_params) warm-starts the fit, e.g. from a neighbouring event; a
+    warm start that does not converge, or ends with a series' likelihood
+    worse than at the cold starting point, is refitted from the cold start.
+    """
+    if model not in VOLATILITY_MODELS:
+        raise ValueError(f"Unknown volatility model '{model}', expected one of {list(VOLATILITY_MODELS)}")
+    residuals = np.asarray(residuals, dtype=float)
+    valid = ~np.isnan(residuals)
+    scales = np.nanstd(residuals, axis=0)
+    scales = np.where(scales > 0, scales, 1.0)
+    E = np.where(valid, residuals, 0.0) / scales
+
+    n_series = E.shape[1]
+    n_params = len(VOLATILITY_MODELS[model]['x0'])
+    cold = np.tile(VOLATILITY_MODELS[model]['x0'], (n_series, 1))
+
+    # The point itself and its +/- step shifts in every parameter run side by
+    # side as extra series, so one recursion gives the NLL and the gradient
+    offsets = np.vstack([np.zeros(n_params), step * np.eye(n_params), -step * np.eye(n_params)])
+    E_stacked = np.tile(E, len(offsets))
+    valid_stacked = np.tile(valid, len(offsets))
+
+    def objective(flat):
+        raw = flat.reshape(n_series, n_params)
+        stacked = (offsets[:, None, :] + raw[None, :, :]).reshape(-1, n_params)
+        nll = _neg_log_likelihood(model, stacked, E_stacked, valid_stacked).reshape(len(offsets), n_series)
+        grad = (nll[1:n_params + 1] - nll[n_params + 1:]).T / (2 * step)
+        return nll[0].sum(), grad.ravel()
+
+    bounds = VOLATILITY_MODELS[model]['bounds'] * n_series
+
+    def fit(start):
+        start = np.clip(np.asarray(start, dtype=float), *np.array(VOLATILITY_MODELS[model]['bounds']).T)
+        return minimize(objective, start.ravel(), jac=True, method='L-BFGS-B', bounds=bounds,
+                        options={'maxiter': maxiter, 'ftol': 1e-8, 'gtol': 1e-4})
+
+    result = fit(cold if x0 is None else x0)
+    if x0 is not None:
+        nll = _neg_log_likelihood(model, result.x.reshape(n_series, n_params), E, valid)
+        if not (result.success and np.all(np.isfinite(nll))
+                and np.all(nll <= _neg_log_likelihood(model, cold, E, valid))):
+            result = fit(cold)
+    return result.x.reshape(n_series, n_params), scales
+
+
+def conditional_volatility(model, raw, scales, residuals):
+    """
+    One-step-ahead conditional standard deviation of each residual series
+    (n, S) under fitted parameters: sigma_t only uses residuals up to t-1.
+    """
+    residuals = np.asarray(residuals, dtype=float)
+    E = np.where(np.isnan(residuals), 0.0, residuals) / scales
+    log_var = VOLATILITY_MODELS[model]['log_variance'](raw, E)
+    return np.exp(0.5 * log_var) * scales
+
+
+def _degenerate_sigma(sigma, scales):
+    """Series (S,) whose sigma path leaves [1 / MAX_SIGMA_RATIO, MAX_SIGMA_RATIO] times its residual std."""
+    ratio = sigma / scales
+    return ~np.all(np.isfinite(ratio) & (ratio > 1 / MAX_SIGMA_RATIO) & (ratio < MAX_SIGMA_RATIO), axis=0)
+
+
+class VolatilityParamCache:
+    """
+    Fitted parameters per (model, ticker) and event date. get() returns the
+    parameters of the closest event in time, used to warm-start the next fit.
+    """
+
+    def __init__(self):
+        self._params = {}
+
+    def put(self, model, ticker, event_date, raw):
+        self._params.setdefault((model, ticker), []).append((pd.Timestamp(event_date), np.array(raw)))
+
+    def get(self, model, ticker, event_date):
+        fitted = self._params.get((model, ticker))
+        if not fitted:
+            return None
+        event_date = pd.Timestamp(event_date)
+        return min(fitted, key=lambda item: abs(item[0] - event_date))[1]
+
+
+def standardize_abnormal_returns(abnormal_returns, estimation_window, model='garch', cache=None, event_date=None):
+    """
+    Volatility-adjusted abnormal returns for one event.
+
+    A `model` conditional-variance process is fitted per ticker on the
+    estimation-window ARs (all tickers in one vectorized fit, warm-started
+    from `cache` when it has a neighbouring event). The fitted filter is run
+    over each ticker's full AR series and every AR divided by its
+    one-step-ahead sigma. A ticker whose sigma path is degenerate (see
+    MAX_SIGMA_RATIO) is refitted cold, then with GARCH.
+    Returns {ticker: (standardized AR Series, sigma Series)}.
+    """
+    tickers = list(abnormal_returns)
+    series = {t: (ar.squeeze() if isinstance(ar, pd.DataFrame) else ar) for t, ar in abnormal_returns.items()}
+    index = series[tickers[0]].index
+    for ticker in tickers[1:]:
+        index = index.union(series[ticker].index)
+    AR = np.column_stack([series[t].reindex(index).values for t in tickers])
+
+    x0 = None
+    if cache is not None:
+        warm = [cache.get(model, t, event_date) for t in tickers]
+        if all(w is not None for w in warm):
+            x0 = np.vstack(warm)
+    estimation_rows = index.isin(estimation_window)
+    estimation_AR = AR[estimation_rows]
+    raw, scales = fit_volatility(model, estimation_AR, x0=x0)
+
+    # Filter from the start of the estimation window onwards
+    first = np.argmax(estimation_rows)
+    sigma = np.full(AR.shape, np.nan)
+    sigma[first:] = conditional_volatility(model, raw, scales, AR[first:])
+
+    # Degenerate paths are refitted cold if warm-started, then fall back to GARCH
+    bad = _degenerate_sigma(sigma[first:], scales)
+    if bad.any() and x0 is not None:
+        raw[bad], scales[bad] = fit_volatility(model, estimation_AR[:, bad])
+        sigma[first:, bad] = conditional_volatility(model, raw[bad], scales[bad], AR[first:, bad])
+        bad = _degenerate_sigma(sigma[first:], scales)
+    if bad.any() and model != 'garch':
+        garch_raw, garch_scales = fit_volatility('garch', estimation_AR[:, bad])
+        sigma[first:, bad] = conditional_volatility('garch', garch_raw, garch_scales, AR[first:, bad])
+
+    # Only fits of `model` itself seed later warm starts
+    if cache is not None:
+        for ticker, params, rejected in zip(tickers, raw, bad):
+            if not rejected:
+                cache.put(model, ticker, event_date, params)
+
+    return {
+        t: (pd.Series(AR[:, i] / sigma[:, i], index=index), pd.Series(sigma[:, i], index=index))
+        for i, t in enumerate(tickers)
+    }
@@ -1,6 +1,8 @@
 import os
-import requests
 import sys
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 
 # Add the root project folder to the module path
@@ -9,16 +11,52 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from config.events import EVENTS, EVENT_FEATURES
+from profiling import instrument, record, stage
+from http_client import HTTPClient
+from locations import location_points, location_reduction
+from baselines import WeatherStack
 
-def fetch_visualcrossing_weather(api_key, lat, lon, start_date, end_date, disaster_type):
+# Base of the Visual Crossing timeline API (overridable, e.g. to point at a local stand-in)
+VISUAL_CROSSING_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+
+# Client settings for the Visual Crossing quota: requests in flight, sustained
+# requests per second (with bursts up to WEATHER_BURST) and retries on 429/5xx
+WEATHER_MAX_CONCURRENCY = 8
+WEATHER_RATE_PER_SEC = 5.0
+WEATHER_BURST = 10
+WEATHER_MAX_RETRIES = 5
+
+# Point windows kept in memory per base URL and API key, so points shared by events
+# or re-requested are fetched once
+WEATHER_CACHE_SIZE = 4096
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+_POINT_CACHE = OrderedDict()
+_POINT_CACHE_LOCK = threading.Lock()
+
+
+def get_weather_client():
+    """Shared HTTPClient for Visual Crossing, created on first use so connections are reused across calls."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = HTTPClient(max_concurrency=WEATHER_MAX_CONCURRENCY, rate_per_sec=WEATHER_RATE_PER_SEC,
+                                 burst=WEATHER_BURST, max_retries=WEATHER_MAX_RETRIES)
+        return _CLIENT
+
+
+@instrument('fetch_visualcrossing_weather')
+def fetch_visualcrossing_weather(api_key, lat, lon, start_date, end_date, disaster_type, client=None):
 
     # Fall back to a default if type is not found
     weather_vars = EVENT_FEATURES.get(disaster_type, ['temp', 'humidity', 'precip', 'windspeed'])
 
-    # API call
-    url = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{lat},{lon}/{start_date}/{end_date}?unitGroup=metric&key={api_key}&include=days"
-    r = requests.get(url)
-    r.raise_for_status()  # good practice for catching request errors
+    # API call through the pooled client (retries 429/5xx with jittered backoff)
+    client = client or get_weather_client()
+    url = f"{VISUAL_CROSSING_URL}/{lat},{lon}/{start_date}/{end_date}?unitGroup=metric&key={api_key}&include=days"
+    r = client.get(url)
+    record(bytes_fetched=len(r.content))
 
     data = r.json()['days']
     df = pd.DataFrame(data)
@@ -30,14 +68,163 @@ def fetch_visualcrossing_weather(api_key, lat, lon, start_date, end_date, disast
     return df[available_vars]
 
 
-def compute_weather_deltas(weather_df, baseline_end_date):
+def _weighted_mean(values, weights):
+    present = ~np.isnan(values)
+    w = weights[:, None, None] * present
+    total = w.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        return np.where(total > 0, np.nansum(values * w, axis=0) / total, np.nan)
+
+
+def _mean(values, weights):
+    return _weighted_mean(values, np.ones_like(weights))
+
+
+def _max(values, weights):
+    # fmax skips NaN, so a point missing a day does not blank the footprint
+    return np.fmax.reduce(values, axis=0)
+
+
+# How a footprint's point weather is combined into one series per variable
+WEATHER_REDUCTIONS = {
+    'mean': _mean,
+    'max': _max,
+    'weighted': _weighted_mean,
+}
+
+
+def reduce_weather(frames, weights, method='mean'):
+    """
+    Combine per-point weather frames into one footprint frame, date by date.
+    Reduced on the raw variables, before compute_weather_deltas.
+    """
+    if method not in WEATHER_REDUCTIONS:
+        raise ValueError(f"Unknown weather reduction '{method}', expected one of {list(WEATHER_REDUCTIONS)}")
+    if len(frames) == 1:
+        return frames[0]
+    index = frames[0].index
+    columns = [c for c in frames[0].columns if all(c in f.columns for f in frames)]
+    for frame in frames[1:]:
+        index = index.union(frame.index)
+    values = np.stack([f.reindex(index)[columns].values.astype(float) for f in frames])
+    reduced = WEATHER_REDUCTIONS[method](values, np.asarray(weights, dtype=float))
+    return pd.DataFrame(reduced, index=index, columns=columns)
+
+
+def _fetch_point_cached(api_key, point_window, client, event_key=None):
+    # Another endpoint or account may answer differently (e.g. a stand-in server, or an error for a bad key)
+    cache_key = (VISUAL_CROSSING_URL, api_key) + tuple(point_window)
+    with _POINT_CACHE_LOCK:
+        if cache_key in _POINT_CACHE:
+            _POINT_CACHE.move_to_end(cache_key)
+            return _POINT_CACHE[cache_key]
+    with stage('fetch_weather', event_key=event_key):
+        df = fetch_visualcrossing_weather(api_key, *point_window, client=client)
+    with _POINT_CACHE_LOCK:
+        _POINT_CACHE[cache_key] = df
+        while len(_POINT_CACHE) > WEATHER_CACHE_SIZE:
+            _POINT_CACHE.popitem(last=False)
+    return df
+
+
+def fetch_weather_batch(api_key, windows, client=None):
+    """
+    Fetch the weather of many event footprints concurrently.
+
+    windows: dict of {key: (location, start_date, end_date, disaster_type)}, with
+    location in any form accepted by locations.location_points.
+    Every sample point of every footprint is fetched in one concurrent batch
+    (through the point cache), then reduced per footprint with the location's
+    'reduce' method. Returns {key: DataFrame or Exception}, so one failed
+    window does not sink the batch.
+    """
+    client = client or get_weather_client()
+
+    footprints = {}
+    point_owner = {}
+    for key, (location, start_date, end_date, disaster_type) in windows.items():
+        try:
+            points = location_points(location)
+            method = location_reduction(location)
+        except ValueError as e:
+            footprints[key] = e
+            continue
+        point_windows = [(lat, lon, start_date, end_date, disaster_type) for lat, lon, _ in points]
+        footprints[key] = (point_windows, [w for _, _, w in points], method)
+        for point_window in point_windows:
+            point_owner.setdefault(point_window, key)
+
+    unique = list(point_owner)
+    fetched = client.gather([lambda pw=pw: _fetch_point_cached(api_key, pw, client, point_owner[pw]) for pw in unique])
+    fetched = dict(zip(unique, fetched))
+
+    results = {}
+    for key, footprint in footprints.items():
+        if isinstance(footprint, Exception):
+            results[key] = footprint
+            continue
+        point_windows, weights, method = footprint
+        frames = [fetched[pw] for pw in point_windows]
+        failed = [f for f in frames if isinstance(f, Exception)]
+        try:
+            results[key] = failed[0] if failed else reduce_weather(frames, weights, method)
+        except ValueError as e:
+            results[key] = e
+    return results
+
+
+def fetch_event_weather(api_key, location, start_date, end_date, disaster_type, client=None):
+    """Weather for one event footprint (single point, point list or polygon), reduced to one frame."""
+    result = fetch_weather_batch(api_key, {None: (location, start_date, end_date, disaster_type)}, client)[None]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def fetch_climatology(api_key, windows, years=5, client=None):
+    """
+    Weather of the same calendar windows in each of the `years` prior years.
+
+    windows: as for fetch_weather_batch. Returns {key: [DataFrame, ...]} with
+    each year's frame shifted forward onto the event's own dates, ready for
+    baselines.WeatherStack.add_climatology, or {key: Exception} when no prior
+    year could be fetched.
+    """
+    shifted = {}
+    for key, (location, start_date, end_date, disaster_type) in windows.items():
+        for k in range(1, years + 1):
+            offset = pd.DateOffset(years=k)
+            shifted[(key, k)] = (location, (pd.Timestamp(start_date) - offset).strftime('%Y-%m-%d'),
+                                 (pd.Timestamp(end_date) - offset).strftime('%Y-%m-%d'), disaster_type)
+    fetched = fetch_weather_batch(api_key, shifted, client)
+
+    history = {}
+    for key in windows:
+        frames = []
+        for k in range(1, years + 1):
+            df = fetched[(key, k)]
+            if isinstance(df, Exception):
+                continue
+            df = df.copy()
+            df.index = df.index + pd.DateOffset(years=k)
+            # Feb 29 has no counterpart in most prior years; keep the first match
+            frames.append(df[~df.index.duplicated()])
+        history[key] = frames or ValueError(f"No climatology history could be fetched for {key}")
+    return history
+
+
+def compute_weather_deltas(weather_df, baseline_end_date, mode='mean', history=None, **options):
     """
     Compute weather deltas: deviation from pre-event baseline.
     Baseline = mean of all weather values before baseline_end_date (the event_date).
 
+    Other baselines.BASELINE_MODES ('zscore', 'rolling_median', 'climatology'
+    with `history` from fetch_climatology) are available through `mode`; to
+    compute many events at once use baselines.WeatherStack directly.
+
     Returns DataFrame with same shape, columns prefixed with 'delta_'.
     """
-    baseline = weather_df.loc[weather_df.index < baseline_end_date].mean()
-    delta_df = weather_df.subtract(baseline)
-    delta_df.columns = [f"delta_{col}" for col in delta_df.columns]
-    return delta_df
\ No newline at end of file
+    stack = WeatherStack({None: weather_df}, {None: baseline_end_date})
+    if history is not None:
+        stack.add_climatology({None: history})
+    return stack.delta_frames(mode, **options)[None]
@@ -0,0 +1,38 @@
+import json
+import numpy as np
+
+from intervals import (conformal_quantile, add_conformal_intervals, save_interval_calibration,
+                       load_interval_calibration)
+
+
+def _fold(event_key, y_true, y_pred):
+    return {'event_key': event_key, 'y_true': np.asarray(y_true), 'y_pred_ols': np.asarray(y_pred),
+            'metrics_ols': {}}
+
+
+def test_too_few_scores_give_no_interval(tmp_path):
+    assert np.isnan(conformal_quantile([0.1, 0.2, 0.3]))
+
+    folds = [_fold('a', [0.0, 0.1], [0.05, 0.0]), _fold('b', [0.2], [0.1])]
+    overall = {'ols': {}}
+    calibration = add_conformal_intervals(folds, overall)
+    assert calibration == {'ols': None}
+    assert np.isnan(overall['ols']['coverage'])
+    assert all(np.isnan(f['lo_ols']).all() and np.isnan(f['metrics_ols']['coverage']) for f in folds)
+
+    save_interval_calibration(tmp_path / "XLE_intervals.json", calibration)
+
+    def reject(constant):
+        raise ValueError(f"non-standard JSON constant {constant}")
+    saved = json.loads((tmp_path / "XLE_intervals.json").read_text(), parse_constant=reject)
+    assert saved['quantiles'] == {'ols': None}
+    assert load_interval_calibration(str(tmp_path)) == {}
+
+
+def test_enough_scores_give_finite_intervals():
+    rng = np.random.default_rng(0)
+    folds = [_fold(str(i), rng.normal(size=20), np.zeros(20)) for i in range(4)]
+    overall = {'ols': {}}
+    calibration = add_conformal_intervals(folds, overall)
+    assert np.isfinite(calibration['ols'])
+    assert 0.5 < overall['ols']['coverage'] <= 1
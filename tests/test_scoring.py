@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic import make_catalog, FakeYFinance, FakeVisualCrossingServer, synthetic_weather_days
+from run_benchmarks import patched_sources
+from http_client import HTTPClient
+
+
+@pytest.fixture
+def trained(tmp_path, monkeypatch):
+    """Train Hurricane models on the synthetic stand-ins; yields a function of the analysis options."""
+    monkeypatch.chdir(tmp_path)
+    catalog = make_catalog(4, 2, sectors_per_event=2)
+    with FakeVisualCrossingServer() as server, \
+            patched_sources(catalog, FakeYFinance(), server.url, HTTPClient(rate_per_sec=1000, burst=1000)):
+        from analysis import run_pooled_analysis
+
+        def train(**options):
+            run_pooled_analysis('Hurricane', 'test', plot_mode='none', **options)
+            return catalog
+        yield train
+
+
+@pytest.fixture
+def engineered_run(trained):
+    return trained(engineered_features=True)
+
+
+def _forecast(event):
+    from dataset import get_analysis_window
+    start, end = get_analysis_window(event)
+    return pd.DataFrame(synthetic_weather_days(event['location']['lat'], event['location']['lon'], start, end))
+
+
+def test_models_trained_with_engineered_features_can_be_scored(engineered_run):
+    from scoring import score_events
+
+    event_key, event = next(iter(engineered_run.items()))
+    scores = score_events({event_key: event}, _forecast(event), output_dir='output')
+    assert not scores.empty
+    assert np.isfinite(scores['ar_pred']).all()
+
+
+def test_market_features_match_the_feature_store(engineered_run):
+    from scoring import build_market_features, open_feature_store, load_model_config
+
+    event_key, event = next(iter(engineered_run.items()))
+    sectors = sorted(event['sector_etfs'])
+    definitions = load_model_config('output/Hurricane/models')['feature_definitions']
+    store = open_feature_store('output', 'Hurricane', definitions)
+    stored = build_market_features({event_key: event}, sectors, definitions, store)
+    fetched = build_market_features({event_key: event}, sectors, definitions)
+
+    key = ['sector', 'date']
+    pd.testing.assert_frame_equal(stored.sort_values(key, ignore_index=True)[fetched.columns],
+                                  fetched.sort_values(key, ignore_index=True), check_dtype=False)
+
+
+@pytest.mark.parametrize('baseline', ['zscore', 'climatology'])
+def test_scoring_uses_the_training_baseline(trained, baseline):
+    from scoring import build_feature_matrix, load_model_config
+
+    catalog = trained(baseline=baseline)
+    event_key, event = next(iter(catalog.items()))
+    config = load_model_config('output/Hurricane/models')
+    assert config['baseline'] == baseline
+    features = build_feature_matrix({event_key: event}, _forecast(event), config, api_key='test')
+
+    pooled = pd.read_csv('output/Hurricane/pooled_dataset.csv', parse_dates=['date'])
+    pooled = pooled[(pooled['event_key'] == event_key) & (pooled['sector'] == pooled['sector'].iloc[0])]
+    merged = pooled.merge(features, on='date', suffixes=('_train', '_score'))
+    assert len(merged) == len(pooled)
+    deltas = [c[:-len('_train')] for c in merged.columns if c.startswith('delta_') and c.endswith('_train')]
+    assert deltas
+    for col in deltas:
+        np.testing.assert_allclose(merged[f"{col}_score"], merged[f"{col}_train"], atol=1e-9)
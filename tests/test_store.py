@@ -0,0 +1,22 @@
+import os
+
+from synthetic import make_catalog, FakeYFinance, FakeVisualCrossingServer
+from run_benchmarks import patched_sources
+from http_client import HTTPClient
+
+
+def test_store_reads_only_the_first_scheme_with_other_schemes_present(tmp_path, monkeypatch):
+    from analysis import run_pooled_analysis
+    from store import ResultStore
+
+    monkeypatch.chdir(tmp_path)
+    catalog = make_catalog(4, 2, sectors_per_event=2)
+    with FakeVisualCrossingServer() as server, \
+            patched_sources(catalog, FakeYFinance(), server.url, HTTPClient(rate_per_sec=1000, burst=1000)):
+        run_pooled_analysis('Hurricane', 'test', plot_mode='none', cv_schemes=['loeo', 'rolling_origin'])
+
+    assert os.listdir(os.path.join('output', 'Hurricane', 'predictions', 'rolling_origin'))
+    store = ResultStore('output')
+    sectors = {s for event in catalog.values() for s in event['sector_etfs']}
+    assert set(store.predictions['sector']) == sectors
+    assert set(store.metrics['sector']) == sectors
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from volatility import (VolatilityParamCache, standardize_abnormal_returns, fit_volatility,
+                        MAX_SIGMA_RATIO)
+
+
+def _abnormal_returns(seed, tickers, n=400):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2015-01-01", periods=n)
+    return index, {t: pd.Series(rng.standard_t(5, n) * 0.01, index=index) for t in tickers}
+
+
+def _sigma_ratios(result, estimation_window):
+    ratios = []
+    for sar, sigma in result.values():
+        ar = sar * sigma
+        ratios.append((sigma / ar.reindex(estimation_window).std()).dropna().values)
+    return np.concatenate(ratios)
+
+
+def test_egarch_warm_start_across_events_stays_sane():
+    cache = VolatilityParamCache()
+    tickers = ['AAA', 'BBB', 'CCC']
+    for seed, event_date in [(1, "2016-06-01"), (4, "2016-07-01")]:
+        index, returns = _abnormal_returns(seed, tickers)
+        estimation_window = index[:250]
+        result = standardize_abnormal_returns(returns, estimation_window, 'egarch', cache, event_date)
+        ratios = _sigma_ratios(result, estimation_window)
+        assert np.all(ratios > 1 / MAX_SIGMA_RATIO) and np.all(ratios < MAX_SIGMA_RATIO)
+        assert max(sar.abs().max() for sar, _ in result.values()) < 50
+
+
+def test_divergent_warm_start_falls_back_to_cold_fit():
+    _, returns = _abnormal_returns(4, ['AAA', 'BBB'])
+    residuals = np.column_stack([r.values[:250] for r in returns.values()])
+    cold, _ = fit_volatility('egarch', residuals)
+    # Starting points at the parameter bounds, as from a warm start that ran off
+    warm, _ = fit_volatility('egarch', residuals, x0=np.array([[5, 2, -2, -4], [5, -2, -2, 0.375]]))
+    np.testing.assert_allclose(warm, cold, atol=1e-3)
@@ -0,0 +1,25 @@
+import pandas as pd
+
+import weather
+
+
+def test_point_cache_is_keyed_by_base_url_and_api_key(monkeypatch):
+    calls = []
+
+    def fake_fetch(api_key, lat, lon, start_date, end_date, disaster_type, client=None):
+        calls.append((weather.VISUAL_CROSSING_URL, api_key))
+        return pd.DataFrame({'temp': [float(len(calls))]}, index=pd.to_datetime([start_date]))
+
+    monkeypatch.setattr(weather, 'fetch_visualcrossing_weather', fake_fetch)
+    monkeypatch.setattr(weather, '_POINT_CACHE', type(weather._POINT_CACHE)())
+    location = {'lat': 29.7, 'lon': -95.4}
+
+    def fetch(api_key):
+        return weather.fetch_event_weather(api_key, location, '2017-08-20', '2017-08-20', 'Hurricane')
+
+    first = fetch('key-a')
+    pd.testing.assert_frame_equal(fetch('key-a'), first)
+    fetch('key-b')
+    monkeypatch.setattr(weather, 'VISUAL_CROSSING_URL', 'http://127.0.0.1:1/timeline')
+    fetch('key-a')
+    assert calls == [(calls[0][0], 'key-a'), (calls[0][0], 'key-b'), ('http://127.0.0.1:1/timeline', 'key-a')]